@@ -0,0 +1,35 @@
+"""
+hatch 构建钩子
+构建 wheel 时为当前解释器编译内置 websockets 的 speedups 扩展；
+CI 会预先为其他 CPython 版本编译好，钩子只补齐当前版本。
+编译失败不会中断构建，运行时会回退到纯Python的帧掩码实现。
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+
+from hatchling.builders.hooks.plugin.interface import BuildHookInterface
+
+
+def _load_build_script():
+    script = Path(__file__).parent / "scripts" / "build_speedups.py"
+    spec = importlib.util.spec_from_file_location("build_speedups", script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class SpeedupsBuildHook(BuildHookInterface):
+    PLUGIN_NAME = "custom"
+
+    def initialize(self, version, build_data):
+        if self.target_name != "wheel":
+            return
+        if os.environ.get("QQSYNC_SKIP_SPEEDUPS"):
+            self.app.display_info("已设置 QQSYNC_SKIP_SPEEDUPS，跳过 speedups 编译")
+            return
+        try:
+            _load_build_script().build_speedups(log=self.app.display_info)
+        except Exception as e:
+            self.app.display_warning(f"speedups 编译出错，wheel 将不包含当前版本的扩展: {e}")
@@ -0,0 +1,62 @@
+"""
+基准测试脚本的公共函数
+
+插件包及其子包的 __init__ 会导入 endstone，基准测试只用到其中不依赖 endstone 的模块，
+因此先把各级包注册为空包，再直接导入需要的子模块，不执行各级 __init__。
+"""
+
+import importlib
+import subprocess
+import sys
+import timeit
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "endstone_qqsync_plugin"
+PACKAGE_DIR = ROOT / "src" / PACKAGE
+
+
+def _register_packages():
+    if PACKAGE in sys.modules:
+        return
+    for directory in [PACKAGE_DIR, *sorted(p.parent for p in PACKAGE_DIR.glob("*/__init__.py"))]:
+        relative = directory.relative_to(PACKAGE_DIR).parts
+        module = types.ModuleType(".".join((PACKAGE, *relative)))
+        module.__path__ = [str(directory)]
+        sys.modules[module.__name__] = module
+
+
+def import_plugin_module(name: str):
+    """
+    导入插件的子模块，跳过各级包的 __init__
+
+    Args:
+        name (str): 相对插件包的模块名，如 "core.data_manager"
+    """
+    _register_packages()
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+def load_module_at(revision: str, name: str):
+    """
+    从 git 历史版本加载单个模块（用于与改动前的实现对比，模块不能包含相对导入）
+
+    Args:
+        revision (str): git 提交，如 "HEAD~3"
+        name (str): 相对插件包的模块名，如 "utils.message_utils"
+    """
+    path = f"src/{PACKAGE}/{name.replace('.', '/')}.py"
+    source = subprocess.run(
+        ["git", "show", f"{revision}:{path}"],
+        cwd=ROOT, capture_output=True, text=True, encoding="utf-8", check=True,
+    ).stdout
+    module = types.ModuleType(f"{name}@{revision}")
+    module.__file__ = f"{revision}:{path}"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def best_of(func, number: int, repeat: int = 5) -> float:
+    """重复测量取最小值，返回单次调用耗时（秒）"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
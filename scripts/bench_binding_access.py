@@ -0,0 +1,98 @@
+"""
+绑定数据访问的内存分配基准测试
+
+在临时目录中生成指定数量的玩家记录，对常见查询（是否存在、记录总数、读取单条记录）比较
+改动前的 binding_data（每次访问复制整个字典）、当前 binding_data（复制导出缓存）、
+只读视图 binding_view 和 contains / count / get_record 访问方法的峰值内存分配（tracemalloc）与单次耗时。
+DataManager 加载数据时会用到 endstone，需在安装了 endstone 的环境中运行（pip install endstone）。
+
+用法:
+    python scripts/bench_binding_access.py
+    python scripts/bench_binding_access.py --records 50000
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from _bench_support import best_of, import_plugin_module
+
+QUERIES = (
+    ("是否存在", lambda mapping, name: name in mapping),
+    ("记录总数", lambda mapping, name: len(mapping)),
+    ("读取单条记录", lambda mapping, name: mapping.get(name)["qq"]),
+)
+
+ACCESSORS = (
+    lambda data_manager, name: data_manager.contains(name),
+    lambda data_manager, name: data_manager.count(),
+    lambda data_manager, name: data_manager.get_record(name).qq,
+)
+
+
+def access_modes(data_manager) -> list:
+    """(名称, 获取映射的函数)"""
+    return [
+        ("改动前 binding_data（复制）", data_manager._binding_data.copy),
+        ("binding_data（复制缓存）", lambda: data_manager.binding_data),
+        ("binding_view（只读视图）", lambda: data_manager.binding_view),
+    ]
+
+
+def peak_allocation(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(func) -> str:
+    start = time.perf_counter()
+    func()
+    number = max(10, int(0.1 / max(time.perf_counter() - start, 1e-7)))
+    seconds = best_of(func, number=number, repeat=3)
+    duration = f"{seconds * 1e3:8.2f} ms" if seconds >= 1e-4 else f"{seconds * 1e6:8.2f} us"
+    return f"{peak_allocation(func) / 1024:9.1f} KiB {duration}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="绑定数据访问的内存分配基准测试")
+    parser.add_argument("--records", type=int, default=50000, help="玩家记录数量")
+    args = parser.parse_args()
+
+    DataManager = import_plugin_module("core.data_manager").DataManager
+
+    with tempfile.TemporaryDirectory() as folder:
+        data = {
+            f"player{i}": {
+                "name": f"player{i}", "xuid": str(2535400000000000 + i), "qq": str(100000000 + i),
+                "bind_time": 1700000000, "total_playtime": i, "last_join_time": None,
+                "last_quit_time": None, "session_count": 0,
+            }
+            for i in range(args.records)
+        }
+        (Path(folder) / "data.json").write_text(json.dumps(data), encoding="utf-8")
+        plugin = SimpleNamespace(config_manager=SimpleNamespace(get_config=lambda key, default=None: default))
+        data_manager = DataManager(plugin, Path(folder), logging.getLogger("bench"))
+        target = f"player{args.records // 2}"
+
+        try:
+            print(f"{args.records} 条玩家记录（峰值分配 / 单次耗时）")
+            for (label, query), accessor in zip(QUERIES, ACCESSORS):
+                print(f"  {label}")
+                for mode, get_mapping in access_modes(data_manager):
+                    print(f"    {mode:24} {measure(lambda: query(get_mapping(), target))}")
+                print(f"    {'访问方法':24} {measure(lambda: accessor(data_manager, target))}")
+        finally:
+            data_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+OneBot JSON编解码基准测试
+
+构造一个 3000 人的 get_group_member_list 响应和一条中文聊天消息请求，比较：
+- 解码：旧流程（字节解码为 str 后 json.loads）与 codec.decode 直接解码字节
+- 编码：旧流程（json.dumps 后编码为字节）与 codec.encode / codec.encode_group_msg
+
+codec 在导入时选择后端，每个后端在单独的子进程中测量；未安装的后端会被跳过。
+
+用法:
+    python scripts/bench_codec.py                    # 测量所有已安装的后端
+    python scripts/bench_codec.py --backend json     # 只测量指定后端
+    python scripts/bench_codec.py --members 5000
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+
+from _bench_support import best_of, import_plugin_module
+
+BACKENDS = ("orjson", "msgspec", "json")
+CHAT_MESSAGE = "[Steve] 你好，今晚一起挖矿吗？"
+ECHO = "send_group_msg#abc123-42"
+
+
+def member_list_response(count: int) -> dict:
+    rng = random.Random(1)
+    members = [
+        {
+            "group_id": 712523104, "user_id": 100000000 + i, "nickname": f"玩家{i}号🎮", "card": f"群名片{i}",
+            "sex": "unknown", "age": 0, "area": "", "join_time": 1700000000 + i, "last_sent_time": 1710000000 + i,
+            "level": str(rng.randint(1, 100)), "role": "member", "unfriendly": False, "title": "",
+            "title_expire_time": 0, "card_changeable": True, "shut_up_timestamp": 0,
+        }
+        for i in range(count)
+    ]
+    return {"status": "ok", "retcode": 0, "data": members, "message": "", "wording": "",
+            "echo": "get_group_member_list#abc123-7"}
+
+
+def run_backend(backend: str, members: int):
+    # 屏蔽优先级更高的后端，使 codec 选择指定的后端
+    for name in BACKENDS[:BACKENDS.index(backend)]:
+        sys.modules[name] = None
+    codec = import_plugin_module("websocket.codec")
+    if codec.BACKEND != backend:
+        print(f"{backend:8} 未安装，跳过")
+        return
+
+    response = member_list_response(members)
+    raw = json.dumps(response, ensure_ascii=False).encode("utf-8")
+    assert codec.decode(raw) == response
+    payload = {"action": "send_group_msg", "params": {"group_id": 712523104, "message": CHAT_MESSAGE}, "echo": ECHO}
+    assert json.loads(codec.encode_group_msg(712523104, CHAT_MESSAGE, ECHO)) == payload
+
+    old_decode = best_of(lambda: json.loads(raw.decode("utf-8")), number=20)
+    new_decode = best_of(lambda: codec.decode(raw), number=20)
+    old_encode = best_of(lambda: json.dumps(payload).encode("utf-8"), number=100000)
+    new_encode = best_of(lambda: codec.encode(payload), number=100000)
+    group_msg = best_of(lambda: codec.encode_group_msg(712523104, CHAT_MESSAGE, ECHO), number=100000)
+    print(f"{backend:8} 解码 {len(raw) / 1e6:.2f} MB 响应: {old_decode * 1e3:6.2f} ms -> {new_decode * 1e3:6.2f} ms"
+          f"  |  编码聊天消息: {old_encode * 1e6:5.2f} us -> {new_encode * 1e6:5.2f} us"
+          f"（encode_group_msg {group_msg * 1e6:5.2f} us）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OneBot JSON编解码基准测试")
+    parser.add_argument("--backend", choices=BACKENDS, help="只测量指定后端（默认逐个在子进程中测量全部后端）")
+    parser.add_argument("--members", type=int, default=3000, help="群成员列表响应中的成员数量")
+    args = parser.parse_args()
+
+    if args.backend:
+        run_backend(args.backend, args.members)
+        return
+
+    print("旧流程 -> codec（每个后端在独立进程中测量）")
+    for backend in BACKENDS:
+        subprocess.run([sys.executable, __file__, "--backend", backend, "--members", str(args.members)], check=True)
+
+
+if __name__ == "__main__":
+    main()
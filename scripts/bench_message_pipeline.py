@@ -0,0 +1,77 @@
+"""
+QQ消息转发到游戏的单条处理耗时基准测试
+
+对几条典型的群消息（CQ码、emoji、纯文本、空消息等）执行 format_qq_message_for_game，
+输出每条消息的平均处理耗时。指定 --baseline 时同时测量该版本的逐步处理流程
+（parse_qq_message → 拼接前缀 → clean_message_text → truncate_message），并校验输出一致。
+
+用法:
+    python scripts/bench_message_pipeline.py
+    python scripts/bench_message_pipeline.py --baseline <改动前的提交>
+    python scripts/bench_message_pipeline.py --iterations 200000
+"""
+
+import argparse
+
+from _bench_support import best_of, import_plugin_module, load_module_at
+
+MESSAGES = [
+    ({"raw_message": "今晚八点集合打末影龙，记得带床"}, "Steve", "Minecraft交流群"),
+    ({"raw_message": "[CQ:at,qq=2899659758] 服务器是不是卡了？😂😂"}, "Alex", "Minecraft交流群"),
+    ({"raw_message": "[CQ:reply,id=1234][CQ:image,file=abc.jpg,url=https://example.com/abc.jpg]看这个"}, "Bob", ""),
+    ({"raw_message": "[CQ:face,id=178][CQ:face,id=179] 🤔🥰🫠 好耶"}, "Carol", "生存服"),
+    ({"raw_message": "刷屏测试 " * 40}, "Dave", "Minecraft交流群"),
+    ({"raw_message": ""}, "Eve", ""),
+]
+
+
+def baseline_pipeline(module):
+    """改动前 _forward_message_to_game 中的逐步处理流程"""
+    def run(message_data, display_name, group_name):
+        parsed_message = module.parse_qq_message(message_data)
+        if group_name:
+            formatted_message = f"[{group_name}] {display_name}: {parsed_message}"
+        else:
+            formatted_message = f"{display_name}: {parsed_message}"
+        clean_message = module.clean_message_text(formatted_message)
+        return parsed_message, module.truncate_message(clean_message, max_length=150)
+    return run
+
+
+def measure(pipeline, iterations: int) -> float:
+    def run_all():
+        for message_data, display_name, group_name in MESSAGES:
+            pipeline(message_data, display_name, group_name)
+    return best_of(run_all, number=max(1, iterations // len(MESSAGES))) / len(MESSAGES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QQ消息转发到游戏的单条处理耗时基准测试")
+    parser.add_argument("--baseline", help="与该 git 提交中的实现对比")
+    parser.add_argument("--iterations", type=int, default=120000, help="每轮处理的消息条数")
+    args = parser.parse_args()
+
+    message_utils = import_plugin_module("utils.message_utils")
+    current = message_utils.format_qq_message_for_game
+
+    results = []
+    if args.baseline:
+        baseline = baseline_pipeline(load_module_at(args.baseline, "utils.message_utils"))
+        for message_data, display_name, group_name in MESSAGES:
+            expected = baseline(message_data, display_name, group_name)
+            parsed, clean = current(message_data, display_name, group_name)
+            # 空消息不再拼接前缀，只比较解析结果
+            if parsed != expected[0] or (clean and clean != expected[1]):
+                raise SystemExit(f"输出不一致: {message_data!r}\n  baseline: {expected!r}\n  current:  {(parsed, clean)!r}")
+        results.append((f"baseline ({args.baseline})", measure(baseline, args.iterations)))
+    results.append(("current", measure(current, args.iterations)))
+
+    print(f"{len(MESSAGES)} 条典型消息，每轮 {args.iterations} 条")
+    for label, seconds in results:
+        print(f"  {label:28} {seconds * 1e6:7.2f} us/msg")
+    if len(results) == 2:
+        print(f"  提升 {results[0][1] / results[1][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
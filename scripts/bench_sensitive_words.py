@@ -0,0 +1,115 @@
+"""
+敏感词过滤基准测试
+
+生成指定数量的自定义敏感词，测量过滤器构建耗时（每次加载/重载配置时执行一次）
+和每条聊天消息的过滤耗时，并与逐词暴力匹配的参考实现比对结果。
+指定 --baseline 时同时测量该版本的 filter_sensitive_content。
+
+用法:
+    python scripts/bench_sensitive_words.py
+    python scripts/bench_sensitive_words.py --words 3000 --baseline <改动前的提交>
+"""
+
+import argparse
+import random
+import time
+
+from _bench_support import best_of, import_plugin_module, load_module_at
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789挖矿钻石苦力怕末影龙下界红石村民铁傀儡附魔台"
+
+CHAT_LINES = [
+    "今晚八点集合打末影龙，记得带床和药水",
+    "有没有人来帮我挖一下钻石矿，坐标 120 -58 -340",
+    "服务器是不是卡了？我这边延迟好高",
+    "GG，红石机器终于跑起来了",
+    "出售附魔书，锋利V 耐久III 经验修补，私聊",
+]
+
+
+def random_words(rng: random.Random, count: int, min_len: int = 2, max_len: int = 6) -> list:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(ALPHABET) for _ in range(rng.randint(min_len, max_len))))
+    return sorted(words)
+
+
+def reference_filter(text: str, words) -> tuple:
+    """逐词查找所有（含重叠）命中位置并替换为 *，作为正确性参考"""
+    lowered = text.lower()
+    masked = [False] * len(text)
+    for word in words:
+        word = word.lower()
+        start = lowered.find(word)
+        while start != -1:
+            masked[start:start + len(word)] = [True] * len(word)
+            start = lowered.find(word, start + 1)
+    result = "".join("*" if hit else char for char, hit in zip(text, masked))
+    return result, any(masked)
+
+
+def check(message_utils, builtin_words, rounds: int, rng: random.Random):
+    for _ in range(rounds):
+        words = random_words(rng, rng.randint(1, 20), 1, 4)
+        sensitive_filter = message_utils.build_sensitive_filter(words)
+        for _ in range(5):
+            text = "".join(rng.choice(ALPHABET + ALPHABET.upper() + " ") for _ in range(rng.randint(0, 40)))
+            expected = reference_filter(text, builtin_words.union(words))
+            if sensitive_filter.filter(text) != expected:
+                raise SystemExit(f"结果与参考实现不一致: words={words!r} text={text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="敏感词过滤基准测试")
+    parser.add_argument("--words", type=int, default=3000, help="自定义敏感词数量")
+    parser.add_argument("--baseline", help="与该 git 提交中的实现对比")
+    parser.add_argument("--check", type=int, default=1000, help="与参考实现比对的随机词表组数（0 表示跳过）")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    message_utils = import_plugin_module("utils.message_utils")
+    builtin_words = message_utils.get_sensitive_words()
+    custom_words = random_words(rng, args.words)
+    # 保证部分消息命中自定义敏感词
+    lines = CHAT_LINES + [f"{line} {custom_words[i]}" for i, line in enumerate(CHAT_LINES)]
+
+    if args.check:
+        check(message_utils, builtin_words, args.check, rng)
+        print(f"已与参考实现比对 {args.check * 5} 条随机文本，结果一致")
+
+    start = time.perf_counter()
+    sensitive_filter = message_utils.build_sensitive_filter(custom_words)
+    build_time = time.perf_counter() - start
+    print(f"内置 {len(builtin_words)} 个 + 自定义 {len(custom_words)} 个敏感词，"
+          f"构建自动机 {build_time * 1e3:.1f} ms（{sensitive_filter.word_count} 个词）")
+
+    def per_message(filter_func) -> float:
+        def run_all():
+            for line in lines:
+                filter_func(line)
+        return best_of(run_all, number=max(1, 2000 // len(lines))) / len(lines)
+
+    builtin_filter = message_utils.build_sensitive_filter()
+    results = [
+        ("current, 含自定义词", per_message(sensitive_filter.filter)),
+        ("current, 仅内置词", per_message(builtin_filter.filter)),
+    ]
+    if args.baseline:
+        baseline = load_module_at(args.baseline, "utils.message_utils")
+        for line in lines:
+            if baseline.filter_sensitive_content(line, custom_words)[1] != sensitive_filter.filter(line)[1]:
+                raise SystemExit(f"命中结果与 baseline 不一致: {line!r}")
+        results += [
+            (f"baseline ({args.baseline}), 含自定义词",
+             per_message(lambda line: baseline.filter_sensitive_content(line, custom_words))),
+            (f"baseline ({args.baseline}), 仅内置词",
+             per_message(baseline.filter_sensitive_content)),
+        ]
+
+    print(f"{len(lines)} 条聊天消息:")
+    for label, seconds in results:
+        print(f"  {label:36} {seconds * 1e6:9.1f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
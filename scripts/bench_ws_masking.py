@@ -0,0 +1,48 @@
+"""
+websockets 帧掩码吞吐量基准测试
+
+比较内置 websockets 的纯Python掩码实现（utils.apply_mask）与 speedups C扩展在不同负载大小下的
+耗时和吞吐量，并校验两者结果一致。需要先用 scripts/build_speedups.py 为当前解释器编译扩展。
+
+用法:
+    python scripts/build_speedups.py
+    python scripts/bench_ws_masking.py
+"""
+
+import argparse
+import os
+
+from _bench_support import best_of, import_plugin_module
+
+SIZES = (125, 4096, 65536, 1 << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="websockets 帧掩码吞吐量基准测试")
+    parser.add_argument("--bytes-per-run", type=float, default=2e7, help="每轮测量处理的总字节数")
+    args = parser.parse_args()
+
+    imports = import_plugin_module("utils.imports")
+    imports.import_websockets()
+    from websockets import utils
+    try:
+        from websockets import speedups
+    except ImportError:
+        raise SystemExit("未找到适用于当前解释器的 speedups 扩展，请先运行 python scripts/build_speedups.py")
+
+    print(f"frames.apply_mask 使用: {'C扩展' if imports.websockets_speedups_enabled() else '纯Python实现'}")
+    print(f"{'负载':>10}  {'纯Python':>22}  {'C扩展':>22}  提升")
+    mask = os.urandom(4)
+    for size in SIZES:
+        data = os.urandom(size)
+        if utils.apply_mask(data, mask) != speedups.apply_mask(data, mask):
+            raise SystemExit(f"{size} B 负载的掩码结果不一致")
+        number = max(10, int(args.bytes_per_run // size))
+        python_time = best_of(lambda: utils.apply_mask(data, mask), number=number)
+        c_time = best_of(lambda: speedups.apply_mask(data, mask), number=number)
+        print(f"{size:>8} B  {python_time * 1e6:9.2f} us {size / python_time / 1e6:7.0f} MB/s"
+              f"  {c_time * 1e6:9.2f} us {size / c_time / 1e6:7.0f} MB/s  x{python_time / c_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
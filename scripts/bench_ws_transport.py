@@ -0,0 +1,121 @@
+"""
+WebSocket 传输参数基准测试（压缩开/关）
+
+在本机回环地址上启动一个模拟 NapCat 的服务端（支持 permessage-deflate），分别用
+websockets 默认参数、ws_transport 默认参数和开启压缩的参数连接，测量：
+- 大消息：连续接收若干个大群成员列表响应（约 1.3 MB）的耗时和吞吐量
+- 小消息：连续发送若干条聊天消息请求的耗时和速率
+以及整个过程的 CPU 时间。websockets 默认参数的 1 MB 消息上限会导致大消息接收失败。
+
+用法:
+    python scripts/bench_ws_transport.py
+    python scripts/bench_ws_transport.py --members 4000 --chat 5000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import time
+
+from _bench_support import import_plugin_module
+
+
+def cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Workload:
+    def __init__(self, members: int, chat: int, responses: int):
+        rng = random.Random(1)
+        member_list = [
+            {
+                "group_id": 712523104, "user_id": rng.randint(10 ** 8, 10 ** 10), "nickname": f"玩家{i}",
+                "card": f"Steve_{i}", "sex": "unknown", "age": 0, "area": "", "join_time": 1700000000 + i,
+                "last_sent_time": 1710000000 + i, "level": "1", "role": "member", "unfriendly": False,
+                "title": "", "title_expire_time": 0, "card_changeable": True, "shut_up_timestamp": 0,
+            }
+            for i in range(members)
+        ]
+        self.big = json.dumps({"status": "ok", "retcode": 0, "data": member_list,
+                               "echo": "get_group_member_list#x"}, ensure_ascii=False).encode("utf-8")
+        self.chat = [
+            json.dumps({"action": "send_group_msg",
+                        "params": {"group_id": 712523104, "message": f"[服务器] <Steve_{i}> 今天去挖钻石 {i}"},
+                        "echo": f"e{i}"}, ensure_ascii=False).encode("utf-8")
+            for i in range(chat)
+        ]
+        self.responses = responses
+
+    async def handler(self, websocket):
+        mode = await websocket.recv()
+        if mode == "big":
+            for _ in range(self.responses):
+                await websocket.send(self.big, text=True)
+        else:
+            received = 0
+            async for _ in websocket:
+                received += 1
+                if received == len(self.chat):
+                    await websocket.send("done")
+                    break
+        await websocket.wait_closed()
+
+
+async def run(websockets, workload: Workload, label: str, options: dict):
+    start_cpu = cpu_time()
+    async with websockets.serve(workload.handler, "127.0.0.1", 0, max_size=None, compression="deflate") as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+        async with websockets.connect(url, **options) as websocket:
+            extensions = ",".join(extension.name for extension in websocket.protocol.extensions) or "无"
+            await websocket.send("big")
+            start = time.perf_counter()
+            try:
+                for _ in range(workload.responses):
+                    await websocket.recv(decode=False)
+                elapsed = time.perf_counter() - start
+                total = workload.responses * len(workload.big)
+                big = f"{elapsed * 1e3:7.1f} ms ({total / elapsed / 1e6:5.0f} MB/s)"
+            except Exception as e:
+                big = f"失败 ({type(e).__name__})"
+
+        async with websockets.connect(url, **options) as websocket:
+            await websocket.send("chat")
+            start = time.perf_counter()
+            for message in workload.chat:
+                await websocket.send(message, text=True)
+            await websocket.recv()
+            elapsed = time.perf_counter() - start
+            chat = f"{elapsed * 1e3:6.1f} ms ({len(workload.chat) / elapsed:6.0f} 条/秒)"
+
+    print(f"  {label:22} 扩展: {extensions:18} 大消息 {big:22}  聊天 {chat}  CPU {cpu_time() - start_cpu:.2f} 秒")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="WebSocket 传输参数基准测试（压缩开/关）")
+    parser.add_argument("--members", type=int, default=4000, help="群成员列表响应中的成员数量")
+    parser.add_argument("--responses", type=int, default=20, help="连续接收的成员列表响应数量")
+    parser.add_argument("--chat", type=int, default=5000, help="连续发送的聊天消息数量")
+    args = parser.parse_args()
+
+    websockets = import_plugin_module("utils.imports").import_websockets()
+    WsTransportConfig = import_plugin_module("core.config_manager").WsTransportConfig
+    transport_options = import_plugin_module("websocket.client").transport_options
+
+    workload = Workload(args.members, args.chat, args.responses)
+    print(f"大消息 {args.responses} x {len(workload.big) / 1e6:.2f} MB，聊天消息 {len(workload.chat)} 条")
+    cases = [
+        ("websockets 默认参数", {}),
+        ("ws_transport 默认", transport_options(WsTransportConfig())),
+        ("压缩 level 1", transport_options(WsTransportConfig(compression=True, compression_level=1))),
+        ("压缩 level 6", transport_options(WsTransportConfig(compression=True, compression_level=6))),
+    ]
+    for label, options in cases:
+        await run(websockets, workload, label, options)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
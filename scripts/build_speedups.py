@@ -0,0 +1,97 @@
+"""
+编译内置 websockets 的 speedups C扩展（帧掩码加速）
+
+用当前解释器编译 src/endstone_qqsync_plugin/lib/websockets/speedups.c，
+输出 speedups<EXT_SUFFIX>（如 speedups.cpython-312-x86_64-linux-gnu.so）到同一目录。
+speedups.c 使用了非 Limited API 的宏，每个 CPython 版本需要单独编译一次。
+
+用法:
+    python scripts/build_speedups.py           # 失败时只打印警告
+    python scripts/build_speedups.py --strict  # 失败时返回非零（CI使用）
+    python scripts/build_speedups.py --force   # 忽略已有的编译结果
+"""
+
+import argparse
+import shlex
+import subprocess
+import sys
+import sysconfig
+from pathlib import Path
+from typing import Optional
+
+SPEEDUPS_DIR = (Path(__file__).resolve().parent.parent
+                / "src" / "endstone_qqsync_plugin" / "lib" / "websockets")
+SPEEDUPS_SOURCE = SPEEDUPS_DIR / "speedups.c"
+
+
+def output_path() -> Path:
+    """当前解释器对应的扩展文件路径"""
+    return SPEEDUPS_DIR / f"speedups{sysconfig.get_config_var('EXT_SUFFIX')}"
+
+
+def build_speedups(force: bool = False, log=print) -> Optional[Path]:
+    """
+    为当前解释器编译 speedups 扩展
+
+    Args:
+        force (bool): 已有不早于源码的编译结果时也重新编译
+        log: 输出信息的函数
+
+    Returns:
+        Path | None: 扩展文件路径，平台不支持或编译失败时返回 None
+    """
+    if not sys.platform.startswith("linux"):
+        log(f"跳过 speedups 编译：仅支持 Linux（当前 {sys.platform}）")
+        return None
+    if sys.implementation.name != "cpython":
+        log(f"跳过 speedups 编译：仅支持 CPython（当前 {sys.implementation.name}）")
+        return None
+
+    target = output_path()
+    if (not force and target.exists()
+            and target.stat().st_mtime >= SPEEDUPS_SOURCE.stat().st_mtime):
+        log(f"speedups 扩展已是最新: {target.name}")
+        return target
+
+    include_dir = sysconfig.get_paths()["include"]
+    if not (Path(include_dir) / "Python.h").exists():
+        log(f"跳过 speedups 编译：找不到 Python.h（{include_dir}），请安装 python3-dev")
+        return None
+
+    compiler = shlex.split(sysconfig.get_config_var("CC") or "cc")
+    temp_target = target.with_name(target.name + ".tmp")
+    command = compiler + [
+        "-shared", "-fPIC", "-O3", "-Wall",
+        f"-I{include_dir}",
+        str(SPEEDUPS_SOURCE),
+        "-o", str(temp_target),
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    except OSError as e:
+        log(f"speedups 编译失败：无法运行编译器 {compiler[0]}: {e}")
+        return None
+    if result.returncode != 0:
+        log(f"speedups 编译失败 (退出码 {result.returncode}):\n{result.stderr.strip()}")
+        temp_target.unlink(missing_ok=True)
+        return None
+
+    temp_target.replace(target)
+    log(f"已编译 speedups 扩展: {target.name}")
+    return target
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="编译内置 websockets 的 speedups C扩展")
+    parser.add_argument("--strict", action="store_true", help="编译失败或被跳过时返回非零")
+    parser.add_argument("--force", action="store_true", help="忽略已有的编译结果")
+    args = parser.parse_args()
+
+    target = build_speedups(force=args.force)
+    if target is None and args.strict:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,16 +3,31 @@ QQsync插件核心模块
 """
 
 # 核心模块导出
-from .config_manager import ConfigManager
+from .config_manager import ConfigManager, ConfigSnapshot, WsTransportConfig, ReverseWsConfig
 from .data_manager import DataManager
+from .player_record import PlayerRecord
+from .storage_backend import StorageBackend, JsonStorageBackend, SqliteStorageBackend
 from .verification_manager import VerificationManager
 from .permission_manager import PermissionManager
 from .event_handlers import EventHandlers
+from .online_players import OnlinePlayerIndex
+from .main_thread_bridge import MainThreadBridge
+from .group_members import GroupMemberCache
 
 __all__ = [
     "ConfigManager",
+    "ConfigSnapshot",
+    "WsTransportConfig",
+    "ReverseWsConfig",
     "DataManager", 
+    "PlayerRecord",
+    "StorageBackend",
+    "JsonStorageBackend",
+    "SqliteStorageBackend",
     "VerificationManager",
     "PermissionManager",
-    "EventHandlers"
+    "EventHandlers",
+    "OnlinePlayerIndex",
+    "MainThreadBridge",
+    "GroupMemberCache"
 ]
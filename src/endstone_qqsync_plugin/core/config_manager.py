@@ -4,8 +4,170 @@
 """
 
 import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from ..utils.message_utils import SensitiveWordFilter, build_sensitive_filter
+
+
+def _to_int_list(values) -> List[int]:
+    """将群号列表转换为整数列表，忽略无法解析的项"""
+    result = []
+    for value in values or []:
+        try:
+            result.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """
+    热路径配置的不可变快照
+    
+    每次加载或修改配置时整体替换，两个线程都可以无锁读取。
+    """
+    target_groups: FrozenSet[int]
+    target_group_list: Tuple[int, ...]      # 保持配置顺序，用于逐群发送
+    group_names: Mapping[str, str]
+    admins: FrozenSet[str]
+    enable_qq_to_game: bool
+    enable_game_to_qq: bool
+    force_bind_qq: bool
+    sync_group_card: bool
+    check_group_member: bool
+    api_qq_enable: bool
+    chat_count_limit: int
+    chat_ban_time: int
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ConfigSnapshot":
+        group_list = tuple(dict.fromkeys(_to_int_list(config.get("target_groups", []))))
+        group_names = config.get("group_names") or {}
+        return cls(
+            target_groups=frozenset(group_list),
+            target_group_list=group_list,
+            group_names=MappingProxyType({str(k): str(v) for k, v in group_names.items()}),
+            admins=frozenset(str(qq).strip() for qq in config.get("admins", []) or []),
+            enable_qq_to_game=bool(config.get("enable_qq_to_game", True)),
+            enable_game_to_qq=bool(config.get("enable_game_to_qq", True)),
+            force_bind_qq=bool(config.get("force_bind_qq", True)),
+            sync_group_card=bool(config.get("sync_group_card", True)),
+            check_group_member=bool(config.get("check_group_member", True)),
+            api_qq_enable=bool(config.get("api_qq_enable", False)),
+            chat_count_limit=int(config.get("chat_count_limit", 20)),
+            chat_ban_time=int(config.get("chat_ban_time", 300)),
+        )
+    
+    def get_group_name(self, group_id) -> str:
+        """获取群组显示名称，未配置时返回空字符串"""
+        return self.group_names.get(str(group_id), "")
+
+
+def _optional_limit(value, default: Optional[int], minimum: int) -> Optional[int]:
+    """解析大小限制：null 或 0 表示不限制，无法解析时使用默认值"""
+    if value is None or value == 0:
+        return None
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True, slots=True)
+class WsTransportConfig:
+    """
+    WebSocket传输参数（对应配置项 ws_transport）
+    
+    默认值针对与 NapCat 同机（回环地址）连接：带宽充足，permessage-deflate 只会增加CPU开销，
+    因此默认关闭压缩；入站消息上限放宽到 16MB，避免大群的成员列表响应超出 1MB 默认上限导致断线。
+    """
+    compression: bool = False
+    compression_level: int = 1            # zlib 压缩级别 1-9，仅在启用压缩时生效
+    max_size: Optional[int] = 16 * 2**20  # 单条入站消息最大字节数，None 表示不限制
+    max_queue: Optional[int] = 64         # 接收缓冲的最大帧数，None 表示不限制
+    write_limit: int = 2**17              # 写缓冲高水位（字节），超过后发送方等待
+    ping_interval: float = 10.0           # ping间隔（秒），用于发现已失效的连接
+    ping_timeout: float = 5.0             # ping超时（秒），超时后断开并切换/重连
+    
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "WsTransportConfig":
+        section = section or {}
+        defaults = cls()
+        try:
+            level = min(9, max(1, int(section.get("compression_level", defaults.compression_level))))
+        except (TypeError, ValueError):
+            level = defaults.compression_level
+        try:
+            write_limit = max(0, int(section.get("write_limit", defaults.write_limit)))
+        except (TypeError, ValueError):
+            write_limit = defaults.write_limit
+        try:
+            ping_interval = max(1.0, float(section.get("ping_interval", defaults.ping_interval)))
+            ping_timeout = max(1.0, float(section.get("ping_timeout", defaults.ping_timeout)))
+        except (TypeError, ValueError):
+            ping_interval, ping_timeout = defaults.ping_interval, defaults.ping_timeout
+        return cls(
+            compression=bool(section.get("compression", defaults.compression)),
+            compression_level=level,
+            max_size=_optional_limit(section.get("max_size", defaults.max_size), defaults.max_size, 2**16),
+            max_queue=_optional_limit(section.get("max_queue", defaults.max_queue), defaults.max_queue, 1),
+            write_limit=write_limit,
+            ping_interval=ping_interval,
+            ping_timeout=ping_timeout,
+        )
+    
+    def describe(self) -> str:
+        """用于日志的简短描述"""
+        compression = f"deflate(level={self.compression_level})" if self.compression else "关闭"
+        max_size = f"{self.max_size // 1024}KB" if self.max_size else "不限"
+        max_queue = self.max_queue if self.max_queue else "不限"
+        return (f"压缩: {compression}, 最大消息: {max_size}, "
+                f"接收队列: {max_queue}帧, 写缓冲: {self.write_limit // 1024}KB, "
+                f"ping: {self.ping_interval:g}秒/超时{self.ping_timeout:g}秒")
+
+
+@dataclass(frozen=True, slots=True)
+class ReverseWsConfig:
+    """
+    反向WS服务端参数（对应配置项 reverse_ws）
+    
+    启用后插件在 host:port 上监听，由 OneBot 实现主动连接（Universal 角色），
+    此时不再主动连接 napcat_ws 中的地址。
+    """
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8080
+    path: str = "/onebot/v11/ws"
+    access_token: str = ""                # 为空时使用全局 access_token
+    
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]], default_token: str = "") -> "ReverseWsConfig":
+        section = section or {}
+        defaults = cls()
+        try:
+            port = int(section.get("port", defaults.port))
+            if not 0 < port < 65536:
+                raise ValueError(port)
+        except (TypeError, ValueError):
+            port = defaults.port
+        path = str(section.get("path", defaults.path) or "/").strip()
+        if not path.startswith("/"):
+            path = "/" + path
+        return cls(
+            enabled=bool(section.get("enabled", defaults.enabled)),
+            host=str(section.get("host", defaults.host) or defaults.host).strip(),
+            port=port,
+            path=path.rstrip("/") or "/",
+            access_token=str(section.get("access_token") or default_token or ""),
+        )
+    
+    @property
+    def url(self) -> str:
+        """供 OneBot 实现填写的连接地址"""
+        return f"ws://{self.host}:{self.port}{self.path}"
 
 
 class ConfigManager:
@@ -18,9 +180,12 @@ class ConfigManager:
         self.custom_ban_words_file = data_folder / "custom_ban_words.txt"
         self._config: Dict[str, Any] = {}
         self._color_format = None
+        self._sensitive_filter: SensitiveWordFilter = None
+        self._snapshot: ConfigSnapshot = None
         self.default_config = {
             "napcat_ws": "ws://127.0.0.1:3001",
             "access_token": "",
+            "endpoint_mode": "failover",
             "target_groups": ["712523104"],
             "group_names": {},
             "admins": ["2899659758"],
@@ -31,7 +196,32 @@ class ConfigManager:
             "check_group_member": True,
             "chat_count_limit": 20,
             "chat_ban_time": 300,
-            "api_qq_enable": False
+            "api_qq_enable": False,
+            "storage_backend": "json",
+            "outbound_queue": {
+                "rate_per_group": 1.0,
+                "burst_per_group": 5,
+                "chat_merge_window": 0.3,
+                "max_age": 60,
+                "max_buffered": 200,
+                "flush_rate": 3.0
+            },
+            "reverse_ws": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 8080,
+                "path": "/onebot/v11/ws",
+                "access_token": ""
+            },
+            "ws_transport": {
+                "compression": False,
+                "compression_level": 1,
+                "max_size": 16777216,
+                "max_queue": 64,
+                "write_limit": 131072,
+                "ping_interval": 10,
+                "ping_timeout": 5
+            }
         }
         self._init_config()
         self._init_custom_ban_words()
@@ -88,6 +278,7 @@ class ConfigManager:
         
         # 生成动态帮助信息
         self._config["help_msg"] = self._generate_help_message()
+        self._rebuild_snapshot()
         
         # 如果有新配置项，保存到文件
         if config_updated:
@@ -119,6 +310,9 @@ class ConfigManager:
         except Exception as e:
             self.logger.error(f"读取自定义封禁词文件失败: {e}")
             self.custom_ban_words = []
+        
+        # 预构建敏感词过滤器（内置词 + 自定义词），仅在加载/重载配置时重建
+        self._sensitive_filter = build_sensitive_filter(self.custom_ban_words)
     
     def _get_help_commands(self, include_bind: bool = True, include_admin: bool = False, mark_sections: bool = False) -> str:
         """获取帮助命令文本的通用方法"""
@@ -225,6 +419,7 @@ class ConfigManager:
     def set_config(self, key: str, value: Any):
         """设置配置项"""
         self._config[key] = value
+        self._rebuild_snapshot()
     
     def save_config(self):
         """保存配置到文件"""
@@ -268,6 +463,7 @@ class ConfigManager:
             
             # 重新生成动态帮助信息
             self._config["help_msg"] = self._generate_help_message()
+            self._rebuild_snapshot()
             
             # 如果有新配置项，保存到文件
             if config_updated:
@@ -284,10 +480,66 @@ class ConfigManager:
             self.logger.error(f"重新加载配置失败: {e}")
             return False
     
+    def _rebuild_snapshot(self):
+        """重建配置快照（整体替换引用，读取方无需加锁）"""
+        try:
+            self._snapshot = ConfigSnapshot.from_config(self._config)
+        except Exception as e:
+            self.logger.error(f"生成配置快照失败，保留旧快照: {e}")
+            if self._snapshot is None:
+                self._snapshot = ConfigSnapshot.from_config(self.default_config)
+    
+    def get_napcat_endpoints(self) -> List[Tuple[str, str]]:
+        """
+        获取 NapCat WS 端点列表
+        
+        napcat_ws 可以是单个地址、地址列表，或 {"url": ..., "access_token": ...} 对象列表；
+        未单独指定 access_token 的端点使用全局 access_token
+        
+        Returns:
+            list: [(地址, 访问令牌), ...]，按配置顺序（第一个为主连接）
+        """
+        default_token = self._config.get("access_token", "") or ""
+        entries = self._config.get("napcat_ws")
+        if not isinstance(entries, list):
+            entries = [entries]
+        endpoints = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                url = str(entry.get("url", "") or "").strip()
+                token = entry.get("access_token", default_token) or ""
+            else:
+                url = str(entry or "").strip()
+                token = default_token
+            if not url:
+                continue
+            if any(url == existing for existing, _ in endpoints):
+                self.logger.warning(f"忽略重复的 NapCat WS 地址: {url}")
+                continue
+            endpoints.append((url, str(token)))
+        return endpoints
+    
+    def get_reverse_ws(self) -> ReverseWsConfig:
+        """获取反向WS服务端参数（未单独配置令牌时使用全局 access_token）"""
+        return ReverseWsConfig.from_config(self._config.get("reverse_ws"), self._config.get("access_token", ""))
+    
+    def get_ws_transport(self) -> WsTransportConfig:
+        """获取WebSocket传输参数（缺失或无效的项使用默认值）"""
+        return WsTransportConfig.from_config(self._config.get("ws_transport"))
+    
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """获取当前配置快照"""
+        return self._snapshot
+    
     def get_custom_ban_words(self) -> List[str]:
         """获取自定义封禁词列表"""
         return self.custom_ban_words.copy()
     
+    def filter_sensitive_content(self, text: str) -> tuple:
+        """使用预构建的过滤器过滤敏感内容，返回 (过滤后的文本, 是否包含敏感内容)"""
+        return self._sensitive_filter.filter(text)
+    
     @property
     def config(self) -> Dict[str, Any]:
         """获取完整配置"""
@@ -3,11 +3,30 @@
 负责QQ绑定数据的存储、查询和管理
 """
 
-import json
+import functools
+import threading
 import time
+from dataclasses import replace
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Any
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Set
 from ..utils.time_utils import TimeUtils
+from .player_record import PlayerRecord
+from .storage_backend import SaveWorker, create_storage_backend
+
+
+# 在线时间统计所需的字段（旧版本数据可能缺失）
+_REQUIRED_FIELDS = frozenset(("total_playtime", "last_join_time", "last_quit_time", "session_count"))
+
+
+def _locked(method):
+    """在数据锁内执行方法（绑定数据会同时被主线程和WebSocket线程修改）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class DataManager:
@@ -18,60 +37,83 @@ class DataManager:
         self.data_folder = data_folder
         self.logger = logger
         self.binding_file = data_folder / "data.json"
-        self._binding_data: Dict[str, Any] = {}
+        self._binding_data: Dict[str, PlayerRecord] = {}
+        self._binding_view: Mapping[str, PlayerRecord] = MappingProxyType(self._binding_data)
+        # binding_data 的导出缓存（玩家名 → to_dict() 结果），修改过的记录在下次访问时重新导出
+        self._export_cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._export_stale: Set[str] = set()
+        self._lock = threading.RLock()       # 保护绑定数据的修改与快照
+        self._save_lock = threading.Lock()   # 串行化写盘操作
+        
+        # 脏记录跟踪：只持久化上次成功写入后修改过的记录
+        self._dirty: Set[str] = set()        # 已修改的玩家名
+        self._removed: Set[str] = set()      # 已删除的玩家名
+        self.save_stats: Dict[str, int] = {
+            "performed": 0,        # 实际执行的写入次数
+            "skipped": 0,          # 因无变更而跳过的写入次数
+            "records_written": 0   # 累计写入的记录数
+        }
+        
+        # 存储后端（默认JSON文件，可配置为SQLite）
+        backend_name = plugin.config_manager.get_config("storage_backend", "json")
+        self.storage = create_storage_backend(backend_name, data_folder, logger)
         self._auto_save_enabled = True
         
+        # 反向索引（避免每次查询都全量扫描绑定数据）
+        self._qq_index: Dict[str, str] = {}          # 当前绑定QQ → 玩家名
+        self._qq_history_index: Dict[str, str] = {}  # 历史QQ(original_qq/previous_qq) → 玩家名
+        self._xuid_index: Dict[str, str] = {}        # XUID → 玩家名
+        # 各值被多少条记录持有：重复值时索引指向首个记录，移除时据此判断是否需要改指向其他记录
+        self._qq_counts: Dict[str, int] = {}
+        self._qq_history_counts: Dict[str, int] = {}
+        self._xuid_counts: Dict[str, int] = {}
+        self._indexed_keys: Dict[str, tuple] = {}    # 玩家名 → 加入索引时的键
+        
         # 新的计时器系统变量
         self._online_timer_start_times: Dict[str, int] = {}  # 玩家在线计时开始时间
         self._last_timer_update: int = 0  # 上次计时器更新时间
         
         self._init_binding_data()
+        
+        # 后台保存线程（序列化和写盘不在服务器主线程执行）
+        self._save_worker = SaveWorker(self._persist, logger, delay=2)
     
     def _init_binding_data(self):
-        """初始化QQ绑定数据文件"""
-        # 如果绑定数据文件不存在，创建空数据
-        if not self.binding_file.exists():
-            self.binding_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.binding_file, 'w', encoding='utf-8') as f:
-                json.dump({}, f, indent=2, ensure_ascii=False)
-            self.logger.info(f"已创建QQ绑定数据文件: {self.binding_file}")
-        
-        # 读取绑定数据
+        """初始化QQ绑定数据"""
+        # 读取绑定数据（JSON后端在文件不存在时自动创建空数据）
         try:
-            with open(self.binding_file, 'r', encoding='utf-8') as f:
-                self._binding_data = json.load(f)
+            raw_data = self.storage.load()
         except Exception as e:
             self.logger.error(f"读取QQ绑定数据失败: {e}")
-            self._binding_data = {}
+            raw_data = {}
+        
+        # 转换为 PlayerRecord，缺失统计字段的旧记录会补上默认值，标记后写回
+        self._binding_data.clear()
+        self._export_cache = None
+        for player_name, data in raw_data.items():
+            if not _REQUIRED_FIELDS.issubset(data):
+                self._dirty.add(player_name)
+            self._binding_data[player_name] = PlayerRecord.from_dict(data)
         
         # 更新旧数据结构兼容性
         self._update_data_structure()
         
+        # 构建反向索引
+        self._rebuild_indexes()
+        
         from endstone import ColorFormat
-        self.logger.info(f"{ColorFormat.AQUA}QQ绑定数据已加载，已绑定玩家: {len(self._binding_data)}{ColorFormat.RESET}")
+        self.logger.info(f"{ColorFormat.AQUA}QQ绑定数据已加载 ({self.storage.name})，已绑定玩家: {len(self._binding_data)}{ColorFormat.RESET}")
     
     def _update_data_structure(self):
         """更新数据结构以保持兼容性"""
-        data_updated = False
+        # 旧数据缺少统计字段（已在加载时补全）
+        data_updated = bool(self._dirty)
         invalid_bindings = []
         
         for player_name, data in self._binding_data.items():
-            # 添加缺失的字段
-            required_fields = {
-                "total_playtime": 0,
-                "last_join_time": None,
-                "last_quit_time": None,
-                "session_count": 0
-            }
-            
-            for field, default_value in required_fields.items():
-                if field not in data:
-                    data[field] = default_value
-                    data_updated = True
-            
             # 检查并清理无效的QQ绑定
-            qq_number = data.get("qq", "")
-            bind_time = data.get("bind_time", 0)
+            qq_number = data.qq
+            bind_time = data.bind_time
             
             # 只清理那些QQ为空且没有绑定时间的记录
             if (not qq_number or not qq_number.strip()) and not bind_time:
@@ -81,6 +123,7 @@ class DataManager:
         # 清理无效绑定
         for player_name in invalid_bindings:
             del self._binding_data[player_name]
+            self._mark_removed(player_name)
             data_updated = True
         
         if invalid_bindings:
@@ -93,58 +136,163 @@ class DataManager:
             else:
                 self.logger.info("已更新绑定数据结构以支持在线时间统计")
     
-    def save_data(self):
-        """保存QQ绑定数据到文件"""
-        try:
-            # 创建临时文件，避免写入过程中的数据损坏
-            temp_file = self.binding_file.with_suffix('.tmp')
-            
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self._binding_data, f, indent=2, ensure_ascii=False)
+    # 反向索引相关方法
+    @staticmethod
+    def _index_keys(data) -> tuple:
+        """记录在三个反向索引中的键：(当前QQ, 历史QQ, XUID)，每项为元组"""
+        qq_number = (data.qq or "").strip()
+        history = tuple(dict.fromkeys(qq for qq in (data.original_qq, data.previous_qq) if qq))
+        return (qq_number,) if qq_number else (), history, (data.xuid,) if data.xuid else ()
+    
+    def _index_tables(self) -> tuple:
+        """(索引, 计数) 对，顺序与 _index_keys 的返回值一致"""
+        return ((self._qq_index, self._qq_counts),
+                (self._qq_history_index, self._qq_history_counts),
+                (self._xuid_index, self._xuid_counts))
+    
+    def _index_player(self, player_name: str):
+        """将玩家记录加入反向索引（已加入过的先移除旧键）"""
+        self._unindex_player(player_name)
+        data = self._binding_data.get(player_name)
+        if not data:
+            return
+        
+        keys = self._index_keys(data)
+        self._indexed_keys[player_name] = keys
+        for position, ((index, counts), values) in enumerate(zip(self._index_tables(), keys)):
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+                if index.setdefault(value, player_name) != player_name:
+                    # 重复值：与线性扫描一致，指向记录顺序中的首个持有者
+                    index[value] = self._first_holder(position, value)
+    
+    def _unindex_player(self, player_name: str):
+        """按加入索引时的键移除该玩家（与记录当前内容无关，修改或覆盖记录前调用）"""
+        keys = self._indexed_keys.pop(player_name, None)
+        if keys is None:
+            return
+        
+        for position, ((index, counts), values) in enumerate(zip(self._index_tables(), keys)):
+            for value in values:
+                remaining = counts[value] - 1
+                if not remaining:
+                    del counts[value]
+                    del index[value]
+                    continue
+                counts[value] = remaining
+                if index[value] == player_name:
+                    index[value] = self._first_holder(position, value)
+    
+    def _first_holder(self, position: int, value: str) -> str:
+        """按记录顺序查找持有该值的首个玩家（只有重复值才需要查找，唯一值的增删都是O(1)）"""
+        for player_name in self._binding_data:
+            keys = self._indexed_keys.get(player_name)
+            if keys and value in keys[position]:
+                return player_name
+        raise KeyError(value)
+    
+    def _rebuild_indexes(self):
+        """按记录顺序全量重建反向索引（重复值保留首个匹配，与线性扫描结果一致）"""
+        self._qq_index, self._qq_history_index, self._xuid_index = {}, {}, {}
+        self._qq_counts, self._qq_history_counts, self._xuid_counts = {}, {}, {}
+        self._indexed_keys = {}
+        for player_name, data in self._binding_data.items():
+            if not data:
+                continue
+            keys = self._index_keys(data)
+            self._indexed_keys[player_name] = keys
+            for (index, counts), values in zip(self._index_tables(), keys):
+                for value in values:
+                    index.setdefault(value, player_name)
+                    counts[value] = counts.get(value, 0) + 1
+    
+    @_locked
+    def check_index_consistency(self) -> bool:
+        """检查反向索引与绑定数据是否一致，不一致时以重建结果为准"""
+        current = self._index_tables()
+        self._rebuild_indexes()
+        if current == self._index_tables():
+            return True
+        
+        self.logger.warning("检测到绑定数据反向索引不一致，已自动重建")
+        return False
+    
+    def _mark_dirty(self, player_name: str):
+        """标记玩家记录已修改"""
+        self._dirty.add(player_name)
+        self._removed.discard(player_name)
+        self._export_stale.add(player_name)
+    
+    def _mark_removed(self, player_name: str):
+        """标记玩家记录已删除"""
+        self._removed.add(player_name)
+        self._dirty.discard(player_name)
+        if self._export_cache is not None:
+            self._export_cache.pop(player_name, None)
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """在锁内将当前绑定数据转换为JSON字典"""
+        with self._lock:
+            return {name: data.to_dict() for name, data in self._binding_data.items()}
+    
+    def _persist(self, full: bool = False):
+        """将上次写入后修改过的记录写入存储后端（失败时抛出异常，脏标记会保留）"""
+        with self._save_lock:
+            with self._lock:
+                dirty, removed = self._dirty, self._removed
+                if not dirty and not removed and not full:
+                    self.save_stats["skipped"] += 1
+                    return
+                self._dirty, self._removed = set(), set()
+                changed = {name: self._binding_data[name].to_dict() for name in dirty if name in self._binding_data}
             
-            # 原子性替换文件
-            temp_file.replace(self.binding_file)
+            try:
+                if full:
+                    self.storage.save_all(self._snapshot())
+                else:
+                    self.storage.save_changes(changed, removed, self._snapshot)
+            except Exception:
+                # 写入失败，恢复脏标记以便下次重试
+                with self._lock:
+                    for name in dirty:
+                        if name not in self._removed:
+                            self._dirty.add(name)
+                    for name in removed:
+                        if name not in self._binding_data:
+                            self._removed.add(name)
+                raise
             
+            self.save_stats["performed"] += 1
+            self.save_stats["records_written"] += len(self._binding_data) if full else len(changed) + len(removed)
+    
+    def save_data(self):
+        """同步完整保存QQ绑定数据到存储后端（用于初始化或回退，热路径请使用 trigger_save）"""
+        try:
+            self._persist(full=True)
         except Exception as e:
             self.logger.error(f"保存QQ绑定数据失败: {e}")
-            # 如果临时文件存在，清理它
-            temp_file = self.binding_file.with_suffix('.tmp')
-            if temp_file.exists():
-                try:
-                    temp_file.unlink()
-                except:
-                    pass
+    
+    def get_save_stats(self) -> Dict[str, int]:
+        """获取保存统计（执行/跳过次数与累计写入记录数）"""
+        return dict(self.save_stats)
     
     def trigger_save(self, reason: str = "数据变更"):
-        """触发数据保存（防抖合并，降低高频写盘 I/O 开销）"""
+        """触发数据保存（由后台线程合并执行，降低高频写盘对主线程的影响）"""
         if not self._auto_save_enabled:
             return
-            
-        # 取消前一次排队的保存动作以实现防抖
-        if hasattr(self, '_save_task') and self._save_task:
-            try:
-                self._save_task.cancel()
-            except Exception:
-                pass
-                
-        def do_save():
-            try:
-                self.save_data()
-                self.logger.info(f"合并数据保存成功: {reason}")
-            except Exception as e:
-                self.logger.error(f"合并数据保存失败: {e}")
-            finally:
-                self._save_task = None
-                
-        try:
-            self._save_task = self.plugin.server.scheduler.run_task(
-                self.plugin,
-                do_save,
-                delay=40 # 2 秒延迟
-            )
-        except Exception as e:
-            self.logger.warning(f"调度延迟存盘失败，回退到同步保存: {e}")
-            self.save_data()
+        self._save_worker.request(reason)
+    
+    def flush(self, timeout: float = 10) -> bool:
+        """立即写入所有待保存的数据并等待完成"""
+        return self._save_worker.flush(timeout)
+    
+    def close(self):
+        """停止后台保存并关闭存储后端（在插件禁用时调用）"""
+        self._save_worker.stop()
+        self.storage.close()
+        
+        stats = self.save_stats
+        self.logger.info(f"数据保存统计: 写入 {stats['performed']} 次，跳过 {stats['skipped']} 次，累计写入 {stats['records_written']} 条记录")
     
     # 玩家绑定相关方法
     def is_player_bound(self, player_name: str, player_xuid: str = None) -> bool:
@@ -153,56 +301,61 @@ class DataManager:
         if player_xuid:
             player_data = self._get_player_by_xuid(player_xuid)
             if player_data:
-                qq_number = player_data.get("qq", "")
+                qq_number = player_data.qq
                 return bool(qq_number and qq_number.strip())
             else:
                 # 通过XUID没有找到，继续用玩家名查找（向后兼容）
-                if player_name in self._binding_data:
-                    qq_number = self._binding_data[player_name].get("qq", "")
+                player_data = self._binding_data.get(player_name)
+                if player_data is not None:
+                    qq_number = player_data.qq
                     return bool(qq_number and qq_number.strip())
                 return False
         
         # 仅基于玩家名的检查
-        if player_name not in self._binding_data:
+        player_data = self._binding_data.get(player_name)
+        if player_data is None:
             return False
         
-        qq_number = self._binding_data[player_name].get("qq", "")
+        qq_number = player_data.qq
         return bool(qq_number and qq_number.strip())
     
-    def _get_player_by_xuid(self, xuid: str) -> Dict[str, Any]:
-        """根据XUID获取玩家绑定信息"""
-        for name, data in self._binding_data.items():
-            if data.get("xuid") == xuid:
-                return data
-        return {}
+    def _get_player_by_xuid(self, xuid: str) -> Optional[PlayerRecord]:
+        """根据XUID获取玩家记录（未找到时返回None）"""
+        if not xuid:
+            return None
+        name = self._xuid_index.get(xuid)
+        if name is None:
+            return None
+        return self._binding_data.get(name)
     
     def get_player_qq(self, player_name: str) -> str:
         """获取玩家绑定的QQ号"""
-        return self._binding_data.get(player_name, {}).get("qq", "")
+        player_data = self._binding_data.get(player_name)
+        return player_data.qq if player_data is not None else ""
     
     def get_qq_player(self, qq_number: str) -> str:
         """根据QQ号获取绑定的玩家名"""
-        for name, data in self._binding_data.items():
-            current_qq = data.get("qq", "")
-            if current_qq and current_qq.strip() == qq_number:
-                return name
-        return ""
+        if not qq_number:
+            return ""
+        return self._qq_index.get(qq_number, "")
     
     def get_qq_player_history(self, qq_number: str) -> str:
         """根据QQ号获取历史绑定的玩家名（包括已解绑的）"""
-        for name, data in self._binding_data.items():
-            # 首先检查当前绑定的QQ号
-            if data.get("qq") == qq_number:
-                return name
-            # 检查原QQ号（用于被解绑或封禁的玩家历史查询）
-            if data.get("original_qq") == qq_number:
-                return name
-        return ""
+        if not qq_number:
+            return ""
+        # 首先检查当前绑定的QQ号
+        name = self._qq_index.get(qq_number)
+        if name:
+            return name
+        # 检查原QQ号（用于被解绑、封禁或换绑的玩家历史查询）
+        return self._qq_history_index.get(qq_number, "")
     
     def get_player_by_xuid(self, xuid: str) -> Dict[str, Any]:
-        """根据XUID获取玩家绑定信息"""
-        return self._get_player_by_xuid(xuid)
+        """根据XUID获取玩家绑定信息的字典副本（未找到时返回空字典）"""
+        record = self._get_player_by_xuid(xuid)
+        return record.to_dict() if record is not None else {}
     
+    @_locked
     def bind_player_qq(self, player_name: str, player_xuid: str, qq_number: str) -> bool:
         """绑定玩家QQ"""
         # 验证参数
@@ -223,75 +376,86 @@ class DataManager:
         if player_name in self._binding_data:
             # 保留现有的游戏数据，更新绑定信息
             player_data = self._binding_data[player_name]
-            old_qq = player_data.get("qq", "")
+            old_qq = player_data.qq
+            self._unindex_player(player_name)
             
             # 更新绑定信息
-            player_data["qq"] = qq_clean
-            player_data["xuid"] = player_xuid
+            player_data.qq = qq_clean
+            player_data.xuid = player_xuid
             
             if old_qq:
                 # 重新绑定
-                player_data["rebind_time"] = int(TimeUtils.get_timestamp())
-                player_data["previous_qq"] = old_qq
+                player_data.rebind_time = int(TimeUtils.get_timestamp())
+                player_data.previous_qq = old_qq
                 self.logger.info(f"玩家 {player_name} 重新绑定QQ: {old_qq} → {qq_clean}")
             else:
                 # 首次绑定或解绑后重新绑定
                 if "unbind_time" in player_data:
-                    player_data["rebind_time"] = int(TimeUtils.get_timestamp())
+                    player_data.rebind_time = int(TimeUtils.get_timestamp())
                     self.logger.info(f"玩家 {player_name} 解绑后重新绑定QQ: {qq_clean}")
                 else:
-                    player_data["bind_time"] = int(TimeUtils.get_timestamp())
+                    player_data.bind_time = int(TimeUtils.get_timestamp())
                     self.logger.info(f"玩家 {player_name} 首次绑定QQ: {qq_clean}")
         else:
             # 全新的玩家数据
-            self._binding_data[player_name] = {
-                "name": player_name,
-                "xuid": player_xuid,
-                "qq": qq_clean,
-                "bind_time": int(TimeUtils.get_timestamp()),
-                "total_playtime": 0,
-                "last_join_time": None,
-                "last_quit_time": None,
-                "session_count": 0
-            }
+            self._binding_data[player_name] = PlayerRecord(
+                name=player_name,
+                xuid=player_xuid,
+                qq=qq_clean,
+                bind_time=int(TimeUtils.get_timestamp())
+            )
             self.logger.info(f"玩家 {player_name} 已绑定QQ: {qq_clean}")
         
+        self._index_player(player_name)
+        self._mark_dirty(player_name)
         self.trigger_save(f"绑定QQ: {player_name} → {qq_clean}")
         return True
     
+    @_locked
     def unbind_player_qq(self, player_name: str, admin_name: str = "system") -> bool:
         """解绑玩家QQ（保留游戏数据）"""
         if player_name not in self._binding_data:
             return False
         
         player_data = self._binding_data[player_name]
-        original_qq = player_data.get("qq", "")
+        original_qq = player_data.qq
         
         if not original_qq or not original_qq.strip():
             return False
         
         # 保留所有游戏数据，只清空QQ相关信息
-        player_data["qq"] = ""
-        player_data["unbind_time"] = int(TimeUtils.get_timestamp())
-        player_data["unbind_by"] = admin_name
-        player_data["original_qq"] = original_qq
+        self._unindex_player(player_name)
+        player_data.qq = ""
+        player_data.unbind_time = int(TimeUtils.get_timestamp())
+        player_data.unbind_by = admin_name
+        player_data.original_qq = original_qq
+        self._index_player(player_name)
+        self._mark_dirty(player_name)
         
         self.trigger_save(f"解绑QQ: {player_name} (原QQ: {original_qq})")
         self.logger.info(f"玩家 {player_name} 的QQ绑定已被 {admin_name} 解除 (原QQ: {original_qq})，游戏数据已保留")
         return True
     
+    @_locked
     def update_player_name(self, old_name: str, new_name: str, xuid: str) -> bool:
         """更新玩家名称（处理改名情况）"""
         if old_name in self._binding_data:
-            # 保存原有数据
-            player_data = self._binding_data[old_name].copy()
-            # 更新名称
-            player_data["name"] = new_name
-            player_data["last_name_update"] = int(TimeUtils.get_timestamp())
+            # 复制原有数据并更新名称
+            player_data = replace(
+                self._binding_data[old_name],
+                name=new_name,
+                last_name_update=int(TimeUtils.get_timestamp())
+            )
             
-            # 删除旧记录，添加新记录
+            # 删除旧记录，添加新记录（新名称已有记录时会被覆盖，需先移除其索引）
+            if new_name != old_name:
+                self._unindex_player(new_name)
+            self._unindex_player(old_name)
             del self._binding_data[old_name]
             self._binding_data[new_name] = player_data
+            self._index_player(new_name)
+            self._mark_removed(old_name)
+            self._mark_dirty(new_name)
             
             self.trigger_save(f"玩家改名: {old_name} → {new_name}")
             self.logger.info(f"玩家改名: {old_name} → {new_name} (XUID: {xuid})")
@@ -299,41 +463,43 @@ class DataManager:
         return False
     
     # 游戏统计相关方法
+    @_locked
     def update_player_join(self, player_name: str, player_xuid: str = None):
         """更新玩家加入时间和进服次数（为所有玩家记录，不检查QQ绑定）"""
         current_time = int(TimeUtils.get_timestamp())
         
         # 确保玩家数据存在，如果不存在则创建
-        if player_name not in self._binding_data:
-            self._binding_data[player_name] = {
-                "name": player_name,
-                "xuid": player_xuid or "",
-                "qq": "",
-                "total_playtime": 0,
-                "last_join_time": current_time,
-                "last_quit_time": None,
-                "session_count": 0
-            }
+        player_data = self._binding_data.get(player_name)
+        if player_data is None:
+            player_data = self._binding_data[player_name] = PlayerRecord(
+                name=player_name,
+                xuid=player_xuid or "",
+                last_join_time=current_time
+            )
         
         # 更新加入时间和会话计数
-        self._binding_data[player_name]["last_join_time"] = current_time
-        self._binding_data[player_name]["session_count"] = self._binding_data[player_name].get("session_count", 0) + 1
+        player_data.last_join_time = current_time
+        player_data.session_count = (player_data.session_count or 0) + 1
         
         # 更新XUID（如果提供了新的XUID）
-        if player_xuid and not self._binding_data[player_name].get("xuid"):
-            self._binding_data[player_name]["xuid"] = player_xuid
+        if player_xuid and not player_data.xuid:
+            player_data.xuid = player_xuid
         
+        self._index_player(player_name)
+        self._mark_dirty(player_name)
         self.trigger_save(f"玩家加入: {player_name}")
     
+    @_locked
     def update_player_quit(self, player_name: str):
         """更新玩家离开时间（为所有玩家记录，不检查QQ绑定，不处理在线时长累计）"""
         if player_name not in self._binding_data:
             return
         
         current_time = int(TimeUtils.get_timestamp())
-        self._binding_data[player_name]["last_quit_time"] = current_time
+        self._binding_data[player_name].last_quit_time = current_time
         
         # 注意：在线时长累计现在由计时器系统处理，这里只记录退出时间
+        self._mark_dirty(player_name)
         
         self.trigger_save(f"玩家离开: {player_name}")
     
@@ -345,7 +511,7 @@ class DataManager:
         data = self._binding_data[player_name]
         
         current_time = int(TimeUtils.get_timestamp())
-        total_playtime = data.get("total_playtime", 0)
+        total_playtime = data.total_playtime or 0
         
         # 检查玩家是否在线且正在计时
         is_online = False
@@ -359,70 +525,69 @@ class DataManager:
         
         return {
             "total_playtime": total_with_current,
-            "session_count": data.get("session_count", 0),
-            "last_join_time": data.get("last_join_time"),
-            "last_quit_time": data.get("last_quit_time"),
+            "session_count": data.session_count or 0,
+            "last_join_time": data.last_join_time,
+            "last_quit_time": data.last_quit_time,
             "is_online": is_online,
             "current_session_time": current_session_time,
-            "bind_time": data.get("bind_time")
+            "bind_time": data.bind_time
         }
     
     # 封禁相关方法
     def is_player_banned(self, player_name: str) -> bool:
         """检查玩家是否被封禁"""
-        if player_name not in self._binding_data:
+        player_data = self._binding_data.get(player_name)
+        if player_data is None:
             return False
-        return self._binding_data[player_name].get("is_banned", False)
+        return bool(player_data.is_banned)
     
+    @_locked
     def ban_player(self, player_name: str, admin_name: str = "system", reason: str = "") -> bool:
         """封禁玩家"""
         # 确保玩家数据存在
         if player_name not in self._binding_data:
-            self._binding_data[player_name] = {
-                "name": player_name,
-                "xuid": "",
-                "qq": "",
-                "total_playtime": 0,
-                "last_join_time": None,
-                "last_quit_time": None,
-                "session_count": 0
-            }
+            self._binding_data[player_name] = PlayerRecord(name=player_name)
         
         # 设置封禁状态
         player_data = self._binding_data[player_name]
-        player_data["is_banned"] = True
-        player_data["ban_time"] = int(TimeUtils.get_timestamp())
-        player_data["ban_by"] = admin_name
-        player_data["ban_reason"] = reason or "管理员封禁"
+        player_data.is_banned = True
+        player_data.ban_time = int(TimeUtils.get_timestamp())
+        player_data.ban_by = admin_name
+        player_data.ban_reason = reason or "管理员封禁"
         
         # 如果玩家已绑定QQ，解除绑定
-        if player_data.get("qq"):
-            original_qq = player_data["qq"]
-            player_data["qq"] = ""
-            player_data["unbind_time"] = int(TimeUtils.get_timestamp())
-            player_data["unbind_by"] = admin_name
-            player_data["unbind_reason"] = "封禁时自动解绑"
-            player_data["original_qq"] = original_qq
+        if player_data.qq:
+            self._unindex_player(player_name)
+            original_qq = player_data.qq
+            player_data.qq = ""
+            player_data.unbind_time = int(TimeUtils.get_timestamp())
+            player_data.unbind_by = admin_name
+            player_data.unbind_reason = "封禁时自动解绑"
+            player_data.original_qq = original_qq
             self.logger.info(f"玩家 {player_name} 被封禁时自动解除QQ绑定 (原QQ: {original_qq})")
+            self._index_player(player_name)
         
+        self._mark_dirty(player_name)
         self.trigger_save(f"封禁玩家: {player_name} (原因: {reason or '管理员封禁'})")
         self.logger.info(f"玩家 {player_name} 已被 {admin_name} 封禁，原因：{reason or '管理员封禁'}")
         return True
     
+    @_locked
     def unban_player(self, player_name: str, admin_name: str = "system") -> bool:
         """解封玩家"""
         if player_name not in self._binding_data:
             return False
         
         player_data = self._binding_data[player_name]
-        if not player_data.get("is_banned", False):
+        if not player_data.is_banned:
             return False
         
         # 解除封禁
-        player_data["is_banned"] = False
-        player_data["unban_time"] = int(TimeUtils.get_timestamp())
-        player_data["unban_by"] = admin_name
+        player_data.is_banned = False
+        player_data.unban_time = int(TimeUtils.get_timestamp())
+        player_data.unban_by = admin_name
         
+        self._mark_dirty(player_name)
         self.trigger_save(f"解封玩家: {player_name}")
         self.logger.info(f"玩家 {player_name} 已被 {admin_name} 解封")
         return True
@@ -432,12 +597,12 @@ class DataManager:
         banned_players = [
             {
                 "name": player_name,
-                "ban_time": data.get("ban_time"),
+                "ban_time": data.ban_time,
                 "ban_by": data.get("ban_by", "unknown"),
                 "ban_reason": data.get("ban_reason", "无原因")
             }
             for player_name, data in self._binding_data.items()
-            if data.get("is_banned", False)
+            if data.is_banned
         ]
         return banned_players
     
@@ -449,16 +614,16 @@ class DataManager:
         data = self._binding_data[player_name]
         
         history = {
-            "current_qq": data.get("qq", ""),
-            "is_bound": bool(data.get("qq", "").strip()),
-            "bind_time": data.get("bind_time"),
-            "unbind_time": data.get("unbind_time"),
-            "rebind_time": data.get("rebind_time"),
-            "unbind_by": data.get("unbind_by"),
-            "original_qq": data.get("original_qq"),
-            "previous_qq": data.get("previous_qq"),
-            "total_playtime": data.get("total_playtime", 0),
-            "session_count": data.get("session_count", 0),
+            "current_qq": data.qq,
+            "is_bound": bool(data.qq.strip()),
+            "bind_time": data.bind_time,
+            "unbind_time": data.unbind_time,
+            "rebind_time": data.rebind_time,
+            "unbind_by": data.unbind_by,
+            "original_qq": data.original_qq,
+            "previous_qq": data.previous_qq,
+            "total_playtime": data.total_playtime or 0,
+            "session_count": data.session_count or 0,
         }
         
         # 计算绑定状态
@@ -489,7 +654,7 @@ class DataManager:
         name_bound = False
         name_qq = ""
         if player_name in self._binding_data:
-            name_qq = self._binding_data[player_name].get("qq", "")
+            name_qq = self._binding_data[player_name].qq
             name_bound = bool(name_qq and name_qq.strip())
         
         # 检查基于XUID的绑定
@@ -497,7 +662,7 @@ class DataManager:
         xuid_bound = False
         xuid_qq = ""
         if xuid_data:
-            xuid_qq = xuid_data.get("qq", "")
+            xuid_qq = xuid_data.qq
             xuid_bound = bool(xuid_qq and xuid_qq.strip())
         
         # 分析绑定状态
@@ -527,11 +692,63 @@ class DataManager:
         return result
     
     @property
-    def binding_data(self) -> Dict[str, Any]:
-        """获取完整绑定数据的副本"""
-        return self._binding_data.copy()
+    def binding_data(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取完整绑定数据的副本（记录为字典，与旧版本结构一致）
+        
+        只复制外层字典，记录字典来自导出缓存，请勿直接修改；需要独立副本时使用 export_binding_data。
+        插件内部请使用 binding_view / get_record / count / contains。
+        """
+        with self._lock:
+            self._refresh_export_cache()
+            return self._export_cache.copy()
+    
+    def _refresh_export_cache(self):
+        """重新导出修改过的记录，并按顺序补上新增的记录（删除的记录在标记时已移出缓存）"""
+        if self._export_cache is None:
+            self._export_cache = {name: data.to_dict() for name, data in self._binding_data.items()}
+            self._export_stale.clear()
+            return
+        
+        for player_name in self._export_stale:
+            if player_name in self._export_cache:
+                self._export_cache[player_name] = self._binding_data[player_name].to_dict()
+        self._export_stale.clear()
+        
+        # 缓存中没有的记录都是上次导出后新加入的，位于绑定数据末尾
+        added = len(self._binding_data) - len(self._export_cache)
+        for player_name in reversed(list(islice(reversed(self._binding_data), added))):
+            self._export_cache[player_name] = self._binding_data[player_name].to_dict()
+    
+    @property
+    def binding_view(self) -> Mapping[str, PlayerRecord]:
+        """
+        获取绑定数据的只读视图（不复制，随数据实时变化）
+        
+        记录支持 get / [] / in 等只读字典操作；需要可序列化的字典副本时使用 binding_data。
+        遍历视图时数据可能被其它线程修改，需要遍历请先 list(view.items())。
+        """
+        return self._binding_view
+    
+    def export_binding_data(self) -> Dict[str, Dict[str, Any]]:
+        """导出完整绑定数据的字典副本（每条记录都是新字典，可直接修改或JSON序列化）"""
+        with self._lock:
+            return {name: data.to_dict() for name, data in self._binding_data.items()}
+    
+    def get_record(self, player_name: str) -> Optional[PlayerRecord]:
+        """获取单个玩家的记录，不存在时返回None（返回的记录请勿直接修改）"""
+        return self._binding_data.get(player_name)
+    
+    def count(self) -> int:
+        """获取玩家记录总数"""
+        return len(self._binding_data)
+    
+    def contains(self, player_name: str) -> bool:
+        """检查是否有该玩家的记录"""
+        return player_name in self._binding_data
 
     # 新的计时器系统方法
+    @_locked
     def start_player_timer(self, player_name: str, player_xuid: str = None):
         """开始玩家在线计时"""
         # 检查是否已经在计时中，避免重复计时
@@ -542,23 +759,23 @@ class DataManager:
         self._online_timer_start_times[player_name] = current_time
         
         # 确保玩家数据存在，如果不存在则创建
-        if player_name not in self._binding_data:
-            self._binding_data[player_name] = {
-                "name": player_name,
-                "xuid": player_xuid or "",
-                "qq": "",
-                "total_playtime": 0,
-                "last_join_time": current_time,
-                "last_quit_time": None,
-                "session_count": 0
-            }
+        player_data = self._binding_data.get(player_name)
+        if player_data is None:
+            player_data = self._binding_data[player_name] = PlayerRecord(
+                name=player_name,
+                xuid=player_xuid or "",
+                last_join_time=current_time
+            )
         
         # 更新XUID（如果提供了新的XUID）
-        if player_xuid and not self._binding_data[player_name].get("xuid"):
-            self._binding_data[player_name]["xuid"] = player_xuid
+        if player_xuid and not player_data.xuid:
+            player_data.xuid = player_xuid
         
+        self._index_player(player_name)
+        self._mark_dirty(player_name)
         self.logger.info(f"玩家 {player_name} 开始在线计时")
 
+    @_locked
     def stop_player_timer(self, player_name: str):
         """停止玩家在线计时"""
         if player_name not in self._online_timer_start_times:
@@ -570,7 +787,9 @@ class DataManager:
         
         if session_time > 0 and player_name in self._binding_data:
             # 累加到总在线时间
-            self._binding_data[player_name]["total_playtime"] = self._binding_data[player_name].get("total_playtime", 0) + session_time
+            player_data = self._binding_data[player_name]
+            player_data.total_playtime = (player_data.total_playtime or 0) + session_time
+            self._mark_dirty(player_name)
             self.logger.info(f"玩家 {player_name} 停止在线计时，本次会话时长: {session_time}秒")
         
         # 移除计时器记录
@@ -606,24 +825,34 @@ class DataManager:
             self._save_timer_progress()
             self._last_timer_update = current_time
 
+    @_locked
     def _save_timer_progress(self):
         """保存当前在线玩家的计时进度"""
         current_time = int(TimeUtils.get_timestamp())
         
+        updated = 0
         for player_name, start_time in self._online_timer_start_times.items():
             if player_name in self._binding_data:
                 # 计算从开始计时到现在的时间
                 session_time = current_time - start_time
                 if session_time > 0:
                     # 累加到总在线时间
-                    self._binding_data[player_name]["total_playtime"] = self._binding_data[player_name].get("total_playtime", 0) + session_time
+                    player_data = self._binding_data[player_name]
+                    player_data.total_playtime = (player_data.total_playtime or 0) + session_time
                     # 重置开始时间
                     self._online_timer_start_times[player_name] = current_time
+                    self._mark_dirty(player_name)
+                    updated += 1
         
-        # 保存数据
-        self.save_data()
-        if self._online_timer_start_times:
-            self.logger.info(f"已保存 {len(self._online_timer_start_times)} 个在线玩家的计时进度")
+        # 没有任何记录变化时（如无人在线）跳过本次写盘
+        if not self._dirty and not self._removed:
+            self.save_stats["skipped"] += 1
+            return
+        
+        # 保存数据（由后台线程写盘）
+        self.trigger_save("在线计时进度")
+        if updated:
+            self.logger.info(f"已保存 {updated} 个在线玩家的计时进度")
 
     def cleanup_timer_system(self):
         """清理计时器系统（在插件禁用时调用）"""
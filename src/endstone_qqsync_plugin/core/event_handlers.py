@@ -105,7 +105,7 @@ class EventHandlers:
             # 通过QQ绑定信息检查是否是管理员
             qq_number = self.plugin.data_manager.get_player_qq(player_name)
             if qq_number:
-                admins = self.plugin.config_manager.get_config("admins", [])
+                admins = self.plugin.config_manager.snapshot.admins
                 return qq_number in admins
             return False
         except Exception as e:
@@ -135,6 +135,9 @@ class EventHandlers:
             
             self.logger.info(f"玩家 {player_name} (XUID: {player_xuid}) 加入游戏")
             
+            # 登记到在线玩家索引
+            self.plugin.online_players.add(player)
+            
             # 记录玩家加入时间和进服次数（使用join/quit事件记录）
             self.plugin.data_manager.update_player_join(player_name, player_xuid)
             # 立即启动玩家在线计时器
@@ -147,8 +150,8 @@ class EventHandlers:
                 if self.plugin.data_manager.update_player_name(old_name, player_name, player_xuid):
                     # 更新QQ群昵称
                     if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                        self.plugin.config_manager.get_config("force_bind_qq", True) and 
-                        self.plugin.config_manager.get_config("sync_group_card", True)):
+                        self.plugin.config_manager.snapshot.force_bind_qq and 
+                        self.plugin.config_manager.snapshot.sync_group_card):
                         
                         qq_number = existing_player.get("qq")
                         if qq_number:
@@ -167,7 +170,7 @@ class EventHandlers:
             )
             
             # 检查未绑定玩家是否需要自动弹出绑定表单
-            if (self.plugin.config_manager.get_config("force_bind_qq", True) and 
+            if (self.plugin.config_manager.snapshot.force_bind_qq and 
                 not self.plugin.data_manager.is_player_bound(player_name, player_xuid)):
                 
                 # 延迟显示绑定表单（给玩家更多时间加载完成）
@@ -178,11 +181,12 @@ class EventHandlers:
                 )
 
             # 发送QQ群通知（现在为所有玩家发送通知，不再依赖绑定状态）
-            if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                self.plugin.config_manager.get_config("enable_game_to_qq", True)):
+            if (self.plugin.can_send_to_qq() and 
+                self.plugin.config_manager.snapshot.enable_game_to_qq):
                 
                 import asyncio
                 from ..websocket.handlers import send_group_msg_to_all_groups
+                from ..websocket.outbound import PRIORITY_NOTICE
                 
                 # 获取玩家统计信息
                 playtime_info = self.plugin.data_manager.get_player_playtime_info(player_name, self.plugin.server.online_players)
@@ -194,7 +198,7 @@ class EventHandlers:
                     join_msg = f"[+] 玩家 {player_name} 加入了游戏 (第{session_count}次游戏)"
                 
                 asyncio.run_coroutine_threadsafe(
-                    send_group_msg_to_all_groups(self.plugin._current_ws, text=join_msg),
+                    send_group_msg_to_all_groups(self.plugin._current_ws, text=join_msg, priority=PRIORITY_NOTICE),
                     self.plugin._loop
                 )
                 
@@ -211,6 +215,9 @@ class EventHandlers:
             
             self.logger.info(f"玩家 {player_name} (XUID: {player_xuid}) 离开游戏")
             
+            # 从在线玩家索引移除
+            self.plugin.online_players.remove(player)
+            
             # 计算本次游戏时长
             session_time = 0
             if player_name in self.plugin.data_manager._online_timer_start_times:
@@ -232,11 +239,12 @@ class EventHandlers:
             self.cleanup_player_chat_data(player_name)
             
             # 发送QQ群通知（现在为所有玩家发送通知，不再依赖绑定状态）
-            if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                self.plugin.config_manager.get_config("enable_game_to_qq", True)):
+            if (self.plugin.can_send_to_qq() and 
+                self.plugin.config_manager.snapshot.enable_game_to_qq):
                 
                 import asyncio
                 from ..websocket.handlers import send_group_msg_to_all_groups
+                from ..websocket.outbound import PRIORITY_NOTICE
                 
                 # 格式化本次游戏时长
                 if session_time > 0:
@@ -255,7 +263,7 @@ class EventHandlers:
                 quit_msg = f"[-] 玩家 {player_name} 离开了游戏 (本次游戏时长: {playtime_str})"
             
                 asyncio.run_coroutine_threadsafe(
-                    send_group_msg_to_all_groups(self.plugin._current_ws, text=quit_msg),
+                    send_group_msg_to_all_groups(self.plugin._current_ws, text=quit_msg, priority=PRIORITY_NOTICE),
                     self.plugin._loop
                 )
                 
@@ -299,7 +307,7 @@ class EventHandlers:
             self.update_chat_time(player_name)
             
             # 检查访客权限限制
-            if self.plugin.config_manager.get_config("force_bind_qq", True):
+            if self.plugin.config_manager.snapshot.force_bind_qq:
                 # 检查玩家是否有聊天权限
                 if not player.has_permission("qqsync.chat"):
                     # 取消聊天事件，阻止消息发送
@@ -311,16 +319,15 @@ class EventHandlers:
                     return
             
             # 转发到QQ群（根据 force_bind_qq 配置决定是否必须绑定）
-            if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                self.plugin.config_manager.get_config("enable_game_to_qq", True) and
-                (self.plugin.data_manager.is_player_bound(player_name, player.xuid) or not self.plugin.config_manager.get_config("force_bind_qq", True))):
+            if (self.plugin.can_send_to_qq() and 
+                self.plugin.config_manager.snapshot.enable_game_to_qq and
+                (self.plugin.data_manager.is_player_bound(player_name, player.xuid) or not self.plugin.config_manager.snapshot.force_bind_qq)):
                 
                 import asyncio
                 from ..websocket.handlers import send_group_msg_to_all_groups
-                from ..utils.message_utils import filter_sensitive_content
                 
                 # 过滤敏感内容
-                filtered_message, has_sensitive = filter_sensitive_content(message, self.plugin.config_manager.get_custom_ban_words())
+                filtered_message, has_sensitive = self.plugin.config_manager.filter_sensitive_content(message)
                 
                 # 获取玩家绑定的QQ号（如果有的话）
                 player_qq = self.plugin.data_manager.get_player_qq(player_name)
@@ -357,12 +364,13 @@ class EventHandlers:
             player_name = player.name
 
             # 转发到QQ群（如果启用且玩家已绑定）
-            if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                self.plugin.config_manager.get_config("enable_game_to_qq", True) and
+            if (self.plugin.can_send_to_qq() and 
+                self.plugin.config_manager.snapshot.enable_game_to_qq and
                 self.plugin.data_manager.is_player_bound(player_name, player.xuid)):
                 
                 import asyncio
                 from ..websocket.handlers import send_group_msg_to_all_groups
+                from ..websocket.outbound import PRIORITY_NOTICE
 
                 # 构建死亡消息
                 language = event.player.server.language
@@ -371,7 +379,7 @@ class EventHandlers:
                 
                 # 发送消息到QQ群
                 asyncio.run_coroutine_threadsafe(
-                    send_group_msg_to_all_groups(self.plugin._current_ws, text=death_msg),
+                    send_group_msg_to_all_groups(self.plugin._current_ws, text=death_msg, priority=PRIORITY_NOTICE),
                     self.plugin._loop
                 )
                 
@@ -383,7 +391,7 @@ class EventHandlers:
     def on_block_break(self, event: BlockBreakEvent):
         """方块破坏事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -405,7 +413,7 @@ class EventHandlers:
     def on_block_place(self, event: BlockPlaceEvent):
         """方块放置事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -427,7 +435,7 @@ class EventHandlers:
     def on_player_interact(self, event: PlayerInteractEvent):
         """玩家交互事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -449,7 +457,7 @@ class EventHandlers:
     def on_player_interact_actor(self, event: PlayerInteractActorEvent):
         """玩家与实体交互事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -471,7 +479,7 @@ class EventHandlers:
     def on_actor_damage(self, event: ActorDamageEvent):
         """实体受伤事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
             
             # 检查伤害来源是否是玩家
@@ -502,7 +510,7 @@ class EventHandlers:
     def on_player_pickup_item(self, event: PlayerPickupItemEvent):
         """玩家拾取物品事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -524,7 +532,7 @@ class EventHandlers:
     def on_player_drop_item(self, event: PlayerDropItemEvent):
         """玩家丢弃物品事件 - 权限检查"""
         try:
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 return  # 未启用强制绑定，不进行权限控制
                 
             player = event.player
@@ -0,0 +1,189 @@
+"""
+群成员缓存模块
+按群维护成员集合，通过对比完整快照计算加群/退群，并持久化快照以便重启后无需立即全量拉取
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Set, Tuple
+
+
+class GroupMemberCache:
+    """
+    按群维护的成员缓存
+
+    写操作在事件循环线程中进行，主线程只做成员检查（in / len）。
+    一个QQ号只要还在任意一个目标群中就视为群成员。
+    """
+
+    def __init__(self, cache_file: Path, logger):
+        self.cache_file = cache_file
+        self.logger = logger
+        self._groups: Dict[int, FrozenSet[str]] = {}
+        self._updated: Dict[int, float] = {}
+        # QQ号 -> 所在目标群数量
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    # ---- 查询 ----
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def group_size(self, group_id: int) -> int:
+        """获取单个群的成员数"""
+        return len(self._groups.get(group_id, ()))
+
+    def is_fresh(self, group_id: int, max_age: float) -> bool:
+        """检查群快照是否存在且未超过 max_age 秒"""
+        updated = self._updated.get(group_id)
+        return updated is not None and time.time() - updated < max_age
+
+    # ---- 更新 ----
+
+    def _add_locked(self, user_id: str) -> bool:
+        count = self._counts.get(user_id, 0)
+        self._counts[user_id] = count + 1
+        return count == 0
+
+    def _remove_locked(self, user_id: str) -> bool:
+        count = self._counts.get(user_id, 0)
+        if count <= 1:
+            self._counts.pop(user_id, None)
+            return count == 1
+        self._counts[user_id] = count - 1
+        return False
+
+    def apply_snapshot(self, group_id: int, members: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        用完整成员列表替换群快照
+
+        Args:
+            group_id (int): 群号
+            members: 该群当前的全部成员QQ号
+
+        Returns:
+            tuple: (新成为群成员的QQ号集合, 不再是任何目标群成员的QQ号集合)
+        """
+        new = frozenset(str(user_id) for user_id in members)
+        joined = set()
+        left = set()
+        with self._lock:
+            old = self._groups.get(group_id, frozenset())
+            for user_id in new - old:
+                if self._add_locked(user_id):
+                    joined.add(user_id)
+            for user_id in old - new:
+                if self._remove_locked(user_id):
+                    left.add(user_id)
+            self._groups[group_id] = new
+            self._updated[group_id] = time.time()
+            self._dirty = True
+        return joined, left
+
+    def add(self, group_id: int, user_id: str) -> bool:
+        """记录加群，返回该QQ号是否新成为群成员"""
+        user_id = str(user_id)
+        with self._lock:
+            members = self._groups.get(group_id, frozenset())
+            if user_id in members:
+                return False
+            self._groups[group_id] = members | {user_id}
+            self._dirty = True
+            return self._add_locked(user_id)
+
+    def remove(self, group_id: int, user_id: str) -> bool:
+        """记录退群，返回该QQ号是否已不在任何目标群中"""
+        user_id = str(user_id)
+        with self._lock:
+            members = self._groups.get(group_id)
+            if not members or user_id not in members:
+                return False
+            self._groups[group_id] = members - {user_id}
+            self._dirty = True
+            return self._remove_locked(user_id)
+
+    def retain_groups(self, group_ids: Iterable[int]):
+        """移除不再属于目标群的快照（配置重载后调用）"""
+        keep = set(group_ids)
+        with self._lock:
+            for group_id in [gid for gid in self._groups if gid not in keep]:
+                for user_id in self._groups.pop(group_id):
+                    self._remove_locked(user_id)
+                self._updated.pop(group_id, None)
+                self._dirty = True
+
+    # ---- 持久化 ----
+
+    def load(self, group_ids: Iterable[int]) -> int:
+        """
+        从缓存文件加载快照（只加载目标群）
+
+        Returns:
+            int: 加载的群数量
+        """
+        if not self.cache_file.exists():
+            return 0
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取群成员缓存失败，将重新拉取: {e}")
+            return 0
+
+        keep = set(group_ids)
+        loaded = 0
+        with self._lock:
+            for key, entry in data.get("groups", {}).items():
+                try:
+                    group_id = int(key)
+                except (TypeError, ValueError):
+                    continue
+                if group_id not in keep:
+                    continue
+                members = frozenset(str(user_id) for user_id in entry.get("members", []))
+                self._groups[group_id] = members
+                self._updated[group_id] = float(entry.get("updated", 0))
+                for user_id in members:
+                    self._add_locked(user_id)
+                loaded += 1
+        return loaded
+
+    def save(self, force: bool = False) -> bool:
+        """写入缓存文件（无变化时跳过），返回是否写入"""
+        with self._lock:
+            if not (self._dirty or force):
+                return False
+            data = {
+                "groups": {
+                    str(group_id): {
+                        "updated": self._updated.get(group_id, 0),
+                        "members": sorted(members),
+                    }
+                    for group_id, members in self._groups.items()
+                }
+            }
+            self._dirty = False
+
+        temp_file = self.cache_file.with_suffix('.tmp')
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            temp_file.replace(self.cache_file)
+            return True
+        except Exception as e:
+            self._dirty = True
+            self.logger.error(f"保存群成员缓存失败: {e}")
+            if temp_file.exists():
+                try:
+                    temp_file.unlink()
+                except Exception:
+                    pass
+            return False
@@ -0,0 +1,174 @@
+"""
+主线程调度桥模块
+把事件循环线程提交的回调集中到一个每tick执行的调度任务中，在时间预算内批量执行
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+
+class MainThreadBridge:
+    """
+    主线程调度桥
+
+    任意线程都可以通过 call_soon 提交回调；事件循环内的协程可以通过 run 提交回调并等待结果。
+    回调按提交顺序在主线程的tick任务中执行，每个tick最多占用 budget_ms 毫秒，剩余回调顺延到下一tick。
+    通过 broadcast 提交的游戏消息会在每个tick开始时合并为一次全服广播。
+    """
+
+    def __init__(self, plugin, logger, budget_ms: float = 5.0):
+        self.plugin = plugin
+        self.logger = logger
+        self.budget = max(0.5, float(budget_ms)) / 1000
+        # deque 的 append/popleft 本身是线程安全的，无需额外加锁
+        self._queue: deque = deque()
+        self._broadcasts: deque = deque()
+        self._task = None
+        self.stats = {
+            "executed": 0,
+            "failed": 0,
+            "deferred_ticks": 0,
+            "max_backlog": 0,
+            "broadcast_ticks": 0,
+            "broadcast_messages": 0,
+            "broadcast_deliveries": 0,
+            "max_broadcast_per_tick": 0,
+        }
+        # 最近一次广播的 (消息数, 在线玩家数)
+        self.last_broadcast = (0, 0)
+
+    def start(self):
+        """注册每tick执行一次的调度任务（必须在主线程调用）"""
+        if self._task is not None:
+            return
+        self._task = self.plugin.server.scheduler.run_task(self.plugin, self._tick, delay=1, period=1)
+
+    def stop(self):
+        """取消调度任务，未执行的回调将被丢弃，等待中的调用收到异常"""
+        if self._task is not None:
+            try:
+                self._task.cancel()
+            except Exception as e:
+                self.logger.warning(f"取消主线程调度任务失败: {e}")
+            self._task = None
+
+        dropped = 0
+        while self._queue:
+            _, _, future, loop = self._queue.popleft()
+            dropped += 1
+            if future is not None:
+                self._resolve(future, loop, None, RuntimeError("主线程调度桥已停止"))
+        if dropped:
+            self.logger.warning(f"主线程调度桥停止，丢弃 {dropped} 个未执行的回调")
+        self._broadcasts.clear()
+
+    def call_soon(self, func: Callable, *args):
+        """提交回调到主线程执行，不关心返回值"""
+        self._queue.append((func, args, None, None))
+
+    def broadcast(self, message: str):
+        """提交一条发给所有在线玩家的游戏消息，同一tick内的消息合并发送"""
+        self._broadcasts.append(message)
+
+    def run(self, func: Callable, *args) -> asyncio.Future:
+        """
+        在事件循环内提交回调到主线程执行
+
+        Returns:
+            asyncio.Future: 回调的返回值（或抛出的异常）
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((func, args, future, loop))
+        return future
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, loop, result: Any, error: Optional[BaseException]):
+        """在事件循环线程中完成future"""
+        def _set():
+            if future.done():
+                return
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        try:
+            loop.call_soon_threadsafe(_set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _flush_broadcasts(self):
+        """把本tick内积累的广播消息一次性发给所有在线玩家"""
+        messages = []
+        broadcasts = self._broadcasts
+        while broadcasts:
+            messages.append(broadcasts.popleft())
+        text = "\n".join(messages)
+
+        server = self.plugin.server
+        try:
+            player_count = len(server.online_players)
+            if player_count:
+                server.broadcast_message(text)
+        except Exception as e:
+            # 广播接口不可用时逐个玩家发送
+            self.logger.debug(f"全服广播失败，改为逐个发送: {e}")
+            player_count = 0
+            for player in server.online_players:
+                try:
+                    player.send_message(text)
+                    player_count += 1
+                except Exception as send_error:
+                    self.logger.error(f"发送游戏消息失败: {send_error}")
+
+        count = len(messages)
+        stats = self.stats
+        stats["broadcast_ticks"] += 1
+        stats["broadcast_messages"] += count
+        stats["broadcast_deliveries"] += count * player_count
+        if count > stats["max_broadcast_per_tick"]:
+            stats["max_broadcast_per_tick"] = count
+        self.last_broadcast = (count, player_count)
+        self.logger.debug(f"本tick广播 {count} 条消息给 {player_count} 名玩家")
+
+    def _tick(self):
+        """主线程tick：先合并发送广播消息，再在时间预算内依次执行回调"""
+        if self._broadcasts:
+            self._flush_broadcasts()
+
+        backlog = len(self._queue)
+        if not backlog:
+            return
+        if backlog > self.stats["max_backlog"]:
+            self.stats["max_backlog"] = backlog
+
+        deadline = time.perf_counter() + self.budget
+        queue = self._queue
+        while queue:
+            func, args, future, loop = queue.popleft()
+            if future is not None and future.cancelled():
+                continue
+            try:
+                result = func(*args)
+                error = None
+            except Exception as e:
+                result, error = None, e
+                self.stats["failed"] += 1
+                if future is None:
+                    self.logger.error(f"主线程回调执行失败: {e}")
+            self.stats["executed"] += 1
+            if future is not None:
+                self._resolve(future, loop, result, error)
+            if time.perf_counter() >= deadline:
+                break
+
+        if queue:
+            self.stats["deferred_ticks"] += 1
+
+    @property
+    def backlog(self) -> int:
+        """待执行的回调数"""
+        return len(self._queue)
@@ -0,0 +1,79 @@
+"""
+在线玩家索引模块
+维护 玩家名 -> 玩家对象 和 XUID -> 玩家对象 的映射，避免反复遍历 server.online_players
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class OnlinePlayerIndex:
+    """在线玩家索引（由主线程在加入/离开事件中维护，任意线程可读取）"""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._by_name: Dict[str, Any] = {}
+        self._by_xuid: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add(self, player):
+        """登记上线玩家"""
+        with self._lock:
+            self._by_name[player.name] = player
+            if player.xuid:
+                self._by_xuid[str(player.xuid)] = player
+
+    def remove(self, player):
+        """移除下线玩家（只移除仍指向该玩家的条目）"""
+        with self._lock:
+            if self._by_name.get(player.name) is player:
+                del self._by_name[player.name]
+            xuid = str(player.xuid) if player.xuid else ""
+            if xuid and self._by_xuid.get(xuid) is player:
+                del self._by_xuid[xuid]
+
+    def get_by_name(self, player_name: str):
+        """按玩家名查找在线玩家，不在线返回None"""
+        return self._by_name.get(player_name)
+
+    def get_by_xuid(self, xuid: str):
+        """按XUID查找在线玩家，不在线返回None"""
+        return self._by_xuid.get(str(xuid)) if xuid else None
+
+    def is_online(self, player_name: str) -> bool:
+        """检查玩家是否在线"""
+        return player_name in self._by_name
+
+    def players(self) -> List[Any]:
+        """获取在线玩家列表副本"""
+        return list(self._by_name.values())
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def reconcile(self, online_players: Iterable[Any]) -> Tuple[int, int]:
+        """
+        以服务器的在线列表为准重建索引
+
+        Args:
+            online_players: server.online_players
+
+        Returns:
+            tuple: (补充的玩家数, 移除的玩家数)
+        """
+        by_name = {}
+        by_xuid = {}
+        for player in online_players:
+            by_name[player.name] = player
+            if player.xuid:
+                by_xuid[str(player.xuid)] = player
+
+        with self._lock:
+            added = sum(1 for name in by_name if name not in self._by_name)
+            removed = sum(1 for name in self._by_name if name not in by_name)
+            self._by_name = by_name
+            self._by_xuid = by_xuid
+
+        if added or removed:
+            self.logger.warning(f"在线玩家索引与服务器不一致，已校正 (补充 {added} 人, 移除 {removed} 人)")
+        return added, removed
@@ -25,7 +25,7 @@ class PermissionManager:
     
     def is_player_visitor(self, player_name: str, player_xuid: str = None) -> bool:
         """检查玩家是否为访客权限"""
-        if not self.plugin.config_manager.get_config("force_bind_qq", True):
+        if not self.plugin.config_manager.snapshot.force_bind_qq:
             return False  # 如果未启用强制绑定，所有玩家都不是访客
         
         # 检查玩家是否被封禁
@@ -54,7 +54,7 @@ class PermissionManager:
     
     def get_player_visitor_reason(self, player_name: str, player_xuid: str = None) -> str:
         """获取玩家被设为访客的原因"""
-        if not self.plugin.config_manager.get_config("force_bind_qq", True):
+        if not self.plugin.config_manager.snapshot.force_bind_qq:
             return ""
         
         # 检查玩家是否被封禁
@@ -65,8 +65,8 @@ class PermissionManager:
             return "未绑定QQ"
         
         # 只有在启用强制绑定和退群检测时才检查群成员状态
-        if (self.plugin.config_manager.get_config("force_bind_qq", True) and 
-            self.plugin.config_manager.get_config("check_group_member", True)):
+        if (self.plugin.config_manager.snapshot.force_bind_qq and 
+            self.plugin.config_manager.snapshot.check_group_member):
             player_qq = self.plugin.data_manager.get_player_qq(player_name)
             if player_qq and hasattr(self.plugin, 'group_members') and self.plugin.group_members:
                 if player_qq not in self.plugin.group_members:
@@ -188,7 +188,7 @@ class PermissionManager:
             self.logger.warning("尝试对已失效的玩家对象应用权限，操作已跳过")
             return
             
-        if not self.plugin.config_manager.get_config("force_bind_qq", True):
+        if not self.plugin.config_manager.snapshot.force_bind_qq:
             return  # 如果未启用强制绑定，不进行权限控制
         
         player_name = player.name
@@ -255,8 +255,8 @@ class PermissionManager:
         
         # 4. 如果是退群原因，额外显示QQ群信息
         if visitor_reason == "已退出QQ群":
-            target_groups = self.plugin.config_manager.get_config("target_groups", [])
-            group_names = self.plugin.config_manager.get_config("group_names", {})
+            target_groups = self.plugin.config_manager.snapshot.target_group_list
+            group_names = self.plugin.config_manager.snapshot.group_names
             
             if target_groups:
                 player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.AQUA}目标QQ群：{ColorFormat.RESET}")
@@ -0,0 +1,127 @@
+"""
+玩家记录模块
+用带 __slots__ 的数据类保存单个玩家的绑定与游戏统计数据，替代自由格式的字典
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional
+
+
+@dataclass(slots=True, eq=False)
+class PlayerRecord(Mapping):
+    """
+    玩家绑定记录
+
+    前7个字段始终写入JSON；其余字段为 None 时表示记录中没有该键，不会写入。
+    未知键（以及值为 null 的可选键）保存在 extra 中原样写回，保证与旧数据互相转换不丢失信息。
+    同时实现只读映射协议，可以像原来的字典一样用 get / [] / in 读取。
+    """
+
+    name: str = ""
+    xuid: str = ""
+    qq: str = ""
+    bind_time: Optional[int] = None
+    total_playtime: int = 0
+    last_join_time: Optional[int] = None
+    last_quit_time: Optional[int] = None
+    session_count: int = 0
+    # 换绑 / 解绑
+    rebind_time: Optional[int] = None
+    previous_qq: Optional[str] = None
+    unbind_time: Optional[int] = None
+    unbind_by: Optional[str] = None
+    unbind_reason: Optional[str] = None
+    original_qq: Optional[str] = None
+    last_name_update: Optional[int] = None
+    # 封禁
+    is_banned: Optional[bool] = None
+    ban_time: Optional[int] = None
+    ban_by: Optional[str] = None
+    ban_reason: Optional[str] = None
+    unban_time: Optional[int] = None
+    unban_by: Optional[str] = None
+    # 未知字段
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlayerRecord":
+        """从JSON字典创建记录"""
+        record = cls()
+        extra = None
+        for key, value in data.items():
+            if key in _FIELD_SET and (value is not None or key in _ALWAYS_FIELDS):
+                setattr(record, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        record.extra = extra
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为JSON字典（字段顺序固定，未知字段附在末尾）"""
+        data = {}
+        for key in _FIELD_NAMES:
+            value = getattr(self, key)
+            if value is not None or key in _ALWAYS_FIELDS:
+                data[key] = value
+        if self.extra:
+            for key, value in self.extra.items():
+                data.setdefault(key, value)
+        return data
+
+    def set_extra(self, key: str, value: Any):
+        """设置未知字段"""
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    # ---- 只读映射协议（兼容原来的字典用法） ----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is not None or key in _ALWAYS_FIELDS:
+                return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __bool__(self) -> bool:
+        # 记录总是包含基础字段，避免真值判断时经由 __len__ 构造字典
+        return True
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PlayerRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+
+_MISSING = object()
+
+# 始终写入JSON的字段（即使值为 None）
+_ALWAYS_FIELDS = frozenset((
+    "name", "xuid", "qq", "total_playtime", "last_join_time", "last_quit_time", "session_count"
+))
+_FIELD_NAMES = tuple(f.name for f in fields(PlayerRecord) if f.name != "extra")
+_FIELD_SET = frozenset(_FIELD_NAMES)
@@ -0,0 +1,527 @@
+"""
+存储后端模块
+负责玩家绑定数据与在线时长数据的持久化，支持 JSON 文件、JSON 日志与 SQLite 三种后端
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, List
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    name = "base"
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取全部玩家数据"""
+        raise NotImplementedError
+
+    def save_all(self, data: Dict[str, Dict[str, Any]]):
+        """将当前全部玩家数据写入存储（失败时抛出异常，由调用者记录日志）"""
+        raise NotImplementedError
+
+    def save_changes(self, changed: Dict[str, Dict[str, Any]], removed: Iterable[str],
+                     snapshot: Callable[[], Dict[str, Dict[str, Any]]]):
+        """只写入发生变化的记录；默认实现为取完整快照整体保存"""
+        self.save_all(snapshot())
+
+    def close(self):
+        """释放存储资源"""
+        pass
+
+
+class JsonStorageBackend(StorageBackend):
+    """JSON 文件存储后端（默认）"""
+
+    name = "json"
+
+    def __init__(self, data_file: Path, logger):
+        self.data_file = data_file
+        self.logger = logger
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取JSON数据文件，不存在时创建空文件"""
+        if not self.data_file.exists():
+            self.data_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                json.dump({}, f, indent=2, ensure_ascii=False)
+            self.logger.info(f"已创建QQ绑定数据文件: {self.data_file}")
+
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_all(self, data: Dict[str, Dict[str, Any]]):
+        """整体重写JSON数据文件"""
+        self._write_json(data)
+
+    def _write_json(self, data: Dict[str, Dict[str, Any]], durable: bool = False):
+        """经临时文件原子替换JSON数据文件；durable 时确保内容和替换操作都已落盘再返回"""
+        # 创建临时文件，避免写入过程中的数据损坏
+        temp_file = self.data_file.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # 原子性替换文件
+            temp_file.replace(self.data_file)
+            if durable and os.name != 'nt':
+                # 替换操作记录在目录中，同步目录后断电也不会回到旧文件（Windows 不支持打开目录）
+                dir_fd = os.open(self.data_file.parent, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+        except Exception:
+            # 如果临时文件存在，清理它
+            if temp_file.exists():
+                try:
+                    temp_file.unlink()
+                except Exception:
+                    pass
+            raise
+
+
+class JournalStorageBackend(JsonStorageBackend):
+    """JSON 快照 + 追加写日志存储后端
+
+    每次保存只把发生变化的字段以 JSON Lines 追加到 data.journal，
+    日志超过大小或时间阈值时在后台线程中合并回 data.json。
+    """
+
+    name = "journal"
+
+    def __init__(self, data_file: Path, logger, compact_size: int = 1024 * 1024, compact_interval: int = 600):
+        super().__init__(data_file, logger)
+        self.journal_file = data_file.with_suffix('.journal')
+        self.compacting_file = data_file.with_suffix('.journal.compacting')
+        self.compact_size = compact_size          # 日志大小阈值（字节）
+        self.compact_interval = compact_interval  # 日志存在时间阈值（秒）
+        self._lock = threading.Lock()
+        # 已写入快照与日志的记录状态 {player_name: record_copy}
+        self._persisted: Dict[str, Dict[str, Any]] = {}
+        self._journal_size = 0
+        self._journal_started: float = 0
+        self._compact_thread: threading.Thread = None
+
+    @staticmethod
+    def _apply_entry(data: Dict[str, Dict[str, Any]], entry: Dict[str, Any]):
+        """将一条日志应用到数据上"""
+        name = entry["n"]
+        if entry.get("d"):
+            data.pop(name, None)
+            return
+        record = data.setdefault(name, {})
+        record.update(entry.get("s", {}))
+        for field in entry.get("u", []):
+            record.pop(field, None)
+
+    def _replay(self, journal_file: Path, data: Dict[str, Dict[str, Any]]) -> int:
+        """重放日志文件，返回应用的条目数"""
+        if not journal_file.exists():
+            return 0
+
+        applied = 0
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply_entry(data, json.loads(line))
+                    applied += 1
+                except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                    # 崩溃时最后一行可能只写入了一半
+                    self.logger.warning(f"跳过损坏的日志条目 {journal_file.name}:{line_no}: {e}")
+        return applied
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取快照并重放未合并的日志"""
+        data = super().load()
+
+        # 上次合并未完成时遗留的日志先于当前日志重放（条目为绝对值，重复应用无副作用）
+        applied = self._replay(self.compacting_file, data)
+        applied += self._replay(self.journal_file, data)
+
+        self._persisted = {name: dict(record) for name, record in data.items()}
+
+        if applied:
+            self.logger.info(f"已重放 {applied} 条数据日志")
+            self._write_snapshot(self._persisted)
+            for journal_file in (self.compacting_file, self.journal_file):
+                if journal_file.exists():
+                    journal_file.unlink()
+
+        self._journal_size = 0
+        self._journal_started = 0
+        return data
+
+    def _diff(self, changed: Dict[str, Dict[str, Any]], removed: Iterable[str]) -> List[Dict[str, Any]]:
+        """计算给定记录与已持久化状态之间的字段级差异"""
+        entries = []
+        for name, record in changed.items():
+            old = self._persisted.get(name)
+            if old is None:
+                entries.append({"n": name, "s": dict(record)})
+                continue
+            if old == record:
+                continue
+            changed_fields = {k: v for k, v in record.items() if k not in old or old[k] != v}
+            removed_fields = [k for k in old if k not in record]
+            entry = {"n": name}
+            if changed_fields:
+                entry["s"] = changed_fields
+            if removed_fields:
+                entry["u"] = removed_fields
+            entries.append(entry)
+
+        for name in removed:
+            if name in self._persisted:
+                entries.append({"n": name, "d": 1})
+        return entries
+
+    def save_all(self, data: Dict[str, Dict[str, Any]]):
+        """对比全部记录，只追加发生变化的字段"""
+        with self._lock:
+            removed = [name for name in self._persisted if name not in data]
+            self._append(self._diff(data, removed))
+
+    def save_changes(self, changed: Dict[str, Dict[str, Any]], removed: Iterable[str],
+                     snapshot: Callable[[], Dict[str, Dict[str, Any]]]):
+        """只对比并追加发生变化的记录"""
+        with self._lock:
+            self._append(self._diff(changed, removed))
+
+    def _append(self, entries: List[Dict[str, Any]]):
+        """追加日志条目，必要时触发后台合并（需持有锁）"""
+        if not entries:
+            return
+
+        lines = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+            for entry in entries
+        )
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for entry in entries:
+            self._apply_entry(self._persisted, entry)
+
+        if not self._journal_started:
+            self._journal_started = time.time()
+        self._journal_size += len(lines.encode('utf-8'))
+
+        if (self._journal_size >= self.compact_size or
+                time.time() - self._journal_started >= self.compact_interval):
+            self._start_compaction()
+
+    def _write_snapshot(self, snapshot: Dict[str, Dict[str, Any]]):
+        """将快照写入 data.json（落盘后才返回，之后才能删除已合并的日志）"""
+        self._write_json(snapshot, durable=True)
+
+    def _start_compaction(self):
+        """轮换日志文件并在后台线程中合并（需持有锁）"""
+        if self._compact_thread and self._compact_thread.is_alive():
+            return
+        if self.compacting_file.exists():
+            # 上一次合并失败遗留的日志，将当前日志接在其后一并合并
+            with open(self.compacting_file, 'a', encoding='utf-8') as dst, \
+                    open(self.journal_file, 'r', encoding='utf-8') as src:
+                dst.write(src.read())
+            self.journal_file.unlink()
+        else:
+            self.journal_file.replace(self.compacting_file)
+        snapshot = {name: dict(record) for name, record in self._persisted.items()}
+        self._journal_size = 0
+        self._journal_started = 0
+
+        self._compact_thread = threading.Thread(target=self._compact, args=(snapshot,), daemon=True)
+        self._compact_thread.start()
+
+    def _compact(self, snapshot: Dict[str, Dict[str, Any]]):
+        """将快照写入 data.json 并删除已合并的日志"""
+        try:
+            self._write_snapshot(snapshot)
+            self.compacting_file.unlink()
+        except Exception as e:
+            self.logger.error(f"合并数据日志失败: {e}")
+
+    def close(self):
+        """等待后台合并结束，并将剩余日志合并到快照"""
+        if self._compact_thread and self._compact_thread.is_alive():
+            self._compact_thread.join(timeout=10)
+            if self._compact_thread.is_alive():
+                # 后台线程仍在写 data.json，此时再写快照会争用同一个临时文件；日志保留到下次启动时重放
+                self.logger.warning("后台合并数据日志未在10秒内完成，跳过关闭时的合并，下次启动时将重放日志")
+                return
+
+        with self._lock:
+            try:
+                if self.journal_file.exists() or self.compacting_file.exists():
+                    self._write_snapshot(self._persisted)
+                    for journal_file in (self.compacting_file, self.journal_file):
+                        if journal_file.exists():
+                            journal_file.unlink()
+            except Exception as e:
+                self.logger.error(f"关闭时合并数据日志失败: {e}")
+
+
+class SqliteStorageBackend(StorageBackend):
+    """SQLite 存储后端（WAL 模式，按行增量写入）"""
+
+    name = "sqlite"
+
+    def __init__(self, db_file: Path, logger, legacy_json_file: Path = None):
+        self.db_file = db_file
+        self.logger = logger
+        self.legacy_json_file = legacy_json_file
+        self._lock = threading.Lock()
+        # 已写入数据库的记录序列化结果 {player_name: json_text}，用于只写入发生变化的行
+        self._persisted_rows: Dict[str, str] = {}
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化数据表与索引"""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS players ("
+                " name TEXT PRIMARY KEY,"
+                " qq TEXT NOT NULL DEFAULT '',"
+                " xuid TEXT NOT NULL DEFAULT '',"
+                " is_banned INTEGER NOT NULL DEFAULT 0,"
+                " data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_qq ON players(qq)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_xuid ON players(xuid)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_is_banned ON players(is_banned)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def _row_values(name: str, record: Dict[str, Any], text: str):
+        """生成一行数据的列值"""
+        return (
+            name,
+            (record.get("qq") or "").strip(),
+            record.get("xuid") or "",
+            1 if record.get("is_banned", False) else 0,
+            text,
+        )
+
+    def _migrate_from_json(self):
+        """从旧的JSON数据文件单向迁移（仅执行一次，原文件保留作为备份）"""
+        if not self.legacy_json_file or not self.legacy_json_file.exists():
+            return
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if row:
+            return
+
+        try:
+            with open(self.legacy_json_file, 'r', encoding='utf-8') as f:
+                legacy_data = json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取待迁移的JSON数据失败，跳过迁移: {e}")
+            return
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO players (name, qq, xuid, is_banned, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    self._row_values(name, record, json.dumps(record, ensure_ascii=False))
+                    for name, record in legacy_data.items()
+                ]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(self.legacy_json_file),)
+            )
+
+        self.logger.info(f"已将 {len(legacy_data)} 条绑定数据从 {self.legacy_json_file.name} 迁移到 SQLite")
+        self.logger.warning("迁移为单向操作，此后数据仅写入SQLite，原JSON文件仅作为备份保留")
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取全部玩家数据（保持写入顺序）"""
+        with self._lock:
+            self._migrate_from_json()
+
+            data: Dict[str, Dict[str, Any]] = {}
+            self._persisted_rows = {}
+            for name, text in self._conn.execute("SELECT name, data FROM players ORDER BY rowid"):
+                try:
+                    data[name] = json.loads(text)
+                    self._persisted_rows[name] = text
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"SQLite 中玩家 {name} 的数据损坏，已跳过: {e}")
+            return data
+
+    def save_all(self, data: Dict[str, Dict[str, Any]]):
+        """对比全部记录，只对发生变化的行执行 upsert，并删除已不存在的行"""
+        with self._lock:
+            removed = [name for name in self._persisted_rows if name not in data]
+            self._write_rows(data, removed)
+
+    def save_changes(self, changed: Dict[str, Dict[str, Any]], removed: Iterable[str],
+                     snapshot: Callable[[], Dict[str, Dict[str, Any]]]):
+        """只写入发生变化的行"""
+        with self._lock:
+            self._write_rows(changed, removed)
+
+    def _write_rows(self, records: Dict[str, Dict[str, Any]], removed: Iterable[str]):
+        """在一个事务中 upsert 内容有变化的行并删除指定行（需持有锁）"""
+        changed_rows = []
+        serialized: Dict[str, str] = {}
+        for name, record in records.items():
+            text = json.dumps(record, ensure_ascii=False)
+            if self._persisted_rows.get(name) != text:
+                serialized[name] = text
+                changed_rows.append(self._row_values(name, record, text))
+
+        removed_names = [name for name in removed if name in self._persisted_rows]
+
+        if not changed_rows and not removed_names:
+            return
+
+        with self._conn:
+            if changed_rows:
+                self._conn.executemany(
+                    "INSERT INTO players (name, qq, xuid, is_banned, data) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET "
+                    "qq = excluded.qq, xuid = excluded.xuid, is_banned = excluded.is_banned, data = excluded.data",
+                    changed_rows
+                )
+            if removed_names:
+                self._conn.executemany("DELETE FROM players WHERE name = ?", [(name,) for name in removed_names])
+
+        self._persisted_rows.update(serialized)
+        for name in removed_names:
+            del self._persisted_rows[name]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                self.logger.warning(f"关闭SQLite数据库失败: {e}")
+
+
+class SaveWorker:
+    """后台保存线程
+
+    将保存请求合并后在独立线程中执行快照序列化与写盘，避免阻塞服务器主线程。
+    """
+
+    def __init__(self, save_func: Callable[[], None], logger, delay: float = 2.0):
+        self._save_func = save_func
+        self.logger = logger
+        self.delay = delay  # 合并窗口（秒），窗口内的多次请求只写一次
+        self._cond = threading.Condition()
+        self._requested = 0  # 已请求的保存序号
+        self._completed = 0  # 已完成的保存序号
+        self._reasons: List[str] = []
+        self._flush_requested = False
+        self._last_failed = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="qqsync-save-worker", daemon=True)
+        self._thread.start()
+
+    def request(self, reason: str = ""):
+        """提交保存请求（立即返回）"""
+        with self._cond:
+            self._requested += 1
+            if reason:
+                self._reasons.append(reason)
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 10) -> bool:
+        """立即执行所有待处理的保存并等待完成，返回是否成功"""
+        with self._cond:
+            target = self._requested
+            if self._completed >= target:
+                return not self._last_failed
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._completed >= target or not self._thread.is_alive(), timeout)
+            return self._completed >= target and not self._last_failed
+
+    def stop(self, timeout: float = 10):
+        """处理完剩余请求后停止线程"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            self.logger.warning(f"后台保存线程未能在{timeout}秒内结束")
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._requested > self._completed or not self._running)
+                    if self._requested <= self._completed:
+                        break
+
+                    # 防抖：在合并窗口内收集后续请求，flush 或停止时立即保存
+                    if self._running and not self._flush_requested:
+                        self._cond.wait_for(lambda: self._flush_requested or not self._running, self.delay)
+
+                    target = self._requested
+                    reasons, self._reasons = self._reasons, []
+                    self._flush_requested = False
+
+                failed = False
+                try:
+                    self._save_func()
+                    if reasons:
+                        summary = reasons[-1] if len(reasons) == 1 else f"{reasons[-1]} 等{len(reasons)}项"
+                        self.logger.info(f"合并数据保存成功: {summary}")
+                except Exception as e:
+                    failed = True
+                    self.logger.error(f"合并数据保存失败: {e}")
+
+                with self._cond:
+                    self._completed = target
+                    self._last_failed = failed
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+
+def create_storage_backend(backend_name: str, data_folder: Path, logger) -> StorageBackend:
+    """根据配置创建存储后端，未知类型回退到JSON（已有SQLite数据库时初始化失败会抛出异常）"""
+    json_file = data_folder / "data.json"
+
+    if backend_name == "sqlite":
+        db_file = data_folder / "data.db"
+        # 数据库已存在时，data.json 只是导入前的旧备份，回退到它会丢失之后的数据
+        db_exists = db_file.exists()
+        try:
+            return SqliteStorageBackend(db_file, logger, legacy_json_file=json_file)
+        except Exception as e:
+            if db_exists:
+                logger.error(f"初始化SQLite存储后端失败，{db_file} 中的数据无法读取，请检查数据库文件: {e}")
+                raise
+            logger.error(f"初始化SQLite存储后端失败，回退到JSON存储: {e}")
+    elif backend_name == "journal":
+        return JournalStorageBackend(json_file, logger)
+    elif backend_name != "json":
+        logger.warning(f"未知的存储后端类型 {backend_name}，使用默认JSON存储")
+
+    return JsonStorageBackend(json_file, logger)
@@ -4,7 +4,6 @@
 """
 
 import asyncio
-import json
 import random
 from ..utils.time_utils import TimeUtils
 from typing import Dict, List, Set, Any, Tuple, Optional
@@ -251,12 +250,8 @@ class VerificationManager:
                 except Exception as e:
                     self.logger.error(f"处理验证成功后续操作失败: {e}")
             
-            # 使用调度器在主线程执行，确保线程安全
-            self.plugin.server.scheduler.run_task(
-                self.plugin, 
-                handle_success, 
-                delay=1  # 1 tick 延迟确保状态同步
-            )
+            # 在主线程执行，确保线程安全
+            self.plugin.main_thread.call_soon(handle_success)
             
             # 清理验证数据 - verification_manager 统一管理
             del self.pending_verifications[player_name]
@@ -300,12 +295,8 @@ class VerificationManager:
                     except Exception as e:
                         self.logger.error(f"撤回验证码消息失败（次数达到上限）: {e}")
                 
-                # 使用调度器在主线程执行撤回，确保线程安全
-                self.plugin.server.scheduler.run_task(
-                    self.plugin, 
-                    handle_max_attempts, 
-                    delay=1  # 1 tick 延迟确保状态同步
-                )
+                # 在主线程执行撤回，确保线程安全
+                self.plugin.main_thread.call_soon(handle_max_attempts)
                 
                 # 清理统一尝试计数
                 if verification_key in self.unified_verification_attempts:
@@ -459,6 +450,13 @@ class VerificationManager:
         except Exception as e:
             self.logger.warning(f"清理玩家 {player_name} 验证缓存时出错: {e}")
     
+    async def _send_payload(self, payload: dict, group_id: int = None, ws=None, wait: bool = False):
+        """经由出站队列以验证优先级发送OneBot请求"""
+        from ..websocket.handlers import send_payload
+        from ..websocket.outbound import PRIORITY_VERIFICATION
+        await send_payload(ws or self.plugin._current_ws, payload, priority=PRIORITY_VERIFICATION,
+                           group_id=group_id, wait=wait)
+    
     async def _delete_verification_message(self, qq_number: str):
         """异步删除验证码消息"""
         try:
@@ -469,15 +467,16 @@ class VerificationManager:
                 self.logger.info(f"尝试撤回QQ {qq_number} 的验证码消息，message_id: {message_id}")
                 
                 if message_id and hasattr(self.plugin, '_current_ws') and self.plugin._current_ws:
+                    from ..websocket.client import make_echo
                     # 发送删除消息请求
                     payload = {
                         "action": "delete_msg",
                         "params": {
                             "message_id": message_id
                         },
-                        "echo": f"delete_msg_{int(TimeUtils.get_timestamp())}"
+                        "echo": make_echo("delete_msg")
                     }
-                    await self.plugin._current_ws.send(json.dumps(payload))
+                    await self._send_payload(payload)
                     self.logger.info(f"已发送撤回请求: QQ {qq_number}, message_id: {message_id}")
                 else:
                     if not message_id:
@@ -507,15 +506,14 @@ class VerificationManager:
             if hasattr(self.plugin, '_current_ws') and self.plugin._current_ws:
                 # 检查是否启用了群昵称同步
                 nickname_info = ""
-                if self.plugin.config_manager.get_config("sync_group_card", True):
+                if self.plugin.config_manager.snapshot.sync_group_card:
                     nickname_info = f"\n群昵称已自动设置为：{player_name}"
                 
                 success_message = f"\n[成功] 已完成QQ绑定验证\n玩家ID：{player_name}\nQQ号：{qq_number}{nickname_info}"
                 
                 # 发送@播报消息到所有群组
-                target_groups = self.plugin.config_manager.get_config("target_groups", [])
-                # 添加类型转换，确保group_id为整数类型
-                target_groups = [int(gid) for gid in target_groups]
+                from ..websocket.client import make_echo
+                target_groups = self.plugin.config_manager.snapshot.target_group_list
                 for group_id in target_groups:
                     payload = {
                         "action": "send_group_msg",
@@ -526,10 +524,10 @@ class VerificationManager:
                                 {"type": "text", "data": {"text": f" {success_message}"}}
                             ]
                         },
-                        "echo": f"bind_success_msg_{int(TimeUtils.get_timestamp())}_{group_id}"
+                        "echo": make_echo(f"bind_success_msg_{group_id}")
                     }
                     
-                    await self.plugin._current_ws.send(json.dumps(payload))
+                    await self._send_payload(payload, group_id=group_id)
                 
                 self.logger.info(f"已发送绑定成功播报: 玩家 {player_name} (QQ: {qq_number})")
             
@@ -540,7 +538,7 @@ class VerificationManager:
         """设置群昵称为游戏ID"""
         try:
             # 检查是否启用了群昵称同步
-            if not self.plugin.config_manager.get_config("sync_group_card", True):
+            if not self.plugin.config_manager.snapshot.sync_group_card:
                 self.logger.info(f"群昵称同步已禁用，跳过设置: QQ {qq_number}")
                 return
             
@@ -548,14 +546,11 @@ class VerificationManager:
                 self.logger.warning(f"无法设置群昵称: WebSocket 连接不可用")
                 return
             
-            target_groups = self.plugin.config_manager.get_config("target_groups", [])
+            target_groups = self.plugin.config_manager.snapshot.target_group_list
             if not target_groups:
                 self.logger.warning(f"无法设置群昵称: 未配置目标群组")
                 return
             
-            # 添加类型转换，确保group_id为整数类型
-            target_groups = [int(gid) for gid in target_groups]
-            
             # 构建设置群昵称的payload
             for group_id in target_groups:
                 payload = {
@@ -568,7 +563,7 @@ class VerificationManager:
                     "echo": f"set_group_card:{qq_number}:{player_name}:{group_id}"
                 }
                 
-                await self.plugin._current_ws.send(json.dumps(payload))
+                await self._send_payload(payload)
             
             self.logger.info(f"已发送设置群昵称请求: QQ {qq_number} -> {player_name}")
             
@@ -697,9 +692,7 @@ class VerificationManager:
     async def _send_verification_with_retry(self, ws, user_id: int, verification_text: str, player, verification_code: str, attempt: int):
         """异步发送验证码（带重试机制）"""
         try:
-            target_groups = self.plugin.config_manager.get_config("target_groups", [])
-            # 添加类型转换，确保group_id为整数类型
-            target_groups = [int(gid) for gid in target_groups]
+            target_groups = self.plugin.config_manager.snapshot.target_group_list
             qq_str = str(user_id)
             
             # 记录验证码消息等待回调
@@ -725,7 +718,8 @@ class VerificationManager:
                     "echo": f"verification_msg:{qq_str}:{group_id}"
                 }
                 
-                await ws.send(json.dumps(payload))
+                # 等待实际发出，发送失败时抛出异常进入重试流程
+                await self._send_payload(payload, group_id=group_id, ws=ws, wait=True)
             
             self.logger.info(f"验证码已发送给QQ {user_id} (玩家: {player.name})")
             
@@ -12,9 +12,13 @@ from .core import (
     DataManager, 
     VerificationManager,
     PermissionManager,
-    EventHandlers
+    EventHandlers,
+    OnlinePlayerIndex,
+    MainThreadBridge,
+    GroupMemberCache
 )
-from .websocket import WebSocketClient
+from .websocket import WebSocketClient, OutboundQueue
+from .websocket.outbound import PRIORITY_NOTICE
 from .websocket.handlers import set_plugin_instance, send_group_msg_to_all_groups
 from .ui import UIManager
 from .utils.time_utils import TimeUtils
@@ -135,6 +139,9 @@ class qqsync(Plugin):
         # 配置管理器
         self.config_manager = ConfigManager(Path(self.data_folder), self.logger)
         
+        # 主线程调度桥（事件循环线程 -> 主线程）
+        self.main_thread = MainThreadBridge(self, self.logger)
+        
         # 数据管理器
         self.data_manager = DataManager(self, Path(self.data_folder), self.logger)
         
@@ -150,8 +157,16 @@ class qqsync(Plugin):
         # UI管理器
         self.ui_manager = UIManager(self)
         
-        # 群成员缓存
-        self.group_members = set()
+        # 在线玩家索引（插件重载时补登已在线的玩家）
+        self.online_players = OnlinePlayerIndex(self.logger)
+        for player in self.server.online_players:
+            self.online_players.add(player)
+        
+        # 群成员缓存（按群保存快照，重启后在有效期内无需立即全量拉取）
+        self.group_members = GroupMemberCache(Path(self.data_folder) / "group_members.json", self.logger)
+        loaded = self.group_members.load(self.config_manager.snapshot.target_groups)
+        if loaded:
+            self.logger.info(f"已加载 {loaded} 个群的成员缓存，共 {len(self.group_members)} 人")
         self.logged_left_players = set()
         
         self.logger.info(f"{ColorFormat.AQUA}管理器初始化完成{ColorFormat.RESET}")
@@ -181,6 +196,24 @@ class qqsync(Plugin):
         self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
 
+        # 出站消息队列（按优先级发送并对每个群限速）
+        outbound_config = self.config_manager.get_config("outbound_queue", {}) or {}
+        self.outbound_queue = OutboundQueue(
+            self,
+            rate_per_group=outbound_config.get("rate_per_group", 1.0),
+            burst_per_group=outbound_config.get("burst_per_group", 5),
+            chat_merge_window=outbound_config.get("chat_merge_window", 0.3),
+            max_age=outbound_config.get("max_age", 60),
+            max_buffered=outbound_config.get("max_buffered", 200),
+            flush_rate=outbound_config.get("flush_rate", 3.0)
+        )
+        self._outbound_task = asyncio.run_coroutine_threadsafe(self.outbound_queue.run(), self._loop)
+
+        # 系统信息采样（/info 直接读取缓存，不在事件循环中阻塞采集）
+        from .utils.info import SystemInfoSampler
+        self.system_info = SystemInfoSampler(self.logger, interval=30)
+        self._system_info_task = asyncio.run_coroutine_threadsafe(self.system_info.run(), self._loop)
+
         # 把协程提交到该循环
         future = asyncio.run_coroutine_threadsafe(self.ws_client.connect_forever(), self._loop)
         self._task = future
@@ -192,6 +225,9 @@ class qqsync(Plugin):
 
     def _schedule_tasks(self):
         """安排定时任务"""
+        # 主线程调度桥，每tick执行一次
+        self.main_thread.start()
+        
         # 定时清理任务
         self.server.scheduler.run_task(
             self,
@@ -256,6 +292,9 @@ class qqsync(Plugin):
             if offline_players:
                 self.logger.info(f"已清理 {len(offline_players)} 个离线玩家的缓存数据")
             
+            # 校验绑定数据反向索引
+            self.data_manager.check_index_consistency()
+            
         except Exception as e:
             self.logger.error(f"清理过期数据失败: {e}")
 
@@ -263,8 +302,8 @@ class qqsync(Plugin):
         """更新群成员缓存"""
         try:
             # 只有在启用强制绑定和退群检测时才更新群成员缓存
-            if not (self.config_manager.get_config("force_bind_qq", True) and 
-                    self.config_manager.get_config("check_group_member", True)):
+            if not (self.config_manager.snapshot.force_bind_qq and 
+                    self.config_manager.snapshot.check_group_member):
                 return
                 
             if self._current_ws:
@@ -288,6 +327,9 @@ class qqsync(Plugin):
             # 获取当前在线玩家列表
             online_players = list(self.server.online_players)
             
+            # 以服务器列表为准校正在线玩家索引
+            self.online_players.reconcile(online_players)
+            
             # 更新计时器
             self.data_manager.update_online_timers(online_players)
             
@@ -319,7 +361,7 @@ class qqsync(Plugin):
                 player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.YELLOW}如需重新绑定，请联系管理员{ColorFormat.RESET}")
             else:
                 # 玩家未绑定，显示绑定表单
-                if self.config_manager.get_config("force_bind_qq", True):
+                if self.config_manager.snapshot.force_bind_qq:
                     player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.YELLOW}您尚未绑定QQ，正在为您显示绑定表单...{ColorFormat.RESET}")
                     # 延迟显示表单，确保消息先发送
                     self.server.scheduler.run_task(
@@ -337,6 +379,18 @@ class qqsync(Plugin):
                 sender.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.RED}命令执行出错，请重试！{ColorFormat.RESET}")
             return False
 
+    def get_online_player(self, player_name: str):
+        """按玩家名获取在线玩家对象，不在线返回None"""
+        return self.online_players.get_by_name(player_name)
+
+    def get_online_player_by_xuid(self, xuid: str):
+        """按XUID获取在线玩家对象，不在线返回None"""
+        return self.online_players.get_by_xuid(xuid)
+
+    def is_player_online(self, player_name: str) -> bool:
+        """检查玩家是否在线"""
+        return self.online_players.is_online(player_name)
+
     def is_valid_player(self, player) -> bool:
         """检查玩家对象是否有效且在线"""
         try:
@@ -348,12 +402,19 @@ class qqsync(Plugin):
         except Exception:
             return False
         
+    def can_send_to_qq(self) -> bool:
+        """QQ消息能否发出：已连接，或正在重连（消息暂存在出站队列中，重连后补发）"""
+        ws_client = getattr(self, "ws_client", None)
+        return ws_client is not None and ws_client.accepts_outbound
+        
     def api_send_message(self, text: str) -> bool:
         """
         QQ消息API
         """
-        api_qq_enabled = self.config_manager.get_config("api_qq_enable", False)
+        api_qq_enabled = self.config_manager.snapshot.api_qq_enable
         if api_qq_enabled:
+            if not self.can_send_to_qq():
+                return False
             try:
                 asyncio.run_coroutine_threadsafe(
                     send_group_msg_to_all_groups(self._current_ws, text=text),
@@ -384,7 +445,7 @@ class qqsync(Plugin):
                 try:
                     server_end_msg = "[QQSync] 服务器已停止！"
                     future = asyncio.run_coroutine_threadsafe(
-                        send_group_msg_to_all_groups(self._current_ws, server_end_msg),
+                        send_group_msg_to_all_groups(self._current_ws, server_end_msg, priority=PRIORITY_NOTICE, wait=True),
                         self._loop
                     )
                     # 等待消息发送完成，但设置超时
@@ -399,12 +460,55 @@ class qqsync(Plugin):
             if hasattr(self, 'data_manager'):
                 # 清理计时器系统
                 self.data_manager.cleanup_timer_system()
-                # 保存最终数据
-                self.data_manager.save_data()
+                # 等待后台保存完成，失败时同步保存最终数据
+                if not self.data_manager.flush(timeout=10):
+                    self.logger.warning("后台保存未完成，改为同步保存数据")
+                    self.data_manager.save_data()
+                # 停止后台保存并关闭存储后端
+                self.data_manager.close()
+            
+            # 保存群成员缓存
+            if hasattr(self, 'group_members'):
+                self.group_members.save()
+            
+            # 停止主线程调度桥
+            if hasattr(self, 'main_thread') and self.main_thread:
+                stats = self.main_thread.stats
+                self.logger.info(f"游戏广播统计: {stats['broadcast_ticks']} 次广播, 共 {stats['broadcast_messages']} 条消息, 送达 {stats['broadcast_deliveries']} 人次, 单tick最多 {stats['max_broadcast_per_tick']} 条")
+                self.main_thread.stop()
+            
+            # 停止系统信息采样
+            if hasattr(self, '_system_info_task') and self._system_info_task:
+                self.system_info.stop()
+                self._system_info_task.cancel()
+            
+            # 停止出站消息队列
+            if hasattr(self, 'outbound_queue') and self.outbound_queue:
+                metrics = self.outbound_queue.get_metrics()
+                self.logger.info(f"出站消息统计: 已发送 {metrics['sent']} 条, 合并 {metrics['coalesced']} 条, 丢弃 {metrics['dropped']} 条, 最大积压 {metrics['max_depth']}")
+                self.logger.info(f"断线暂存统计: 断线期间暂存 {metrics['buffered_while_offline']} 条, 重连后补发 {metrics['flushed']} 条, 超出上限丢弃 {metrics['overflow']} 条")
+                if self._loop and self._loop.is_running():
+                    self._loop.call_soon_threadsafe(self.outbound_queue.stop)
             
             # 停止WebSocket连接
             if hasattr(self, 'ws_client') and self.ws_client:
+                dispatch_metrics = self.ws_client.dispatcher.get_metrics()
+                self.logger.info(f"入站事件统计: 已调度 {dispatch_metrics['dispatched']} 个, 快速通道 {dispatch_metrics['fast_lane']} 个, 失败 {dispatch_metrics['failed']} 个, 最大并发 {dispatch_metrics['max_in_flight']}")
+                conn_metrics = self.ws_client.get_metrics()
+                self.logger.info(f"连接统计: 重连 {conn_metrics['reconnects']} 次, 连接失败 {conn_metrics['failed_attempts']} 次, 累计断线 {conn_metrics['total_outage']:.1f} 秒, 最长断线 {conn_metrics['max_outage']:.1f} 秒")
+                if len(conn_metrics['endpoints']) > 1:
+                    self.logger.info(f"多端点统计: 主备切换 {conn_metrics['failovers']} 次, 重复事件去重 {conn_metrics['duplicates_dropped']} 个, 忽略机器人互见消息 {conn_metrics['own_messages_dropped']} 条")
+                if conn_metrics['reverse_ws'] is not None:
+                    self.logger.info(f"反向WS统计: 接受连接 {conn_metrics['reverse_ws']['accepted']} 次, 拒绝连接 {conn_metrics['reverse_ws']['rejected']} 次")
                 self.ws_client.stop()
+                
+                # 等待已提交的入站事件处理完成（超时后取消剩余任务），之后才能停止事件循环
+                if hasattr(self, '_loop') and self._loop and self._loop.is_running():
+                    try:
+                        future = asyncio.run_coroutine_threadsafe(self.ws_client.dispatcher.close(timeout=5), self._loop)
+                        future.result(timeout=6)
+                    except Exception as e:
+                        self.logger.warning(f"关闭入站事件调度器失败: {e}")
             
             # 停止事件循环
             if hasattr(self, '_loop') and self._loop:
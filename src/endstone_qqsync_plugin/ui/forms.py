@@ -26,7 +26,7 @@ class UIManager:
             
         try:
             # 根据是否启用强制绑定显示不同的内容
-            if self.plugin.config_manager.get_config("force_bind_qq", True):
+            if self.plugin.config_manager.snapshot.force_bind_qq:
                 controls = [
                     Divider(),
                     Label("为了更好的游戏体验，请绑定您的QQ号"),
@@ -61,7 +61,7 @@ class UIManager:
             
             form.on_submit = lambda p, form_data: self._handle_qq_form_submit(p, form_data) if self._is_valid_player(p) else None
             close_message = f"{ColorFormat.GRAY}[QQsync] {ColorFormat.YELLOW}您可以稍后通过命令 /bindqq 进行QQ绑定{ColorFormat.RESET}"
-            if not self.plugin.config_manager.get_config("force_bind_qq", True):
+            if not self.plugin.config_manager.snapshot.force_bind_qq:
                 close_message = f"{ColorFormat.GRAY}[QQsync] {ColorFormat.AQUA}QQ绑定已取消，您可以正常游戏{ColorFormat.RESET}"
             form.on_close = lambda p: p.send_message(close_message) if self._is_valid_player(p) else None
             
@@ -155,7 +155,7 @@ QQ号: {qq_number}
             
             if not is_valid_qq_number(qq_input):
                 player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.RED}请输入有效的QQ号（5-11位数字）！{ColorFormat.RESET}")
-                if self.plugin.config_manager.get_config("force_bind_qq", True):
+                if self.plugin.config_manager.snapshot.force_bind_qq:
                     self.plugin.server.scheduler.run_task(
                         self.plugin,
                         lambda p=player: self.show_qq_binding_form(p) if self._is_valid_player(p) else None,
@@ -176,14 +176,14 @@ QQ号: {qq_number}
                 return
             
             # 检查QQ号是否在群内
-            if (self.plugin.config_manager.get_config("force_bind_qq", True) and 
-                self.plugin.config_manager.get_config("check_group_member", True)):
+            if (self.plugin.config_manager.snapshot.force_bind_qq and 
+                self.plugin.config_manager.snapshot.check_group_member):
                 if hasattr(self.plugin, 'group_members') and self.plugin.group_members:
                     if qq_input not in self.plugin.group_members:
                         player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.RED}该QQ号不在目标群内，无法绑定！{ColorFormat.RESET}")
                         # 获取所有目标群组
-                        target_groups = self.plugin.config_manager.get_config("target_groups", [])
-                        group_names = self.plugin.config_manager.get_config("group_names", {})
+                        target_groups = self.plugin.config_manager.snapshot.target_group_list
+                        group_names = self.plugin.config_manager.snapshot.group_names
                         
                         # 构建群列表消息
                         if target_groups:
@@ -269,7 +269,7 @@ QQ号: {qq_number}
                 player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.AQUA}您的QQ {pending_info['qq']} 已与游戏账号绑定{ColorFormat.RESET}")
                 
                 # 恢复玩家权限
-                if self.plugin.config_manager.get_config("force_bind_qq", True):
+                if self.plugin.config_manager.snapshot.force_bind_qq:
                     self.plugin.server.scheduler.run_task(
                         self.plugin,
                         lambda: self.plugin.permission_manager.restore_player_permissions(player),
@@ -278,8 +278,8 @@ QQ号: {qq_number}
                 
                 # 设置QQ群昵称 - 在所有配置的群组中设置
                 if (hasattr(self.plugin, '_current_ws') and self.plugin._current_ws and 
-                    self.plugin.config_manager.get_config("force_bind_qq", True) and 
-                    self.plugin.config_manager.get_config("sync_group_card", True)):
+                    self.plugin.config_manager.snapshot.force_bind_qq and 
+                    self.plugin.config_manager.snapshot.sync_group_card):
                     
                     from ..websocket.handlers import set_group_card_in_all_groups
                     asyncio.run_coroutine_threadsafe(
@@ -335,44 +335,30 @@ QQ号: {qq_number}
     async def _get_qq_nickname_and_confirm(self, ws, player, qq_number):
         """异步获取QQ昵称并显示确认表单"""
         try:
-            # 发送获取用户信息请求
-            payload = {
-                "action": "get_stranger_info",
-                "params": {
-                    "user_id": int(qq_number),
-                    "no_cache": True
-                },
-                "echo": f"get_stranger_info_{qq_number}_{int(TimeUtils.get_timestamp())}"
-            }
-            
             # 尝试获取QQ昵称，失败则使用默认昵称
             nickname = "未知昵称"
             try:
                 self.logger.info(f"发送获取QQ昵称请求: {qq_number}")
-                await ws.send(json.dumps(payload))
+                response = await self.plugin.ws_client.call(
+                    "get_stranger_info",
+                    {"user_id": int(qq_number), "no_cache": True},
+                    timeout=3
+                )
                 
-                # 等待更长时间让响应到达，并多次检查
-                for attempt in range(10):  # 最多等待3秒（每次0.3秒）
-                    await asyncio.sleep(0.3)
+                response_data = response.get("data") or {}
+                if response.get("status") == "ok" and response.get("retcode") == 0 and response_data.get("nickname"):
+                    nickname = response_data["nickname"]
+                    self.logger.info(f"获取到QQ {qq_number} 昵称: {nickname}")
                     
-                    # 检查是否通过WebSocket响应更新了昵称
-                    if player.name in self.plugin.verification_manager.pending_qq_confirmations:
-                        updated_info = self.plugin.verification_manager.pending_qq_confirmations[player.name]
-                        updated_nickname = updated_info.get("nickname", "未知昵称")
-                        
-                        # 如果昵称已更新且不是默认值，则使用更新后的昵称
-                        if updated_nickname != "未知昵称":
-                            nickname = updated_nickname
-                            self.logger.info(f"获取到QQ {qq_number} 昵称: {nickname}")
-                            break
-                    else:
-                        self.logger.warning(f"玩家 {player.name} 的待确认信息已丢失")
-                        break
-                
-                # 如果仍然是默认昵称，记录警告
-                if nickname == "未知昵称":
-                    self.logger.warning(f"获取QQ {qq_number} 昵称超时，使用默认昵称")
-                        
+                    # 同步更新待确认信息
+                    pending_info = self.plugin.verification_manager.pending_qq_confirmations.get(player.name)
+                    if pending_info is not None:
+                        pending_info["nickname"] = nickname
+                else:
+                    self.logger.warning(f"获取QQ用户信息失败: retcode={response.get('retcode')}, msg={response.get('msg', '未知错误')}")
+                    
+            except asyncio.TimeoutError:
+                self.logger.warning(f"获取QQ {qq_number} 昵称超时，使用默认昵称")
             except Exception as e:
                 self.logger.warning(f"获取QQ昵称失败: {e}")
             
@@ -386,8 +372,8 @@ QQ号: {qq_number}
                     if self._is_valid_player(player):
                         player.send_message(f"{ColorFormat.GRAY}[QQsync] {ColorFormat.RED}显示确认表单失败，请重试！{ColorFormat.RESET}")
             
-            # 使用调度器在主线程执行
-            self.plugin.server.scheduler.run_task(self.plugin, show_form, delay=1)
+            # 在主线程执行
+            self.plugin.main_thread.call_soon(show_form)
             
         except Exception as e:
             self.logger.error(f"获取QQ昵称过程出错: {e}")
@@ -395,7 +381,7 @@ QQ号: {qq_number}
             def show_form():
                 if self._is_valid_player(player):
                     self.show_qq_confirmation_form(player, qq_number, "未知昵称")
-            self.plugin.server.scheduler.run_task(self.plugin, show_form, delay=1)
+            self.plugin.main_thread.call_soon(show_form)
     
     def _extract_form_input(self, form_data: str) -> str:
         """从表单数据中提取输入内容"""
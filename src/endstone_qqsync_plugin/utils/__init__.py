@@ -9,7 +9,10 @@ from .message_utils import (
     parse_qq_message,
     clean_message_text,
     truncate_message,
-    filter_sensitive_content
+    format_qq_message_for_game,
+    filter_sensitive_content,
+    SensitiveWordFilter,
+    build_sensitive_filter
 )
 
 __all__ = [
@@ -23,5 +26,8 @@ __all__ = [
     "parse_qq_message",
     "clean_message_text",
     "truncate_message",
-    "filter_sensitive_content"
+    "format_qq_message_for_game",
+    "filter_sensitive_content",
+    "SensitiveWordFilter",
+    "build_sensitive_filter"
 ]
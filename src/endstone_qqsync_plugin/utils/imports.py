@@ -26,5 +26,15 @@ def import_websockets():
     except ImportError as e:
         raise ImportError(f"无法导入websockets库: {e}")
 
+def websockets_speedups_enabled() -> bool:
+    """检查websockets是否使用C扩展进行帧掩码（没有适用于当前平台的扩展时回退到纯Python实现）"""
+    setup_lib_path()
+    try:
+        from websockets.frames import apply_mask
+        from websockets.utils import apply_mask as python_apply_mask
+    except ImportError:
+        return False
+    return apply_mask is not python_apply_mask
+
 # 在模块导入时自动设置路径
 setup_lib_path()
@@ -1,5 +1,7 @@
+import asyncio
 import sys
 import platform
+import time
 import psutil
 import subprocess
 
@@ -189,18 +191,35 @@ def get_system_info():
         except PermissionError:
             print(f"  {partition.device} - 无法访问")
 
-def get_system_info_dict():
+def get_static_system_info():
     """
-    获取系统信息并返回字典格式
+    获取运行期间不会变化的系统信息（可能启动子进程，耗时较长）
     
     Returns:
-        dict: 包含系统信息的字典
+        dict: {'os', 'cpu': {'model', 'max_freq_ghz', 'physical_cores', 'logical_cores'}}
+    """
+    return {
+        'os': get_os_info(),
+        'cpu': {
+            'model': get_cpu_name() or "未知",
+            'max_freq_ghz': get_cpu_max_freq(),
+            'physical_cores': psutil.cpu_count(logical=False),
+            'logical_cores': psutil.cpu_count(logical=True)
+        }
+    }
+
+def get_dynamic_system_info(cpu_interval=1):
+    """
+    获取会变化的系统指标
+    
+    Args:
+        cpu_interval: CPU使用率采样时长（秒）；None 表示返回自上次调用以来的平均使用率，不阻塞
+    
+    Returns:
+        dict: {'cpu': {'current_freq_ghz', 'usage_percent'}, 'memory', 'disks'}
     """
-    os_info = get_os_info()
-    cpu_model = get_cpu_name()
-    cpu_max_freq = get_cpu_max_freq()
     cpu_freq = psutil.cpu_freq()
-    cpu_usage = psutil.cpu_percent(interval=1)
+    cpu_usage = psutil.cpu_percent(interval=cpu_interval)
     cpu_usage = max(0, cpu_usage)
     mem = psutil.virtual_memory()
     
@@ -232,14 +251,9 @@ def get_system_info_dict():
             })
     
     return {
-        'os': os_info,
         'cpu': {
-            'model': cpu_model,
-            'max_freq_ghz': cpu_max_freq,
             'current_freq_ghz': cpu_freq.current/1000 if cpu_freq and cpu_freq.current else None,
-            'usage_percent': cpu_usage,
-            'physical_cores': psutil.cpu_count(logical=False),
-            'logical_cores': psutil.cpu_count(logical=True)
+            'usage_percent': cpu_usage
         },
         'memory': {
             'total_gb': round(mem.total / (1024 ** 3), 2),
@@ -249,6 +263,84 @@ def get_system_info_dict():
         'disks': disk_info
     }
 
+def _merge_system_info(static_info, dynamic_info):
+    """合并静态信息与动态指标为 get_system_info_dict 的格式"""
+    return {
+        'os': static_info['os'],
+        'cpu': {**static_info['cpu'], **dynamic_info['cpu']},
+        'memory': dynamic_info['memory'],
+        'disks': dynamic_info['disks']
+    }
+
+def get_system_info_dict():
+    """
+    获取系统信息并返回字典格式（同步阻塞约1秒，事件循环中请使用 SystemInfoSampler）
+    
+    Returns:
+        dict: 包含系统信息的字典
+    """
+    return _merge_system_info(get_static_system_info(), get_dynamic_system_info())
+
+
+class SystemInfoSampler:
+    """
+    系统信息采样器
+    
+    静态信息在启动时于线程池中采集一次，动态指标由后台任务定期刷新，
+    查询时直接返回缓存的快照，不阻塞事件循环。
+    """
+    
+    def __init__(self, logger, interval: float = 30.0):
+        self.logger = logger
+        self.interval = max(1.0, float(interval))
+        self._static = None
+        self._dynamic = None
+        self._updated = 0.0
+        self._running = False
+    
+    async def run(self):
+        """采样循环，在插件事件循环中运行直到 stop"""
+        loop = asyncio.get_running_loop()
+        self._running = True
+        try:
+            self._static = await loop.run_in_executor(None, get_static_system_info)
+            # 首次采样阻塞1秒取得有效的CPU使用率，之后取两次采样之间的平均值
+            cpu_interval = 1
+            while self._running:
+                try:
+                    self._dynamic = await loop.run_in_executor(None, get_dynamic_system_info, cpu_interval)
+                    self._updated = time.time()
+                    cpu_interval = None
+                except Exception as e:
+                    self.logger.warning(f"刷新系统信息失败: {e}")
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.logger.error(f"系统信息采样失败: {e}")
+        finally:
+            self._running = False
+    
+    def stop(self):
+        """停止采样（下一次刷新前退出）"""
+        self._running = False
+    
+    @property
+    def updated(self) -> float:
+        """最近一次刷新动态指标的时间戳，0 表示尚未采样"""
+        return self._updated
+    
+    def snapshot(self):
+        """
+        获取缓存的系统信息
+        
+        Returns:
+            dict: 与 get_system_info_dict 相同格式；首次采样完成前返回 None
+        """
+        if self._static is None or self._dynamic is None:
+            return None
+        return _merge_system_info(self._static, self._dynamic)
+
 def print_system_info():
     """打印格式化的系统信息（原来的 get_system_info 函数）"""
     get_system_info()
@@ -4,6 +4,102 @@
 """
 
 import re
+from functools import lru_cache
+
+
+# 常见emoji映射表（均为单个码位，可直接构建 str.translate 转换表）
+_EMOJI_MAP = {
+    '😀': '[笑脸]', '😁': '[开心]', '😂': '[笑哭]', '🤣': '[大笑]', '😃': '[微笑]',
+    '😄': '[开心]', '😅': '[汗笑]', '😆': '[眯眼笑]', '😉': '[眨眼]', '😊': '[微笑]',
+    '😋': '[流口水]', '😎': '[酷]', '😍': '[花眼]', '😘': '[飞吻]', '🥰': '[三颗心]',
+    '😗': '[亲吻]', '😙': '[亲吻]', '😚': '[亲吻]', '☺': '[微笑]', '🙂': '[微笑]',
+    '🤗': '[拥抱]', '🤩': '[星眼]', '🤔': '[思考]', '🤨': '[怀疑]', '😐': '[面无表情]',
+    '😑': '[无语]', '😶': '[无言]', '🙄': '[白眼]', '😏': '[坏笑]', '😣': '[困扰]',
+    '😥': '[失望]', '😮': '[惊讶]', '🤐': '[闭嘴]', '😯': '[惊讶]', '😪': '[困倦]',
+    '😫': '[疲倦]', '😴': '[睡觉]', '😌': '[安心]', '😛': '[吐舌]', '😜': '[眨眼吐舌]',
+    '😝': '[闭眼吐舌]', '🤤': '[流口水]', '😒': '[无聊]', '😓': '[冷汗]', '😔': '[沮丧]',
+    '😕': '[困惑]', '🙃': '[倒脸]', '🤑': '[财迷]', '😲': '[震惊]', '☹': '[皱眉]',
+    '🙁': '[皱眉]', '😖': '[困扰]', '😞': '[失望]', '😟': '[担心]', '😤': '[愤怒]',
+    '😢': '[流泪]', '😭': '[大哭]', '😦': '[皱眉]', '😧': '[痛苦]', '😨': '[害怕]',
+    '😩': '[疲倦]', '🤯': '[爆头]', '😬': '[咧嘴]', '😰': '[冷汗]', '😱': '[尖叫]',
+    '🥵': '[热]', '🥶': '[冷]', '😳': '[脸红]', '🤪': '[疯狂]', '😵': '[晕]',
+    '😡': '[愤怒]', '😠': '[生气]', '🤬': '[咒骂]', '😷': '[口罩]', '🤒': '[生病]',
+    '🤕': '[受伤]', '🤢': '[恶心]', '🤮': '[呕吐]', '🤧': '[喷嚏]', '😇': '[天使]',
+    '🥳': '[庆祝]', '🥺': '[请求]', '🤠': '[牛仔]', '🤡': '[小丑]', '🤥': '[说谎]',
+    '🤫': '[嘘]', '🤭': '[捂嘴笑]', '🧐': '[单片眼镜]', '🤓': '[书呆子]',
+    
+    # 手势
+    '👍': '[赞]', '👎': '[踩]', '👌': '[OK]', '✌': '[胜利]', '🤞': '[交叉手指]',
+    '🤟': '[爱你]', '🤘': '[摇滚]', '🤙': '[打电话]', '👈': '[左指]', '👉': '[右指]',
+    '👆': '[上指]', '👇': '[下指]', '☝': '[食指]', '✋': '[举手]', '🤚': '[举手背]',
+    '🖐': '[张开手]', '🖖': '[瓦肯礼]', '👋': '[挥手]', '🤛': '[左拳]', '🤜': '[右拳]',
+    '👊': '[拳头]', '✊': '[拳头]', '👏': '[拍手]', '🙌': '[举双手]', '👐': '[张开双手]',
+    '🤲': '[捧手]', '🙏': '[祈祷]', '✍': '[写字]', '💪': '[肌肉]',
+    
+    # 心形
+    '❤': '[红心]', '🧡': '[橙心]', '💛': '[黄心]', '💚': '[绿心]', '💙': '[蓝心]',
+    '💜': '[紫心]', '🖤': '[黑心]', '🤍': '[白心]', '🤎': '[棕心]', '💔': '[心碎]',
+    '❣': '[心叹号]', '💕': '[两颗心]', '💞': '[旋转心]', '💓': '[心跳]', '💗': '[增长心]',
+    '💖': '[闪亮心]', '💘': '[心箭]', '💝': '[心礼盒]', '💟': '[心装饰]',
+    
+    # 常用符号
+    '🔥': '[火]', '💯': '[100分]', '💢': '[愤怒]', '💥': '[爆炸]', '💫': '[星星]',
+    '💦': '[汗滴]', '💨': '[风]', '🕳': '[洞]', '💣': '[炸弹]', '💤': '[睡觉]',
+    '👀': '[眼睛]', '🗨': '[对话框]', '💭': '[思考泡泡]',
+    
+    # 动物（常见的）
+    '🐶': '[小狗]', '🐱': '[小猫]', '🐭': '[老鼠]', '🐹': '[仓鼠]', '🐰': '[兔子]',
+    '🦊': '[狐狸]', '🐻': '[熊]', '🐼': '[熊猫]', '🐨': '[考拉]', '🐯': '[老虎]',
+    '🦁': '[狮子]', '🐮': '[牛]', '🐷': '[猪]', '🐽': '[猪鼻]', '🐸': '[青蛙]',
+    '🐵': '[猴脸]', '🙈': '[非礼勿视]', '🙉': '[非礼勿听]', '🙊': '[非礼勿言]',
+}
+
+# emoji -> 文本描述的转换表，一次遍历完成全部替换
+_EMOJI_TRANSLATION = str.maketrans(_EMOJI_MAP)
+
+# 未映射的unicode emoji
+_EMOJI_FALLBACK_PATTERN = re.compile(
+    '['
+    '\U0001F600-\U0001F64F'  # 表情符号
+    '\U0001F300-\U0001F5FF'  # 符号和象形文字
+    '\U0001F680-\U0001F6FF'  # 交通和地图符号
+    '\U0001F1E0-\U0001F1FF'  # 国旗
+    '\U00002600-\U000026FF'  # 杂项符号
+    '\U00002700-\U000027BF'  # 装饰符号
+    '\U0001F900-\U0001F9FF'  # 补充符号和象形文字
+    '\U0001FA70-\U0001FAFF'  # 符号和象形文字扩展-A
+    '\U00002300-\U000023FF'  # 杂项技术符号
+    '\U0001F000-\U0001F02F'  # 麻将符号
+    '\U0001F0A0-\U0001F0FF'  # 扑克符号
+    ']+',
+    flags=re.UNICODE
+)
+
+# 匹配CQ码格式: [CQ:type,param1=value1,param2=value2]
+_CQ_PATTERN = re.compile(r'\[CQ:([^,\]]+)(?:,([^\]]*))?\]')
+_CQ_AT_QQ_PATTERN = re.compile(r'qq=(\d+)')
+
+# CQ码类型 -> 显示文本（at 需要解析参数，单独处理）
+_CQ_TYPE_TEXT = {
+    "image": "[图片]",
+    "video": "[视频]",
+    "record": "[语音]",
+    "face": "[表情]",
+    "reply": "[回复]",
+    "forward": "[转发]",
+    "file": "[文件]",
+    "share": "[分享]",
+    "location": "[位置]",
+    "music": "[音乐]",
+    "xml": "[卡片]",
+    "json": "[卡片]",
+}
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_CONTROL_CHAR_PATTERN = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+# 游戏内显示的最大消息长度
+GAME_MESSAGE_MAX_LENGTH = 150
 
 
 def remove_emoji_for_game(text):
@@ -13,80 +109,27 @@ def remove_emoji_for_game(text):
     if not text:
         return text
     
-    # 常见emoji映射表
-    emoji_map = {
-        '😀': '[笑脸]', '😁': '[开心]', '😂': '[笑哭]', '🤣': '[大笑]', '😃': '[微笑]',
-        '😄': '[开心]', '😅': '[汗笑]', '😆': '[眯眼笑]', '😉': '[眨眼]', '😊': '[微笑]',
-        '😋': '[流口水]', '😎': '[酷]', '😍': '[花眼]', '😘': '[飞吻]', '🥰': '[三颗心]',
-        '😗': '[亲吻]', '😙': '[亲吻]', '😚': '[亲吻]', '☺': '[微笑]', '🙂': '[微笑]',
-        '🤗': '[拥抱]', '🤩': '[星眼]', '🤔': '[思考]', '🤨': '[怀疑]', '😐': '[面无表情]',
-        '😑': '[无语]', '😶': '[无言]', '🙄': '[白眼]', '😏': '[坏笑]', '😣': '[困扰]',
-        '😥': '[失望]', '😮': '[惊讶]', '🤐': '[闭嘴]', '😯': '[惊讶]', '😪': '[困倦]',
-        '😫': '[疲倦]', '😴': '[睡觉]', '😌': '[安心]', '😛': '[吐舌]', '😜': '[眨眼吐舌]',
-        '😝': '[闭眼吐舌]', '🤤': '[流口水]', '😒': '[无聊]', '😓': '[冷汗]', '😔': '[沮丧]',
-        '😕': '[困惑]', '🙃': '[倒脸]', '🤑': '[财迷]', '😲': '[震惊]', '☹': '[皱眉]',
-        '🙁': '[皱眉]', '😖': '[困扰]', '😞': '[失望]', '😟': '[担心]', '😤': '[愤怒]',
-        '😢': '[流泪]', '😭': '[大哭]', '😦': '[皱眉]', '😧': '[痛苦]', '😨': '[害怕]',
-        '😩': '[疲倦]', '🤯': '[爆头]', '😬': '[咧嘴]', '😰': '[冷汗]', '😱': '[尖叫]',
-        '🥵': '[热]', '🥶': '[冷]', '😳': '[脸红]', '🤪': '[疯狂]', '😵': '[晕]',
-        '😡': '[愤怒]', '😠': '[生气]', '🤬': '[咒骂]', '😷': '[口罩]', '🤒': '[生病]',
-        '🤕': '[受伤]', '🤢': '[恶心]', '🤮': '[呕吐]', '🤧': '[喷嚏]', '😇': '[天使]',
-        '🥳': '[庆祝]', '🥺': '[请求]', '🤠': '[牛仔]', '🤡': '[小丑]', '🤥': '[说谎]',
-        '🤫': '[嘘]', '🤭': '[捂嘴笑]', '🧐': '[单片眼镜]', '🤓': '[书呆子]',
-        
-        # 手势
-        '👍': '[赞]', '👎': '[踩]', '👌': '[OK]', '✌': '[胜利]', '🤞': '[交叉手指]',
-        '🤟': '[爱你]', '🤘': '[摇滚]', '🤙': '[打电话]', '👈': '[左指]', '👉': '[右指]',
-        '👆': '[上指]', '👇': '[下指]', '☝': '[食指]', '✋': '[举手]', '🤚': '[举手背]',
-        '🖐': '[张开手]', '🖖': '[瓦肯礼]', '👋': '[挥手]', '🤛': '[左拳]', '🤜': '[右拳]',
-        '👊': '[拳头]', '✊': '[拳头]', '👏': '[拍手]', '🙌': '[举双手]', '👐': '[张开双手]',
-        '🤲': '[捧手]', '🙏': '[祈祷]', '✍': '[写字]', '💪': '[肌肉]',
-        
-        # 心形
-        '❤': '[红心]', '🧡': '[橙心]', '💛': '[黄心]', '💚': '[绿心]', '💙': '[蓝心]',
-        '💜': '[紫心]', '🖤': '[黑心]', '🤍': '[白心]', '🤎': '[棕心]', '💔': '[心碎]',
-        '❣': '[心叹号]', '💕': '[两颗心]', '💞': '[旋转心]', '💓': '[心跳]', '💗': '[增长心]',
-        '💖': '[闪亮心]', '💘': '[心箭]', '💝': '[心礼盒]', '💟': '[心装饰]',
-        
-        # 常用符号
-        '🔥': '[火]', '💯': '[100分]', '💢': '[愤怒]', '💥': '[爆炸]', '💫': '[星星]',
-        '💦': '[汗滴]', '💨': '[风]', '🕳': '[洞]', '💣': '[炸弹]', '💤': '[睡觉]',
-        '👀': '[眼睛]', '🗨': '[对话框]', '💭': '[思考泡泡]',
-        
-        # 动物（常见的）
-        '🐶': '[小狗]', '🐱': '[小猫]', '🐭': '[老鼠]', '🐹': '[仓鼠]', '🐰': '[兔子]',
-        '🦊': '[狐狸]', '🐻': '[熊]', '🐼': '[熊猫]', '🐨': '[考拉]', '🐯': '[老虎]',
-        '🦁': '[狮子]', '🐮': '[牛]', '🐷': '[猪]', '🐽': '[猪鼻]', '🐸': '[青蛙]',
-        '🐵': '[猴脸]', '🙈': '[非礼勿视]', '🙉': '[非礼勿听]', '🙊': '[非礼勿言]',
-    }
-    
-    # 替换已知的emoji
-    result = text
-    for emoji, description in emoji_map.items():
-        result = result.replace(emoji, description)
-    
-    # 使用正则表达式移除其他unicode emoji
-    emoji_pattern = re.compile(
-        '['
-        '\U0001F600-\U0001F64F'  # 表情符号
-        '\U0001F300-\U0001F5FF'  # 符号和象形文字
-        '\U0001F680-\U0001F6FF'  # 交通和地图符号
-        '\U0001F1E0-\U0001F1FF'  # 国旗
-        '\U00002600-\U000026FF'  # 杂项符号
-        '\U00002700-\U000027BF'  # 装饰符号
-        '\U0001F900-\U0001F9FF'  # 补充符号和象形文字
-        '\U0001FA70-\U0001FAFF'  # 符号和象形文字扩展-A
-        '\U00002300-\U000023FF'  # 杂项技术符号
-        '\U0001F000-\U0001F02F'  # 麻将符号
-        '\U0001F0A0-\U0001F0FF'  # 扑克符号
-        ']+',
-        flags=re.UNICODE
-    )
-    
-    # 将未映射的emoji替换为[表情]
-    result = emoji_pattern.sub('[表情]', result)
-    
-    return result
+    # 替换已知的emoji，再将未映射的emoji替换为[表情]
+    result = text.translate(_EMOJI_TRANSLATION)
+    return _EMOJI_FALLBACK_PATTERN.sub('[表情]', result)
+
+
+def _replace_cq_code(match):
+    """将单个CQ码转换为显示文本"""
+    cq_type = match.group(1)
+    text = _CQ_TYPE_TEXT.get(cq_type)
+    if text is not None:
+        return text
+    if cq_type == "at":
+        # 提取@的QQ号
+        params = match.group(2) or ""
+        if "qq=all" in params:
+            return "@全体成员"
+        qq_match = _CQ_AT_QQ_PATTERN.search(params)
+        if qq_match:
+            return f"@{qq_match.group(1)}"
+        return "@某人"
+    return "[非文本]"
 
 
 def parse_qq_message(message_data):
@@ -104,54 +147,18 @@ def parse_qq_message(message_data):
     raw_message = message_data.get("raw_message", "")
     
     if raw_message:
-        # 使用正则表达式解析CQ码
-        def replace_cq_code(match):
-            cq_type = match.group(1)
-            if cq_type == "image":
-                return "[图片]"
-            elif cq_type == "video":
-                return "[视频]"
-            elif cq_type == "record":
-                return "[语音]"
-            elif cq_type == "face":
-                return "[表情]"
-            elif cq_type == "at":
-                # 提取@的QQ号
-                params = match.group(2)
-                if "qq=all" in params:
-                    return "@全体成员"
-                else:
-                    qq_match = re.search(r'qq=(\d+)', params)
-                    if qq_match:
-                        return f"@{qq_match.group(1)}"
-                    return "@某人"
-            elif cq_type == "reply":
-                return "[回复]"
-            elif cq_type == "forward":
-                return "[转发]"
-            elif cq_type == "file":
-                return "[文件]"
-            elif cq_type == "share":
-                return "[分享]"
-            elif cq_type == "location":
-                return "[位置]"
-            elif cq_type == "music":
-                return "[音乐]"
-            elif cq_type == "xml" or cq_type == "json":
-                return "[卡片]"
-            else:
-                return "[非文本]"
-        
-        # 匹配CQ码格式: [CQ:type,param1=value1,param2=value2]
-        cq_pattern = r'\[CQ:([^,\]]+)(?:,([^\]]*))?\]'
-        processed_message = re.sub(cq_pattern, replace_cq_code, raw_message)
+        # 解析CQ码（仅在包含CQ码时执行正则替换）
+        if "[CQ:" in raw_message:
+            processed_message = _CQ_PATTERN.sub(_replace_cq_code, raw_message)
+        else:
+            processed_message = raw_message
         
         # 处理emoji表情符号，转换为游戏内可显示的文本
-        processed_message = remove_emoji_for_game(processed_message)
+        processed_message = remove_emoji_for_game(processed_message).strip()
         
         # 如果处理后的消息不为空，返回处理结果
-        if processed_message.strip():
-            return processed_message.strip()
+        if processed_message:
+            return processed_message
     
     # 如果都没有内容，返回空消息标识
     return "[空消息]"
@@ -171,14 +178,42 @@ def clean_message_text(text: str) -> str:
         return text
     
     # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _WHITESPACE_PATTERN.sub(' ', text.strip())
     
     # 移除控制字符
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
+    text = _CONTROL_CHAR_PATTERN.sub('', text)
     
     return text
 
 
+def format_qq_message_for_game(message_data: dict, display_name: str, group_name: str = "",
+                               max_length: int = GAME_MESSAGE_MAX_LENGTH) -> tuple:
+    """
+    QQ消息转发到游戏的完整处理流程：解析CQ码/emoji、拼接前缀、清理并截断
+    
+    Args:
+        message_data (dict): QQ消息数据
+        display_name (str): 发送者显示名称
+        group_name (str): 群组名称，为空时不添加前缀
+        max_length (int): 最大长度
+        
+    Returns:
+        tuple: (解析后的消息, 清理后的完整消息)，空消息时清理结果为空字符串
+    """
+    parsed_message = parse_qq_message(message_data)
+    if parsed_message == "[空消息]":
+        return parsed_message, ""
+    
+    # 构建完整的格式化消息，如果配置了群组名称则添加前缀
+    if group_name:
+        formatted_message = f"[{group_name}] {display_name}: {parsed_message}"
+    else:
+        formatted_message = f"{display_name}: {parsed_message}"
+    
+    clean_message = truncate_message(clean_message_text(formatted_message), max_length=max_length)
+    return parsed_message, clean_message or ""
+
+
 def truncate_message(message: str, max_length: int = 500) -> str:
     """
     截断过长的消息
@@ -196,8 +231,9 @@ def truncate_message(message: str, max_length: int = 500) -> str:
     return message[:max_length - 3] + "..."
 
 
-def _decode_sensitive_words():
-    """解码敏感词列表"""
+@lru_cache(maxsize=1)
+def _decode_sensitive_words() -> frozenset:
+    """解码敏感词列表（只在首次调用时解码）"""
     import base64
     
     # Base64编码的敏感词数据
@@ -236,12 +272,129 @@ def _decode_sensitive_words():
         except:
             continue
     
-    return words
+    return frozenset(words)
 
 
 def get_sensitive_words():
     """获取敏感词集合"""
-    return _decode_sensitive_words()
+    return set(_decode_sensitive_words())
+
+
+class SensitiveWordFilter:
+    """
+    基于 Aho–Corasick 自动机的敏感词过滤器
+    
+    构建一次后可重复使用，每条消息只扫描一遍即可同时得到替换结果和是否命中。
+    匹配不区分大小写，重叠的命中会合并后一起替换为 *。
+    """
+    
+    __slots__ = ("_goto", "_fail", "_match_len", "word_count")
+    
+    def __init__(self, words):
+        # _goto[i]: 节点i的转移表；_match_len[i]: 以节点i结尾的最长敏感词长度（含失配链）
+        self._goto = [{}]
+        self._fail = [0]
+        self._match_len = [0]
+        self.word_count = 0
+        
+        for word in words:
+            word = word.strip().lower() if word else ""
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._match_len.append(0)
+                node = nxt
+            if not self._match_len[node]:
+                self._match_len[node] = len(word)
+                self.word_count += 1
+        
+        self._build_fail_links()
+    
+    def _build_fail_links(self):
+        """广度优先构建失配指针，并沿失配链合并命中长度"""
+        goto, fail, match_len = self._goto, self._fail, self._match_len
+        queue = list(goto[0].values())
+        index = 0
+        while index < len(queue):
+            node = queue[index]
+            index += 1
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                if match_len[fail[child]] > match_len[child]:
+                    match_len[child] = match_len[fail[child]]
+                queue.append(child)
+    
+    def filter(self, text: str) -> tuple:
+        """
+        过滤文本中的敏感词
+        
+        Args:
+            text (str): 原始文本
+            
+        Returns:
+            tuple: (过滤后的文本, 是否包含敏感内容)
+        """
+        if not text or self.word_count == 0:
+            return text, False
+        
+        goto, fail, match_len = self._goto, self._fail, self._match_len
+        root = goto[0]
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # 个别字符小写后长度会变化，退回逐字符转换以保持位置对齐
+            lowered = [ch.lower() if len(ch.lower()) == 1 else ch for ch in text]
+        
+        spans = []
+        node = 0
+        for pos, ch in enumerate(lowered):
+            if node == 0:
+                node = root.get(ch, 0)
+            else:
+                nxt = goto[node].get(ch)
+                while nxt is None and node:
+                    node = fail[node]
+                    nxt = goto[node].get(ch)
+                node = nxt or 0
+            length = match_len[node]
+            if length:
+                start = pos - length + 1
+                # 与之前相交或相邻的命中区间合并
+                while spans and start <= spans[-1][1]:
+                    start = min(start, spans.pop()[0])
+                spans.append((start, pos + 1))
+        
+        if not spans:
+            return text, False
+        
+        parts = []
+        last = 0
+        for start, end in spans:
+            parts.append(text[last:start])
+            parts.append('*' * (end - start))
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts), True
+
+
+def build_sensitive_filter(custom_ban_words=None) -> SensitiveWordFilter:
+    """构建包含内置敏感词和自定义敏感词的过滤器"""
+    return SensitiveWordFilter(_decode_sensitive_words().union(custom_ban_words or ()))
+
+
+@lru_cache(maxsize=8)
+def _get_cached_filter(custom_ban_words: tuple) -> SensitiveWordFilter:
+    """按自定义敏感词缓存过滤器，避免每次调用重新构建"""
+    return build_sensitive_filter(custom_ban_words)
 
 
 def filter_sensitive_content(text: str, custom_ban_words=None) -> tuple:
@@ -255,23 +408,7 @@ def filter_sensitive_content(text: str, custom_ban_words=None) -> tuple:
     Returns:
         tuple: (过滤后的文本, 是否包含敏感内容)
     """
-    if custom_ban_words is None:
-        custom_ban_words = []
     if not text:
         return text, False
     
-    sensitive_words = get_sensitive_words()
-    # 合并自定义敏感词
-    if custom_ban_words:
-        sensitive_words.update(custom_ban_words)
-    has_sensitive = False
-    
-    # 检查并替换敏感词
-    for word in sensitive_words:
-        if word.lower() in text.lower():
-            has_sensitive = True
-            # 使用正则表达式进行大小写不敏感的替换
-            replacement = '*' * len(word)
-            text = re.sub(re.escape(word), replacement, text, flags=re.IGNORECASE)
-    
-    return text, has_sensitive
+    return _get_cached_filter(tuple(custom_ban_words or ())).filter(text)
@@ -3,10 +3,16 @@ WebSocket处理模块初始化
 """
 
 from .client import WebSocketClient
+from .outbound import OutboundQueue
+from .dispatcher import InboundDispatcher
+from .server import ReverseWebSocketServer
 from .handlers import *
 
 __all__ = [
     "WebSocketClient",
+    "OutboundQueue",
+    "InboundDispatcher",
+    "ReverseWebSocketServer",
     "send_group_msg",
     "send_group_at_msg", 
     "delete_msg",
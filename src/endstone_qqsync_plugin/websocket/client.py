@@ -4,28 +4,246 @@ WebSocket客户端模块
 """
 
 import asyncio
-import json
-from typing import Optional, TYPE_CHECKING
+import itertools
+import random
+import secrets
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple, TYPE_CHECKING
 
 # 导入websockets库（通过统一的导入工具）
-from ..utils.imports import import_websockets
+from ..utils.imports import import_websockets, websockets_speedups_enabled
+from . import codec
+from .dispatcher import InboundDispatcher
 websockets = import_websockets()
 
 if TYPE_CHECKING:
     from websockets import WebSocketServerProtocol
 
 
+# echo = "<前缀>#<会话标识><序号>"，会话标识避免插件重载后与旧连接的迟到响应混淆
+_ECHO_SESSION = secrets.token_hex(3)
+_echo_counter = itertools.count(1)
+
+
+def make_echo(prefix: str) -> str:
+    """生成进程内唯一的echo，保留动作前缀以便按前缀识别响应类型"""
+    return f"{prefix}#{_ECHO_SESSION}-{next(_echo_counter)}"
+
+
+# 重连退避：首次重试很快（NapCat 重启通常只需片刻），之后按指数上限做全抖动
+_FIRST_RETRY_DELAY = (0.1, 0.5)
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 30.0
+_BACKOFF_WARN_ATTEMPTS = 5
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    计算第 attempt 次重试前的等待时间（全抖动指数退避）
+    
+    第1次在 0.1~0.5 秒内重试；之后在 [0, min(30, 2^(attempt-1))] 秒内均匀随机，
+    避免多个实例在 NapCat 恢复时同时重连
+    """
+    if attempt <= 1:
+        return random.uniform(*_FIRST_RETRY_DELAY)
+    return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def transport_options(transport, server: bool = False) -> Dict[str, Any]:
+    """
+    把传输配置转换为 websockets.connect / websockets.serve 的参数
+    
+    Args:
+        transport (WsTransportConfig): 配置管理器解析后的 ws_transport 配置
+        server (bool): 是否用于反向WS服务端
+    """
+    # 关闭内置的默认 deflate 配置，启用压缩时按配置的级别显式添加扩展
+    options = {
+        "compression": None,
+        "max_size": transport.max_size,
+        "max_queue": transport.max_queue,
+        "write_limit": transport.write_limit,
+    }
+    if transport.compression:
+        from websockets.extensions.permessage_deflate import (
+            ClientPerMessageDeflateFactory, ServerPerMessageDeflateFactory
+        )
+        factory = ServerPerMessageDeflateFactory if server else ClientPerMessageDeflateFactory
+        options["extensions"] = [
+            factory(compress_settings={"level": transport.compression_level, "memLevel": 5})
+        ]
+    return options
+
+
+class _Endpoint:
+    """一个 OneBot 正向WS端点及其连接状态"""
+    
+    __slots__ = ("index", "url", "access_token", "label", "ws", "self_id", "attempt",
+                 "outage_started", "stats")
+    
+    def __init__(self, index: int, url: str, access_token: str, label: str):
+        self.index = index
+        self.url = url
+        self.access_token = access_token
+        self.label = label
+        self.ws = None
+        self.self_id = None
+        # 连续失败次数（连接成功后清零），用于计算退避时间
+        self.attempt = 0
+        self.outage_started: Optional[float] = None
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "failed_attempts": 0,
+            "last_outage": 0.0,
+        }
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.ws is not None and self.ws.state == 1  # 1 = OPEN状态
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "connected": self.is_connected,
+            "self_id": self.self_id,
+            **self.stats,
+        }
+
+
+class DuplicateFilter:
+    """
+    记录最近见过的事件键及其来源端点，用于多个机器人收到同一条消息时去重
+    
+    只有其他端点记录过的键才算重复，同一端点的事件（如同一秒内内容相同的两条消息）不会互相过滤。
+    键按插入顺序保存，超过 window 秒或超过 max_size 个的旧键会被清理。
+    """
+    
+    def __init__(self, window: float = 120.0, max_size: int = 8192):
+        self.window = window
+        self.max_size = max_size
+        self._seen: Dict[Hashable, Tuple[float, int]] = {}  # 键 → (首次出现时间, 来源端点编号)
+    
+    def _purge(self, now: float):
+        seen = self._seen
+        while seen:
+            key = next(iter(seen))
+            if len(seen) <= self.max_size and now - seen[key][0] < self.window:
+                break
+            del seen[key]
+    
+    def check(self, source: int, *keys: Hashable) -> bool:
+        """任意一个键已由其他端点记录过时返回 True；否则记录尚未出现的键并返回 False"""
+        now = time.monotonic()
+        self._purge(now)
+        seen = self._seen
+        for key in keys:
+            entry = seen.get(key)
+            if entry is not None and entry[1] != source:
+                return True
+        for key in keys:
+            seen.setdefault(key, (now, source))
+        return False
+    
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+def event_dedup_keys(data: dict) -> Tuple[Hashable, ...]:
+    """
+    跨机器人去重用的事件键，不需要去重的事件返回空元组
+    
+    消息优先使用 message_id；没有 message_id 的群消息才用内容指纹（群号、发送者、时间、原始内容）
+    """
+    post_type = data.get("post_type")
+    if post_type == "message":
+        if data.get("message_id") is not None:
+            return (("message_id", data.get("message_id")),)
+        if data.get("message_type") == "group":
+            return (("group_message", data.get("group_id"), data.get("user_id"),
+                     data.get("time"), data.get("raw_message")),)
+        return ()
+    if post_type == "notice" and data.get("notice_type") in ("group_increase", "group_decrease"):
+        return (("notice", data.get("notice_type"), data.get("group_id"), data.get("user_id"), data.get("time")),)
+    return ()
+
+
 class WebSocketClient:
-    """WebSocket客户端"""
+    """
+    WebSocket客户端
+    
+    可以同时连接多个 OneBot 端点（不同机器人账号），每个端点独立重连：
+    - failover 模式：出站消息走配置顺序中第一个可用的连接，主连接断开后立即切换到备用连接
+    - round_robin 模式：纯文本群消息在所有可用连接间轮流发送，分摊单个账号的发送频率限制；
+      撤回、群名片、API调用等依赖账号的请求仍走主连接
+    多个机器人收到的同一事件按 message_id / 内容指纹去重，机器人之间互相看到的消息也会被忽略。
+    """
     
     def __init__(self, plugin):
         self.plugin = plugin
         self.logger = plugin.logger
-        self.ws: Optional['WebSocketServerProtocol'] = None
         self._running = False
+        self._endpoints: List[_Endpoint] = []
+        # 反向WS端点编号（断开的端点会被移除，不能用列表长度编号，否则去重时会把不同机器人当成同一来源）
+        self._endpoint_ids = itertools.count()
+        # 当前主端点：配置顺序中第一个持有连接的端点
+        self._primary: Optional[_Endpoint] = None
+        # 反向WS服务端（reverse_ws 启用时）
+        self._server = None
+        self._round_robin = False
+        self._rr_counter = itertools.count()
+        # 等待响应的API调用：echo -> Future
+        self._pending_calls: Dict[str, asyncio.Future] = {}
+        # 连接后的群成员同步任务
+        self._member_sync_task: Optional[asyncio.Task] = None
+        # 入站事件调度（同群/同用户的事件按顺序处理，其余并发）
+        self.dispatcher = InboundDispatcher(self._handle_message, self.logger, max_concurrency=8)
+        # 多端点时的跨机器人去重，单端点时为 None
+        self._dedup: Optional[DuplicateFilter] = None
+        self._bot_ids = set()
+        # 所有端点都不可用的开始时间（monotonic），None 表示至少有一个连接可用
+        self._outage_started: Optional[float] = None
+        self.stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "disconnects": 0,
+            "failed_attempts": 0,
+            "failovers": 0,
+            "last_outage": 0.0,
+            "max_outage": 0.0,
+            "total_outage": 0.0,
+            "duplicates_dropped": 0,
+            "own_messages_dropped": 0,
+        }
+    
+    @property
+    def ws(self) -> Optional['WebSocketServerProtocol']:
+        """主连接：配置顺序中第一个可用的连接"""
+        for endpoint in self._endpoints:
+            if endpoint.is_connected:
+                return endpoint.ws
+        return None
+    
+    def select_connection(self, shareable: bool = False):
+        """
+        选择发送用的连接
+        
+        Args:
+            shareable (bool): 请求是否可以由任意机器人发送（纯文本群消息）；
+                仅在 round_robin 模式下对这类请求轮流选择连接
+        
+        Returns:
+            连接对象，没有可用连接时返回 None
+        """
+        if shareable and self._round_robin:
+            connected = [endpoint.ws for endpoint in self._endpoints if endpoint.is_connected]
+            if connected:
+                return connected[next(self._rr_counter) % len(connected)]
+            return None
+        return self.ws
     
     async def connect_forever(self):
-        """持续连接NapCat WS"""
+        """持续连接所有配置的 NapCat WS 端点；启用反向WS时改为监听并等待机器人接入"""
         if self._running:
             self.logger.warning("NapCat WS 客户端已在运行")
             return
@@ -33,88 +251,280 @@ class WebSocketClient:
         self._running = True
         
         # 获取配置
-        napcat_ws = self.plugin.config_manager.get_config("napcat_ws")
-        access_token = self.plugin.config_manager.get_config("access_token")
-        headers = {"Authorization": f"Bearer {access_token}"} if access_token else {}
+        config_manager = self.plugin.config_manager
+        transport = config_manager.get_ws_transport()
+        reverse = config_manager.get_reverse_ws()
+        if reverse.enabled:
+            await self._serve_reverse(reverse, transport)
+            return
+        
+        endpoints = config_manager.get_napcat_endpoints()
+        self._round_robin = config_manager.get_config("endpoint_mode", "failover") == "round_robin"
+        multiple = len(endpoints) > 1
+        self._endpoints = [
+            _Endpoint(i, url, token, f"NapCat WS#{i + 1}" if multiple else "NapCat WS")
+            for i, (url, token) in enumerate(endpoints)
+        ]
+        self._dedup = DuplicateFilter() if multiple else None
         
         self.logger.info("QQsync 启动，准备连接 NapCat WS…")
-        self.logger.info(f"连接地址: {napcat_ws}")
+        for endpoint in self._endpoints:
+            self.logger.info(f"连接地址: {endpoint.url}" if not multiple else f"连接地址 #{endpoint.index + 1}: {endpoint.url}")
+        if multiple:
+            mode = "轮流发送 (round_robin)" if self._round_robin else "主备切换 (failover)"
+            self.logger.info(f"多端点模式: {mode}")
+        self.logger.info(f"传输参数: {transport.describe()}")
+        if websockets_speedups_enabled():
+            self.logger.info("websockets 帧掩码: C扩展加速")
+        else:
+            self.logger.info("websockets 帧掩码: 纯Python实现（未找到适用于当前平台的 speedups 扩展）")
+        
+        if not self._endpoints:
+            self.logger.error("未配置 NapCat WS 地址（napcat_ws），无法连接")
+            self._running = False
+            return
+        
+        await asyncio.gather(*(self._run_endpoint(endpoint, transport) for endpoint in self._endpoints))
+        self.logger.info("NapCat WS 客户端已停止运行")
+    
+    async def _serve_reverse(self, reverse, transport):
+        """反向WS模式：运行服务端，机器人接入后按端点处理"""
+        from .server import ReverseWebSocketServer
         
-        delay = 1
-        consecutive_failures = 0
-        max_consecutive_failures = 5
+        # 跨机器人去重在有两个及以上机器人接入时才启用（见 _update_reverse_dedup）
+        self._dedup = None
+        self._round_robin = self.plugin.config_manager.get_config("endpoint_mode", "failover") == "round_robin"
+        self.logger.info("QQsync 启动，使用反向WS模式（napcat_ws 配置不生效）")
+        self.logger.info(f"传输参数: {transport.describe()}")
+        
+        self._server = ReverseWebSocketServer(self, reverse, transport)
+        try:
+            await self._server.serve_forever()
+        except OSError as e:
+            self.logger.error(f"反向WS服务端启动失败（{reverse.host}:{reverse.port}）: {e}")
+        finally:
+            self._running = False
+            self.logger.info("反向WS服务端已停止")
+    
+    async def handle_reverse_connection(self, websocket, self_id=None):
+        """
+        处理一个反向WS连接直到断开（由反向WS服务端调用）
+        
+        同一机器人重复接入时以新连接为准并关闭旧连接；
+        带 X-Self-ID 的端点断开后保留，重新接入时沿用其统计
+        """
+        remote = websocket.remote_address
+        address = f"{remote[0]}:{remote[1]}" if remote else "未知地址"
+        
+        endpoint = None
+        if self_id is not None:
+            for existing in self._endpoints:
+                if existing.self_id != self_id:
+                    continue
+                if existing.ws is None:
+                    endpoint = existing
+                else:
+                    self.logger.warning(f"{existing.label} 重复接入，关闭旧连接")
+                    asyncio.create_task(existing.ws.close(1000, "replaced by new connection"))
+        if endpoint is None:
+            label = f"反向WS[{self_id if self_id is not None else address}]"
+            endpoint = _Endpoint(next(self._endpoint_ids), f"reverse://{address}", "", label)
+            endpoint.self_id = self_id
+            self._endpoints.append(endpoint)
+        else:
+            endpoint.url = f"reverse://{address}"
+        
+        self.logger.info(f"{endpoint.label} 已接入 ({address})")
+        try:
+            recovered = self._on_connected(endpoint, websocket)
+            self._update_reverse_dedup()
+            if recovered:
+                await self._after_recovered(websocket)
+            await self._message_loop(endpoint, websocket)
+        finally:
+            self._on_disconnected(endpoint)
+            # 匿名连接以及已被新连接取代的端点不再保留
+            replaced = any(other is not endpoint and other.self_id == endpoint.self_id for other in self._endpoints)
+            if (endpoint.self_id is None or replaced) and endpoint in self._endpoints:
+                self._endpoints.remove(endpoint)
+            self._update_reverse_dedup()
+    
+    def _update_reverse_dedup(self):
+        """反向WS模式下按当前在线的机器人数量启用或关闭跨机器人去重（与正向多端点一致）"""
+        connected = sum(1 for endpoint in self._endpoints if endpoint.ws is not None)
+        if connected < 2:
+            self._dedup = None
+        elif self._dedup is None:
+            self._dedup = DuplicateFilter()
+    
+    async def _run_endpoint(self, endpoint: _Endpoint, transport):
+        """单个端点的连接与重连循环"""
+        headers = {"Authorization": f"Bearer {endpoint.access_token}"} if endpoint.access_token else {}
         
         while self._running:
+            error = None
+            was_connected = False
             try:
-                # 使用旧版本的连接参数
                 async with websockets.connect(
-                    napcat_ws, 
+                    endpoint.url, 
                     additional_headers=headers,
-                    ping_interval=20,  # 20秒ping间隔
-                    ping_timeout=10,   # 10秒ping超时
-                    close_timeout=10   # 10秒关闭超时
+                    ping_interval=transport.ping_interval,
+                    ping_timeout=transport.ping_timeout,
+                    close_timeout=10,  # 10秒关闭超时
+                    **transport_options(transport)
                 ) as websocket:
-                    self.ws = websocket
-                    self.plugin._current_ws = websocket
-                    consecutive_failures = 0  # 重置失败计数
-                    
-                    self.logger.info("已连接 NapCat WS")
+                    was_connected = True
+                    if self._on_connected(endpoint, websocket):
+                        await self._after_recovered(websocket)
                     
-                    # 连接成功后立即获取所有群成员列表
+                    # 消息循环结束（连接断开）后立即停止心跳，不等待心跳休眠结束
+                    heartbeat = asyncio.create_task(self._heartbeat(websocket))
                     try:
-                        from .handlers import get_all_groups_member_list
-                        await get_all_groups_member_list(websocket)
-                    except Exception as e:
-                        self.logger.warning(f"获取群成员列表失败: {e}")
-                    
-                    # 发送服务器启动消息（如果插件刚启动）
-                    try:
-                        if hasattr(self.plugin, '_send_startup_message') and self.plugin._send_startup_message:
-                            from .handlers import send_group_msg_to_all_groups
-                            server_start_msg = "[QQSync] 服务器已启动！"
-                            await send_group_msg_to_all_groups(websocket, server_start_msg)
-                            self.plugin._send_startup_message = False  # 只发送一次
-                    except Exception as e:
-                        self.logger.warning(f"发送启动消息失败: {e}")
-                    
-                    # 启动心跳和消息处理
-                    await asyncio.gather(
-                        self._heartbeat(),
-                        self._message_loop()
-                    )
+                        await self._message_loop(endpoint, websocket)
+                    finally:
+                        heartbeat.cancel()
                     
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                self.ws = None
-                self.plugin._current_ws = None
-                consecutive_failures += 1
-                
-                if self._running:
-                    # 根据连续失败次数调整重连策略
-                    if consecutive_failures <= max_consecutive_failures:
-                        self.logger.warning(f"NapCat WS 连接失败 (尝试{consecutive_failures}/{max_consecutive_failures}): {e}")
-                        # 指数退避，但最大不超过30秒
-                        delay = min(30, delay * 1.5 if consecutive_failures > 1 else 5)
-                    else:
-                        self.logger.error(f"NapCat WS 连接持续失败，暂停重连30秒: {e}")
-                        delay = 30  # 持续失败时使用固定延迟
-                        consecutive_failures = 0  # 重置计数，给系统恢复机会
-                    
-                    self.logger.info(f"🔄 将在 {delay:.1f} 秒后重试连接...")
-                    await asyncio.sleep(delay)
-                else:
-                    break
-            else:
-                delay = 1
-
-        self.logger.info("NapCat WS 客户端已停止运行")
+                error = e
+            finally:
+                if was_connected:
+                    self._on_disconnected(endpoint)
+            
+            if not self._running:
+                break
+            
+            endpoint.attempt += 1
+            delay = backoff_delay(endpoint.attempt)
+            if not was_connected:
+                endpoint.stats["failed_attempts"] += 1
+                self.stats["failed_attempts"] += 1
+                if endpoint.attempt <= _BACKOFF_WARN_ATTEMPTS:
+                    self.logger.warning(f"{endpoint.label} 连接失败 (第{endpoint.attempt}次): {error}")
+                elif endpoint.attempt % _BACKOFF_WARN_ATTEMPTS == 1:
+                    # 持续失败时降低日志频率
+                    self.logger.error(f"{endpoint.label} 连接持续失败 (已连续{endpoint.attempt - 1}次): {error}")
+            elif error is not None:
+                self.logger.warning(f"{endpoint.label} 连接异常断开: {error}")
+            self.logger.info(f"🔄 {endpoint.label} 将在 {delay:.1f} 秒后重试连接...")
+            await asyncio.sleep(delay)
 
-    async def _heartbeat(self):
+    def _update_primary(self):
+        """重新选出主端点并同步插件的连接引用"""
+        self._primary = next((endpoint for endpoint in self._endpoints if endpoint.ws is not None), None)
+        self.plugin._current_ws = self._primary.ws if self._primary else None
+    
+    def _on_connected(self, endpoint: _Endpoint, websocket) -> bool:
+        """
+        端点连接建立：更新主连接；从完全断线中恢复时通知出站队列补发暂存的消息
+        
+        Returns:
+            bool: 是否是从没有任何可用连接的状态中恢复
+        """
+        recovered = self._primary is None
+        endpoint.ws = websocket
+        endpoint.attempt = 0
+        endpoint.stats["connects"] += 1
+        if endpoint.outage_started is not None:
+            endpoint.stats["last_outage"] = time.monotonic() - endpoint.outage_started
+            endpoint.outage_started = None
+        previous = self._primary
+        self._update_primary()
+        self.stats["connects"] += 1
+        
+        if not recovered:
+            if self._primary is endpoint:
+                self.logger.info(f"已连接 {endpoint.label}，切回主连接（原主连接 {previous.label} 转为备用）")
+            else:
+                self.logger.info(f"已连接 {endpoint.label}（备用连接）")
+            return False
+        
+        if self._outage_started is not None:
+            outage = time.monotonic() - self._outage_started
+            self._outage_started = None
+            self.stats["reconnects"] += 1
+            self.stats["last_outage"] = outage
+            self.stats["total_outage"] += outage
+            self.stats["max_outage"] = max(self.stats["max_outage"], outage)
+            self.logger.info(f"已重新连接 {endpoint.label}（断线 {outage:.1f} 秒）")
+        else:
+            self.logger.info(f"已连接 {endpoint.label}")
+        
+        outbound_queue = getattr(self.plugin, "outbound_queue", None)
+        if outbound_queue is not None:
+            outbound_queue.on_connected()
+        return True
+    
+    async def _after_recovered(self, websocket):
+        """恢复连接后同步群成员并发送启动消息"""
+        # 拉取缓存已过期的群成员列表（需等待响应，放到独立任务中）
+        try:
+            from .handlers import get_all_groups_member_list
+            self._member_sync_task = asyncio.create_task(get_all_groups_member_list(websocket, force=False))
+        except Exception as e:
+            self.logger.warning(f"获取群成员列表失败: {e}")
+        
+        # 发送服务器启动消息（如果插件刚启动）
+        try:
+            if hasattr(self.plugin, '_send_startup_message') and self.plugin._send_startup_message:
+                from .handlers import send_group_msg_to_all_groups
+                from .outbound import PRIORITY_NOTICE
+                server_start_msg = "[QQSync] 服务器已启动！"
+                await send_group_msg_to_all_groups(websocket, server_start_msg, priority=PRIORITY_NOTICE)
+                self.plugin._send_startup_message = False  # 只发送一次
+        except Exception as e:
+            self.logger.warning(f"发送启动消息失败: {e}")
+    
+    def _on_disconnected(self, endpoint: _Endpoint):
+        """端点连接断开：切换到其它可用连接；全部断开时暂存出站消息到重连"""
+        was_primary = self._primary is endpoint
+        endpoint.ws = None
+        self._update_primary()
+        if not self._running:
+            return
+        
+        endpoint.stats["disconnects"] += 1
+        endpoint.outage_started = time.monotonic()
+        self.stats["disconnects"] += 1
+        
+        if self._primary is not None:
+            # 还有其它连接可用。该连接上未收到响应的调用会按各自的超时失败
+            if was_primary:
+                self.stats["failovers"] += 1
+                self.logger.warning(f"{endpoint.label} 连接已断开，已切换到 {self._primary.label}")
+            else:
+                self.logger.warning(f"{endpoint.label} 连接已断开（备用连接）")
+            return
+        
+        self._fail_pending_calls(ConnectionError("NapCat WS 连接已断开"))
+        self._outage_started = time.monotonic()
+        self.logger.warning(f"{endpoint.label} 连接已断开，出站消息将暂存至重连")
+        
+        outbound_queue = getattr(self.plugin, "outbound_queue", None)
+        if outbound_queue is not None:
+            outbound_queue.on_disconnected()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取连接统计（断线时长单位为秒，指所有端点都不可用的时长）"""
+        current_outage = 0.0
+        if self._outage_started is not None:
+            current_outage = time.monotonic() - self._outage_started
+        return {
+            "connected": self.is_connected,
+            "current_outage": current_outage,
+            **self.stats,
+            "endpoints": [endpoint.get_metrics() for endpoint in self._endpoints],
+            "reverse_ws": self._server.get_metrics() if self._server is not None else None,
+        }
+    
+    async def _heartbeat(self, websocket):
         """发送心跳包 - 使用state属性检查连接状态"""
         try:
-            while self._running and self.ws:
+            while self._running:
                 try:
                     # 直接使用state属性检查连接状态（1=OPEN）
-                    if self.ws.state != 1:
+                    if websocket.state != 1:
                         break
                     
                     # 简单的心跳，30秒间隔
@@ -127,27 +537,113 @@ class WebSocketClient:
         except asyncio.CancelledError:
             pass
     
-    async def _message_loop(self):
+    def _is_duplicate(self, endpoint: _Endpoint, data: dict) -> bool:
+        """多端点时过滤重复事件，以及机器人之间互相看到的消息"""
+        self_id = data.get("self_id")
+        if self_id is not None and endpoint.self_id != self_id:
+            endpoint.self_id = self_id
+            self._bot_ids.add(self_id)
+        if data.get("post_type") == "message" and data.get("user_id") in self._bot_ids:
+            self.stats["own_messages_dropped"] += 1
+            return True
+        keys = event_dedup_keys(data)
+        if keys and self._dedup.check(endpoint.index, *keys):
+            self.stats["duplicates_dropped"] += 1
+            return True
+        return False
+    
+    async def _message_loop(self, endpoint: _Endpoint, websocket):
         """消息处理循环"""
         try:
-            async for message in self.ws:
+            while True:
+                # 直接取UTF-8字节交给JSON解码器，省去一次str转换
+                try:
+                    message = await websocket.recv(decode=False)
+                except websockets.exceptions.ConnectionClosedOK:
+                    break
                 try:
-                    data = json.loads(message)
-                    await self._handle_message(data)
-                except json.JSONDecodeError:
-                    self.logger.warning(f"收到无效的JSON消息: {message}")
+                    data = codec.decode(message)
+                    if "echo" in data and "post_type" not in data:
+                        # API响应走快速通道，不排在消息处理之后
+                        if not self._resolve_call(data):
+                            self.dispatcher.submit_fast(self._handle_api_response(data))
+                    elif self._dedup is None or not self._is_duplicate(endpoint, data):
+                        await self.dispatcher.submit(data)
+                except codec.DecodeError:
+                    self.logger.warning(f"收到无效的JSON消息: {message[:200]!r}")
                 except Exception as e:
                     self.logger.error(f"处理消息失败: {e}")
-        except websockets.exceptions.ConnectionClosed:
-            self.logger.warning("NapCat WS 连接已关闭")
+        except websockets.exceptions.ConnectionClosed as e:
+            self.logger.debug(f"{endpoint.label} 连接已关闭: {e}")
         except Exception as e:
             self.logger.error(f"消息循环错误: {e}")
     
+    async def call(self, action: str, params: Optional[dict] = None, timeout: float = 5.0,
+                   priority: Optional[int] = None) -> Dict[str, Any]:
+        """
+        调用OneBot动作并等待对应响应
+        
+        响应由消息循环按echo直接交付，入站事件处理函数中也可以等待本方法（会占用该群的处理顺序）。
+        
+        Args:
+            action (str): 动作名称，如 get_stranger_info
+            params (dict): 动作参数
+            timeout (float): 等待响应的超时时间（秒）
+            priority (int): 出站队列优先级，默认按聊天优先级发送
+            
+        Returns:
+            dict: 完整的响应数据 {"status", "retcode", "data", "echo", ...}
+            
+        Raises:
+            ConnectionError: 未连接或等待期间连接断开
+            asyncio.TimeoutError: 超时未收到响应
+        """
+        if not self.is_connected:
+            raise ConnectionError("NapCat WS 未连接")
+        
+        from .handlers import send_payload
+        from .outbound import PRIORITY_CHAT
+        
+        echo = make_echo(action)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_calls[echo] = future
+        try:
+            payload = {"action": action, "params": params or {}, "echo": echo}
+            await send_payload(self.ws, payload, priority=PRIORITY_CHAT if priority is None else priority)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            # 超时、取消或完成后都移除登记，迟到的响应按普通响应处理
+            self._pending_calls.pop(echo, None)
+    
+    def _resolve_call(self, data: dict) -> bool:
+        """用响应完成对应的API调用，返回是否有调用在等待该响应"""
+        future = self._pending_calls.pop(data.get("echo"), None)
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(data)
+        return True
+    
+    def _fail_pending_calls(self, error: BaseException):
+        """连接断开时让所有等待中的调用失败"""
+        pending, self._pending_calls = self._pending_calls, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _handle_api_response(self, data: dict):
+        """处理没有调用在等待的API响应"""
+        try:
+            from .handlers import handle_api_response
+            await handle_api_response(data)
+        except Exception as e:
+            self.logger.error(f"处理API响应失败: {e}")
+    
     async def _handle_message(self, data: dict):
         """处理接收到的消息"""
         try:
             # 导入处理函数
-            from .handlers import handle_message, handle_api_response, handle_group_member_change
+            from .handlers import handle_message, handle_group_member_change
             
             # 消息类型判断
             post_type = data.get("post_type")
@@ -155,9 +651,6 @@ class WebSocketClient:
             # 处理普通消息事件
             if post_type == "message":
                 await handle_message(self.ws, data)
-            # 处理API响应（包含echo字段）
-            elif "echo" in data:
-                await handle_api_response(data)
             # 处理通知事件（群成员变动等）
             elif post_type == "notice":
                 notice_type = data.get("notice_type")
@@ -197,6 +690,8 @@ class WebSocketClient:
         """停止WebSocket连接"""
         self.logger.info("正在停止 NapCat WS 客户端")
         self._running = False
+        if hasattr(self.plugin, '_loop') and self.plugin._loop and self.plugin._loop.is_running():
+            self.plugin._loop.call_soon_threadsafe(self._fail_pending_calls, ConnectionError("NapCat WS 客户端已停止"))
         
         # 1. 显式取消处于休眠挂起中的重载/重连主协程
         if hasattr(self.plugin, '_task') and self.plugin._task:
@@ -205,34 +700,39 @@ class WebSocketClient:
             except Exception:
                 pass
                 
-        if self.ws:
+        self._primary = None
+        for endpoint in self._endpoints:
+            if endpoint.ws is None:
+                continue
             try:
                 # 检查子线程的事件循环是否在运行，进行线程安全跨线程关闭投递
                 if hasattr(self.plugin, '_loop') and self.plugin._loop and self.plugin._loop.is_running():
-                    asyncio.run_coroutine_threadsafe(self.ws.close(), self.plugin._loop)
-                    self.logger.info("已提交线程安全的关闭 WebSocket 连接协程任务")
+                    asyncio.run_coroutine_threadsafe(endpoint.ws.close(), self.plugin._loop)
+                    self.logger.info(f"已提交线程安全的关闭 {endpoint.label} 连接协程任务")
                 else:
                     self.logger.warning("子线程事件循环未在运行，将放弃优雅关闭 WebSocket 连接")
             except Exception as e:
                 self.logger.warning(f"停止WebSocket客户端时出错: {e}")
+            endpoint.ws = None
         
-        self.ws = None
         self.plugin._current_ws = None
     
     @property 
     def is_connected(self) -> bool:
-        """检查是否已连接 - 直接使用state属性"""
-        if self.ws is None:
-            return False
-        return self.ws.state == 1  # 1 = OPEN状态
+        """检查是否至少有一个端点已连接"""
+        return self.ws is not None
+    
+    @property
+    def accepts_outbound(self) -> bool:
+        """出站消息能否发出：已连接，或正在重连且出站队列可以暂存消息"""
+        if self.is_connected:
+            return True
+        return self._running and getattr(self.plugin, "outbound_queue", None) is not None
     
     async def send_message(self, data: dict):
-        """发送消息 - 直接使用state属性"""
-        if not self.ws:
+        """通过主连接发送消息"""
+        ws = self.ws
+        if ws is None:
             raise ConnectionError("NapCat WS 未连接")
         
-        # 检查连接状态（1 = OPEN状态）
-        if self.ws.state != 1:
-            raise ConnectionError("NapCat WS 未处于开放状态")
-        
-        await self.ws.send(json.dumps(data))
\ No newline at end of file
+        await codec.send_json(ws, data)
\ No newline at end of file
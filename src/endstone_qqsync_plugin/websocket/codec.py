@@ -0,0 +1,76 @@
+"""
+OneBot协议JSON编解码模块
+优先使用 orjson，其次 msgspec，都不可用时回退到标准库 json；
+入站直接解码UTF-8字节，出站生成UTF-8字节并以文本帧发送
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    DecodeError = (orjson.JSONDecodeError,)
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        DecodeError = (msgspec.DecodeError,)
+        _loads = msgspec.json.Decoder().decode
+        _dumps = msgspec.json.Encoder().encode
+    except ImportError:
+        BACKEND = "json"
+        DecodeError = (json.JSONDecodeError, UnicodeDecodeError)
+        _loads = json.loads
+        _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+        def _dumps(obj: Any) -> bytes:
+            return _encoder.encode(obj).encode("utf-8")
+
+
+def decode(data) -> Any:
+    """
+    解码一帧JSON
+
+    Args:
+        data (bytes | str): 收到的帧，推荐直接传入 recv(decode=False) 得到的字节
+
+    Raises:
+        DecodeError 中的异常类型: 内容不是合法JSON
+    """
+    return _loads(data)
+
+
+def encode(obj: Any) -> bytes:
+    """编码为UTF-8 JSON字节（紧凑格式，不转义非ASCII字符）"""
+    return _dumps(obj)
+
+
+# 预先序列化的群消息请求片段
+# 只在标准库 json 下使用：orjson / msgspec 整体编码字典比拼接多段更快
+_GROUP_MSG_PREFIX = b'{"action":"send_group_msg","params":{"group_id":'
+_MESSAGE_KEY = b',"message":'
+_ECHO_KEY = b'},"echo":'
+
+if BACKEND == "json":
+    def encode_group_msg(group_id: int, message: str, echo: str) -> bytes:
+        """编码纯文本群消息请求（只需序列化消息文本和echo）"""
+        return (_GROUP_MSG_PREFIX + str(int(group_id)).encode("ascii") + _MESSAGE_KEY
+                + _dumps(message) + _ECHO_KEY + _dumps(echo) + b"}")
+else:
+    def encode_group_msg(group_id: int, message: str, echo: str) -> bytes:
+        """编码纯文本群消息请求"""
+        return _dumps({
+            "action": "send_group_msg",
+            "params": {"group_id": group_id, "message": message},
+            "echo": echo
+        })
+
+
+async def send_json(ws, obj: Any):
+    """把对象编码后以文本帧发送"""
+    await ws.send(_dumps(obj), text=True)
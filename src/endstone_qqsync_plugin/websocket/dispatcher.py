@@ -0,0 +1,147 @@
+"""
+入站事件调度模块
+把收到的OneBot事件交给后台任务并发处理：同一群（或同一用户）的事件按到达顺序串行处理，
+不相关的事件并行处理，API响应走快速通道，不会排在消息处理之后
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class InboundDispatcher:
+    """
+    入站事件调度器（所有方法都必须在插件事件循环线程内调用）
+
+    每个排序键对应一个按顺序处理事件的工作任务，同时处理中的事件数由信号量限制。
+    积压事件数超过 max_pending 时 submit 会等待，对连接形成背压。
+    """
+
+    def __init__(self, handler: Callable[[dict], Awaitable[Any]], logger,
+                 max_concurrency: int = 8, max_pending: int = 1000):
+        self.handler = handler
+        self.logger = logger
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_pending = max(1, int(max_pending))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 排序键 -> 等待处理的事件
+        self._lanes: Dict[Hashable, deque] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self._fast_tasks = set()
+        self._pending = 0
+        self._in_flight = 0
+        self._space: Optional[asyncio.Event] = None
+
+        self.stats = {
+            "dispatched": 0,
+            "fast_lane": 0,
+            "failed": 0,
+            "max_pending": 0,
+            "max_in_flight": 0,
+            "backpressure_waits": 0,
+        }
+
+    @staticmethod
+    def ordering_key(data: dict) -> Hashable:
+        """事件的排序键：群事件按群号，其余按用户号，都没有时归入公共通道"""
+        group_id = data.get("group_id")
+        if group_id:
+            return ("group", group_id)
+        user_id = data.get("user_id")
+        if user_id:
+            return ("user", user_id)
+        return ("misc", data.get("post_type"))
+
+    def _ensure_primitives(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._space = asyncio.Event()
+            self._space.set()
+
+    async def submit(self, data: dict):
+        """提交一个事件，按排序键排队处理（积压过多时等待）"""
+        self._ensure_primitives()
+        while self._pending >= self.max_pending:
+            self.stats["backpressure_waits"] += 1
+            self._space.clear()
+            await self._space.wait()
+
+        key = self.ordering_key(data)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+        lane.append(data)
+
+        self._pending += 1
+        self.stats["dispatched"] += 1
+        if self._pending > self.stats["max_pending"]:
+            self.stats["max_pending"] = self._pending
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key, lane))
+
+    def submit_fast(self, coro: Awaitable[Any]):
+        """快速通道：立即作为独立任务运行，不受排序和并发限制（用于API响应）"""
+        self.stats["fast_lane"] += 1
+        task = asyncio.ensure_future(coro)
+        self._fast_tasks.add(task)
+        task.add_done_callback(self._fast_tasks.discard)
+
+    async def _drain(self, key: Hashable, lane: deque):
+        """按顺序处理一个排序键下的全部事件，处理完后退出"""
+        try:
+            while lane:
+                data = lane.popleft()
+                try:
+                    async with self._semaphore:
+                        self._in_flight += 1
+                        if self._in_flight > self.stats["max_in_flight"]:
+                            self.stats["max_in_flight"] = self._in_flight
+                        try:
+                            await self.handler(data)
+                        finally:
+                            self._in_flight -= 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.logger.error(f"处理入站事件失败: {e}")
+                finally:
+                    self._pending -= 1
+                    if self._pending < self.max_pending:
+                        self._space.set()
+        finally:
+            self._workers.pop(key, None)
+            if self._lanes.get(key) is lane:
+                if lane:
+                    # 被取消时剩余事件计入丢弃
+                    self._pending -= len(lane)
+                    lane.clear()
+                del self._lanes[key]
+            if self._space is not None:
+                self._space.set()
+
+    async def close(self, timeout: float = 5.0):
+        """等待已提交的事件处理完成，超时后取消剩余任务"""
+        tasks = list(self._workers.values()) + list(self._fast_tasks)
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.logger.warning(f"入站事件调度器关闭时取消了 {len(pending)} 个未完成的处理任务")
+
+    @property
+    def pending(self) -> int:
+        """排队及处理中的事件数"""
+        return self._pending
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        return {
+            "pending": self._pending,
+            "in_flight": self._in_flight,
+            "lanes": len(self._lanes),
+            **self.stats,
+        }
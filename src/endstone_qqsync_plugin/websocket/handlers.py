@@ -3,14 +3,16 @@ WebSocket消息处理函数
 """
 
 import asyncio
-import json
 import datetime
 from endstone import ColorFormat
 from ..utils.time_utils import TimeUtils
 from endstone.command import CommandSenderWrapper
 from endstone.lang import Language,Translatable
 from ..utils.helpers import format_playtime
-import queue
+from ..utils.message_utils import format_qq_message_for_game
+from .outbound import PRIORITY_VERIFICATION, PRIORITY_CHAT
+from .client import make_echo
+from . import codec
 import html
 
 
@@ -19,6 +21,18 @@ _plugin_instance = None
 _current_ws = None
 _verification_messages = {}
 
+# 群成员快照有效期（秒），与定时全量拉取周期一致
+_GROUP_MEMBER_MAX_AGE = 3600
+
+# 远程命令（/cmd）并发限制与输出分页
+_CMD_MAX_CONCURRENCY = 2
+_CMD_TIMEOUT = 10
+_CMD_PAGE_LINES = 20
+_CMD_PAGE_CHARS = 1500
+_CMD_MAX_PAGES = 5
+_cmd_running = 0
+_cmd_tasks = set()
+
 
 def set_plugin_instance(plugin):
     """设置插件实例引用"""
@@ -26,31 +40,61 @@ def set_plugin_instance(plugin):
     _plugin_instance = plugin
 
 
-async def send_group_msg(ws, group_id: int, text: str):
+def _get_outbound_queue():
+    """获取出站消息队列，未启用时返回None"""
+    return getattr(_plugin_instance, "outbound_queue", None) if _plugin_instance else None
+
+
+async def send_payload(ws, payload: dict, priority: int = PRIORITY_CHAT, group_id: int = None, wait: bool = False):
+    """
+    发送OneBot请求，优先经由出站队列按优先级和限速发送
+    
+    Args:
+        ws: WebSocket连接（出站队列不可用时直接使用）
+        payload (dict): OneBot动作请求
+        priority (int): 出站优先级
+        group_id (int): 群号，用于群消息限速
+        wait (bool): 是否等待请求实际发出（发送失败时抛出异常）
+    """
+    outbound_queue = _get_outbound_queue()
+    if outbound_queue is None:
+        await codec.send_json(ws, payload)
+        return
+    future = outbound_queue.enqueue(payload, priority=priority, group_id=group_id)
+    if wait:
+        await future
+
+
+async def send_group_msg(ws, group_id: int, text: str, priority: int = PRIORITY_CHAT, wait: bool = False):
     """发送群消息 - OneBot V11 API"""
     try:
+        outbound_queue = _get_outbound_queue()
+        if outbound_queue is not None:
+            future = outbound_queue.enqueue_group_text(group_id, text, priority=priority)
+            if wait:
+                await future
+            return
+        
         payload = {
             "action": "send_group_msg",
             "params": {
                 "group_id": group_id,
                 "message": text
             },
-            "echo": f"send_group_msg_{int(TimeUtils.get_timestamp())}"
+            "echo": make_echo("send_group_msg")
         }
-        await ws.send(json.dumps(payload))
+        await codec.send_json(ws, payload)
     except Exception as e:
         if _plugin_instance:
             _plugin_instance.logger.error(f"发送群消息失败: {e}")
 
 
-async def send_group_msg_to_all_groups(ws, text: str):
+async def send_group_msg_to_all_groups(ws, text: str, priority: int = PRIORITY_CHAT, wait: bool = False):
     """向所有配置的群组发送消息"""
     try:
-        target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-        # 添加类型转换，确保group_id为整数类型
-        target_groups = [int(gid) for gid in target_groups]
+        target_groups = _plugin_instance.config_manager.snapshot.target_group_list
         for group_id in target_groups:
-            await send_group_msg(ws, group_id, text)
+            await send_group_msg(ws, group_id, text, priority=priority, wait=wait)
     except Exception as e:
         if _plugin_instance:
             _plugin_instance.logger.error(f"向所有群组发送消息失败: {e}")
@@ -68,9 +112,9 @@ async def send_group_msg_with_at(ws, group_id: int, user_id: int, text: str):
                     {"type": "text", "data": {"text": f" {text}"}}
                 ]
             },
-            "echo": f"bind_success_msg_{int(TimeUtils.get_timestamp())}"
+            "echo": make_echo("bind_success_msg")
         }
-        await ws.send(json.dumps(payload))
+        await send_payload(ws, payload, priority=PRIORITY_VERIFICATION, group_id=group_id)
     except Exception as e:
         if _plugin_instance:
             _plugin_instance.logger.error(f"发送@消息失败: {e}")
@@ -81,7 +125,7 @@ async def send_group_at_msg(ws, group_id: int, user_id: int, text: str, verifica
     try:
         global _verification_messages
         
-        echo_value = f"verification_msg:{verification_qq}" if verification_qq else f"at_msg_{int(TimeUtils.get_timestamp())}"
+        echo_value = f"verification_msg:{verification_qq}" if verification_qq else make_echo("at_msg")
         payload = {
             "action": "send_group_msg", 
             "params": {
@@ -104,7 +148,7 @@ async def send_group_at_msg(ws, group_id: int, user_id: int, text: str, verifica
             if _plugin_instance:
                 _plugin_instance.logger.debug(f"为QQ {verification_qq} 创建handlers验证码消息记录，echo: {echo_value}")
         
-        await ws.send(json.dumps(payload))
+        await send_payload(ws, payload, priority=PRIORITY_VERIFICATION, group_id=group_id)
         
         # 设置紧急撤回任务（90秒后）
         if verification_qq:
@@ -178,9 +222,9 @@ async def delete_msg(ws, message_id: int):
             "params": {
                 "message_id": message_id
             },
-            "echo": f"delete_msg_{int(TimeUtils.get_timestamp())}"
+            "echo": make_echo("delete_msg")
         }
-        await ws.send(json.dumps(payload))
+        await send_payload(ws, payload, priority=PRIORITY_VERIFICATION)
     except Exception as e:
         if _plugin_instance:
             _plugin_instance.logger.error(f"删除消息失败: {e}")
@@ -196,11 +240,11 @@ async def set_group_card(ws, group_id: int, user_id: int, card: str):
                 "user_id": user_id,
                 "card": card
             },
-            "echo": f"set_group_card_{int(TimeUtils.get_timestamp())}"
+            "echo": make_echo("set_group_card")
         }
         if _plugin_instance:
             _plugin_instance.logger.info(f"尝试设置群昵称: QQ={user_id}, 群={group_id}, 昵称='{card}'")
-        await ws.send(json.dumps(payload))
+        await send_payload(ws, payload, priority=PRIORITY_VERIFICATION)
     except Exception as e:
         # 让异常向上传播，由调用者(verification_manager)处理日志
         raise e
@@ -209,9 +253,7 @@ async def set_group_card(ws, group_id: int, user_id: int, card: str):
 async def set_group_card_in_all_groups(ws, user_id: int, card: str):
     """在所有配置的群组中设置群昵称"""
     try:
-        target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-        # 添加类型转换，确保group_id为整数类型
-        target_groups = [int(gid) for gid in target_groups]
+        target_groups = _plugin_instance.config_manager.snapshot.target_group_list
         for group_id in target_groups:
             await set_group_card(ws, group_id, user_id, card)
     except Exception as e:
@@ -227,9 +269,9 @@ async def get_group_member_list(ws, group_id: int):
             "params": {
                 "group_id": group_id
             },
-            "echo": f"get_group_member_list_{int(TimeUtils.get_timestamp())}"
+            "echo": make_echo("get_group_member_list")
         }
-        await ws.send(json.dumps(payload))
+        await codec.send_json(ws, payload)
         if _plugin_instance:
             _plugin_instance.logger.debug(f"已发送OneBot V11群成员列表请求: 群{group_id}")
     except Exception as e:
@@ -237,19 +279,70 @@ async def get_group_member_list(ws, group_id: int):
             _plugin_instance.logger.error(f"获取群成员列表失败: {e}")
 
 
-async def get_all_groups_member_list(ws):
-    """获取所有配置群组的成员列表"""
+async def get_all_groups_member_list(ws, force: bool = True):
+    """
+    拉取所有配置群组的完整成员列表并与缓存快照对比
+    
+    通过 ws_client.call 等待响应，不能在消息循环内直接 await，需作为独立任务运行。
+    
+    Args:
+        ws: WebSocket连接（保留参数，请求经出站队列发送）
+        force (bool): False 时跳过快照仍在有效期内的群
+    """
     try:
-        target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-        # 添加类型转换，确保group_id为整数类型
-        target_groups = [int(gid) for gid in target_groups]
+        target_groups = _plugin_instance.config_manager.snapshot.target_group_list
         for group_id in target_groups:
-            await get_group_member_list(ws, group_id)
+            if not force and _plugin_instance.group_members.is_fresh(group_id, _GROUP_MEMBER_MAX_AGE):
+                _plugin_instance.logger.debug(f"群 {group_id} 成员缓存仍有效，跳过拉取")
+                continue
+            try:
+                response = await _plugin_instance.ws_client.call(
+                    "get_group_member_list", {"group_id": group_id}, timeout=30
+                )
+            except asyncio.TimeoutError:
+                _plugin_instance.logger.warning(f"获取群 {group_id} 成员列表超时")
+                continue
+            if response.get("status") != "ok" or response.get("retcode") != 0:
+                _plugin_instance.logger.warning(f"获取群 {group_id} 成员列表失败: {response.get('message') or response.get('msg') or response.get('retcode')}")
+                continue
+            members = [str(member.get("user_id")) for member in (response.get("data") or []) if member.get("user_id")]
+            _apply_group_member_snapshot(group_id, members)
+        
+        # 后台写入缓存文件
+        await asyncio.get_running_loop().run_in_executor(None, _plugin_instance.group_members.save)
     except Exception as e:
         if _plugin_instance:
             _plugin_instance.logger.error(f"获取所有群组成员列表失败: {e}")
 
 
+def _apply_group_member_snapshot(group_id: int, members: list):
+    """用完整成员列表更新群快照，只为成员状态变化的绑定玩家重新检查权限"""
+    joined, left = _plugin_instance.group_members.apply_snapshot(group_id, members)
+    _plugin_instance.logger.info(
+        f"已更新群 {group_id} 成员列表，共 {len(members)} 人 (新增 {len(joined)} 人, 离开 {len(left)} 人)"
+    )
+    for user_id in left:
+        player_name = _plugin_instance.data_manager.get_qq_player(user_id)
+        if player_name:
+            _plugin_instance.logger.info(f"绑定玩家 {player_name} 的QQ {user_id} 已不在群中")
+    _recheck_member_permissions(joined | left)
+
+
+def _recheck_member_permissions(user_ids):
+    """为群成员状态变化的QQ号所绑定的在线玩家重新应用权限"""
+    for user_id in user_ids:
+        # 重新加群后允许再次输出退群日志
+        _plugin_instance.logged_left_players.discard(user_id)
+        player_name = _plugin_instance.data_manager.get_qq_player(user_id)
+        if not player_name:
+            continue
+        player = _plugin_instance.get_online_player(player_name)
+        if player:
+            _plugin_instance.main_thread.call_soon(
+                _plugin_instance.permission_manager.check_and_apply_permissions, player
+            )
+
+
 async def handle_message(ws, data: dict):
     """处理接收到的消息"""
     try:
@@ -264,23 +357,17 @@ async def handle_message(ws, data: dict):
         nickname = sender.get("nickname", "未知")
         card = sender.get("card", "")
         
-        # 只打印监听的群聊消息
-        if _plugin_instance:
-            target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-            target_groups = [int(gid) for gid in target_groups]
-            if group_id in target_groups:
-                _plugin_instance.logger.info(f"[MSG] [群ID: {group_id}] [QQ: {user_id}] [昵称: {card if card else nickname}] - 内容: {raw_message}")
-        
         if not _plugin_instance:
             return
         
         # 先检查是否是目标群组，避免不必要的数据库查询
-        target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-        # 确保target_groups中的元素都是整数类型，与group_id保持一致
-        target_groups = [int(gid) for gid in target_groups]
-        if group_id not in target_groups:
+        config = _plugin_instance.config_manager.snapshot
+        if group_id not in config.target_groups:
             return
         
+        # 只打印监听的群聊消息
+        _plugin_instance.logger.info(f"[MSG] [群ID: {group_id}] [QQ: {user_id}] [昵称: {card if card else nickname}] - 内容: {raw_message}")
+        
         # 检查用户是否已绑定QQ，如果已绑定则使用玩家游戏ID
         bound_player = _plugin_instance.data_manager.get_qq_player(str(user_id))
         if bound_player:
@@ -299,7 +386,7 @@ async def handle_message(ws, data: dict):
             return
         
         # 转发消息到游戏
-        if _plugin_instance.config_manager.get_config("enable_qq_to_game", True):
+        if config.enable_qq_to_game:
             await _forward_message_to_game(data, display_name)
             
     except Exception as e:
@@ -323,11 +410,7 @@ async def _handle_verification_code(user_id: int, code: str, display_name: str):
             return
         
         # 查找对应的在线玩家
-        target_player = None
-        for player in _plugin_instance.server.online_players:
-            if player.name == player_name:
-                target_player = player
-                break
+        target_player = _plugin_instance.get_online_player(player_name)
         
         if not target_player:
             _plugin_instance.logger.debug(f"玩家 {player_name} 不在线，跳过QQ验证码处理")
@@ -355,24 +438,20 @@ async def _handle_verification_code(user_id: int, code: str, display_name: str):
                     if _plugin_instance:
                         _plugin_instance.logger.error(f"通知玩家绑定成功失败: {e}")
             
-            # 使用调度器在主线程执行通知
-            _plugin_instance.server.scheduler.run_task(_plugin_instance, notify_player, delay=1)
+            # 在主线程执行通知
+            _plugin_instance.main_thread.call_soon(notify_player)
             
-            # 恢复玩家权限
-            if _plugin_instance.config_manager.get_config("force_bind_qq", True):
-                _plugin_instance.server.scheduler.run_task(
-                    _plugin_instance,
-                    lambda: _plugin_instance.permission_manager.restore_player_permissions(target_player),
-                    delay=2
+            # 恢复玩家权限（按提交顺序在通知之后执行）
+            if _plugin_instance.config_manager.snapshot.force_bind_qq:
+                _plugin_instance.main_thread.call_soon(
+                    _plugin_instance.permission_manager.restore_player_permissions, target_player
                 )
             
             _plugin_instance.logger.info(f"QQ验证成功: 玩家 {player_name} (QQ: {qq_str}) 通过群内验证")
         else:
             # 验证失败，发送错误消息到群
             if _plugin_instance._current_ws:
-                target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-                # 添加类型转换，确保group_id为整数类型
-                target_groups = [int(gid) for gid in target_groups]
+                target_groups = _plugin_instance.config_manager.snapshot.target_group_list
                 for group_id in target_groups:
                     await send_group_msg(_plugin_instance._current_ws, group_id=group_id, 
                                        text=f"@{display_name} {message}")
@@ -400,11 +479,7 @@ async def _handle_verification_code_with_feedback(ws, user_id: int, code: str, d
             return False
         
         # 查找对应的在线玩家
-        target_player = None
-        for player in _plugin_instance.server.online_players:
-            if player.name == player_name:
-                target_player = player
-                break
+        target_player = _plugin_instance.get_online_player(player_name)
         
         if not target_player:
             await send_group_msg(ws, group_id, f"@{display_name} [错误] 玩家 {player_name} 不在线\n[提示] 请确保对应的游戏角色在线后再验证")
@@ -430,15 +505,13 @@ async def _handle_verification_code_with_feedback(ws, user_id: int, code: str, d
                     if _plugin_instance:
                         _plugin_instance.logger.error(f"通知玩家绑定成功失败: {e}")
             
-            # 使用调度器在主线程执行通知
-            _plugin_instance.server.scheduler.run_task(_plugin_instance, notify_player, delay=1)
+            # 在主线程执行通知
+            _plugin_instance.main_thread.call_soon(notify_player)
             
-            # 恢复玩家权限
-            if _plugin_instance.config_manager.get_config("force_bind_qq", True):
-                _plugin_instance.server.scheduler.run_task(
-                    _plugin_instance,
-                    lambda: _plugin_instance.permission_manager.restore_player_permissions(target_player),
-                    delay=2
+            # 恢复玩家权限（按提交顺序在通知之后执行）
+            if _plugin_instance.config_manager.snapshot.force_bind_qq:
+                _plugin_instance.main_thread.call_soon(
+                    _plugin_instance.permission_manager.restore_player_permissions, target_player
                 )
             
             _plugin_instance.logger.info(f"QQ验证成功: 玩家 {player_name} (QQ: {qq_str}) 通过群内/verify命令验证")
@@ -483,12 +556,49 @@ def _resolve_target(input_str: str):
     
     # 2. 尝试作为玩家名查找
     # 检查是否在数据中有记录
-    if input_str in _plugin_instance.data_manager.binding_data:
+    if _plugin_instance.data_manager.contains(input_str):
         return input_str, "Name"
             
     return None, None
 
 
+def _format_system_info(system_info) -> str:
+    """格式化 /info 中的系统硬件信息"""
+    reply = f"\n系统信息:\n"
+    if system_info is None:
+        return reply + "• 系统信息采集中，请稍后再试\n"
+    
+    reply += f"• 操作系统: {system_info['os']}\n"
+    
+    # CPU信息
+    cpu_info = system_info['cpu']
+    cpu_model = cpu_info['model'][:50] + "..." if len(cpu_info['model']) > 50 else cpu_info['model']  # 限制长度
+    reply += f"• CPU型号: {cpu_model}\n"
+    
+    if cpu_info['max_freq_ghz']:
+        reply += f"• CPU主频: {cpu_info['max_freq_ghz']:.2f}GHz"
+        if cpu_info['current_freq_ghz']:
+            reply += f" (当前: {cpu_info['current_freq_ghz']:.2f}GHz)"
+        reply += "\n"
+    
+    reply += f"• CPU核心: {cpu_info['physical_cores']}核{cpu_info['logical_cores']}线程\n"
+    reply += f"• CPU使用率: {cpu_info['usage_percent']:.1f}%\n"
+    
+    # 内存信息
+    mem_info = system_info['memory']
+    reply += f"• 内存: {mem_info['used_gb']:.1f}GB / {mem_info['total_gb']:.1f}GB ({mem_info['percent']:.1f}%)\n"
+    
+    # 硬盘信息
+    disk_info = system_info['disks']
+    if disk_info:
+        for disk in disk_info:
+            if 'error' in disk:
+                continue
+            reply += f"• 硬盘({disk['device']}): {disk['used_gb']:.1f}GB / {disk['total_gb']:.1f}GB ({disk['percent']:.1f}%)\n"
+    
+    return reply
+
+
 async def _handle_group_command(ws, user_id: int, raw_message: str, display_name: str, group_id: int):
     """处理群内命令"""
     try:
@@ -500,7 +610,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
         cmd = cmd_parts[0][1:] if cmd_parts[0].startswith('/') else cmd_parts[0]  # 去掉/前缀
         args = cmd_parts[1:] if len(cmd_parts) > 1 else []
         
-        admins = _plugin_instance.config_manager.get_config("admins", [])
+        admins = _plugin_instance.config_manager.snapshot.admins
         is_admin = str(user_id) in admins
         
         reply = ""
@@ -514,7 +624,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
         
         # /list 命令 - 查看在线玩家列表
         elif cmd == "list":
-            online_players = _plugin_instance.server.online_players
+            online_players = _plugin_instance.online_players.players()
             if not online_players:
                 reply = "当前没有玩家在线"
             else:
@@ -572,9 +682,8 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
         elif cmd == "info":
             try:
                 from ..utils.time_utils import TimeUtils
-                from ..utils.info import get_system_info_dict
                 
-                online_count = len(_plugin_instance.server.online_players)
+                online_count = len(_plugin_instance.online_players)
                 max_players = _plugin_instance.server.max_players
                 server_name = _plugin_instance.server.name
                 version = _plugin_instance.server.version
@@ -582,14 +691,14 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                 start_time = _plugin_instance.server.start_time
                 
                 # 获取插件统计信息
-                total_bindings = len(_plugin_instance.data_manager.binding_data)
+                total_bindings = _plugin_instance.data_manager.count()
                 
                 # 使用时间工具模块获取当前时间和运行时长
                 time_info = TimeUtils.get_current_time_info()
                 uptime_info = TimeUtils.calculate_uptime(start_time)
                 
-                # 获取系统硬件信息
-                system_info = get_system_info_dict()
+                # 获取系统硬件信息（后台定期刷新的缓存快照）
+                system_info = _plugin_instance.system_info.snapshot()
                 
                 reply = f"服务器信息:\n"
 
@@ -604,34 +713,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                 reply += f"• 总绑定数: {total_bindings}\n"
                 
                 # === 系统硬件信息 ===
-                reply += f"\n系统信息:\n"
-                reply += f"• 操作系统: {system_info['os']}\n"
-                
-                # CPU信息
-                cpu_info = system_info['cpu']
-                cpu_model = cpu_info['model'][:50] + "..." if len(cpu_info['model']) > 50 else cpu_info['model']  # 限制长度
-                reply += f"• CPU型号: {cpu_model}\n"
-                
-                if cpu_info['max_freq_ghz']:
-                    reply += f"• CPU主频: {cpu_info['max_freq_ghz']:.2f}GHz"
-                    if cpu_info['current_freq_ghz']:
-                        reply += f" (当前: {cpu_info['current_freq_ghz']:.2f}GHz)"
-                    reply += "\n"
-                
-                reply += f"• CPU核心: {cpu_info['physical_cores']}核{cpu_info['logical_cores']}线程\n"
-                reply += f"• CPU使用率: {cpu_info['usage_percent']:.1f}%\n"
-                
-                # 内存信息
-                mem_info = system_info['memory']
-                reply += f"• 内存: {mem_info['used_gb']:.1f}GB / {mem_info['total_gb']:.1f}GB ({mem_info['percent']:.1f}%)\n"
-                
-                # 硬盘信息
-                disk_info = system_info['disks']
-                if disk_info:
-                    for disk in disk_info:
-                        if 'error' in disk:
-                            continue
-                        reply += f"• 硬盘({disk['device']}): {disk['used_gb']:.1f}GB / {disk['total_gb']:.1f}GB ({disk['percent']:.1f}%)\n"
+                reply += _format_system_info(system_info)
                 
                 reply += f"\n• QQSync群服互通: 运行中"
                 
@@ -641,7 +723,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                     _plugin_instance.logger.error(f"获取服务器信息失败: {e}")
                     # 提供基础信息作为回退
                     try:
-                        online_count = len(_plugin_instance.server.online_players)
+                        online_count = len(_plugin_instance.online_players)
                         max_players = _plugin_instance.server.max_players
                         reply = f"服务器基础信息:\n• 在线玩家: {online_count}/{max_players}\n• QQSync: 运行中"
                     except:
@@ -652,7 +734,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
             from ..utils.time_utils import TimeUtils
             bound_player = _plugin_instance.data_manager.get_qq_player(str(user_id))
             if bound_player:
-                player_data = _plugin_instance.data_manager.binding_data.get(bound_player, {})
+                player_data = _plugin_instance.data_manager.get_record(bound_player) or {}
                 
                 reply = f"=== 您的绑定信息 ===\n"
                 reply += f"绑定角色: {bound_player}\n"
@@ -664,7 +746,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                     reply += f"XUID: {xuid}\n"
                 
                 # 检查在线状态
-                is_online = any(player.name == bound_player for player in _plugin_instance.server.online_players)
+                is_online = _plugin_instance.is_player_online(bound_player)
                 reply += f"当前状态: {'在线' if is_online else '离线'}\n"
                 
                 # 检查封禁状态
@@ -737,77 +819,17 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                 command_to_execute = " ".join(args)
                 # 转义HTML字符
                 command_to_execute = html.unescape(command_to_execute)
-                # 返回的信息和状态
-                msg_ret = []
-                error_ret = []
-                success = False
-
-                try:
-
-                    # 创建一个队列来接收主线程的执行结果
-                    result_queue = queue.Queue()
-
-                    language = _plugin_instance.server.language
-
-                    def on_message(msg):
-                        if isinstance(msg, str):
-                            msg_ret.append(msg)
-                        else:
-                            try:
-                                translated = language.translate(msg, language.locale)
-                                msg_ret.append(translated)
-                            except Exception as e:
-                                msg_ret.append(f"[消息翻译失败: {e}]")
-
-                    def on_error(err):
-                        if isinstance(err, str):
-                            error_ret.append(err)
-                        else:
-                            try:
-                                translated = language.translate(err)
-                                error_ret.append(translated)
-                            except Exception as e:
-                                error_ret.append(f"[错误翻译失败: {e}]")
-
-                    wrapper = CommandSenderWrapper(
-                        sender=_plugin_instance.server.command_sender,
-                        on_message=on_message,
-                        on_error=on_error
-                    )
-
-                    def server_thread():
-                        try:
-                            # 在主线程中执行命令
-                            success_result = _plugin_instance.server.dispatch_command(wrapper, command_to_execute)
-                            # 将结果放入队列
-                            result_queue.put((success_result, None))
-                        except Exception as e:
-                            # 如果有异常，也放入队列
-                            result_queue.put((False, str(e)))
-
-                    # 提交任务到主线程
-                    _plugin_instance.server.scheduler.run_task(_plugin_instance, server_thread, 0, 0)
-
-                    # 阻塞等待结果
-                    success, error = result_queue.get(block=True, timeout=10)  # 设置10秒超时
-
-                    if error:
-                        raise Exception(error)
-
-                    # 合并输出
-                    lines = []
-                    lines.extend(msg_ret)
-                    lines.extend([f"[ERROR] {e}" for e in error_ret])
-
-                    output_text = "\n".join(lines) if lines else "无返回值"
-                    status = "成功" if success else "失败, 请检查命令语法或权限"
-
-                    reply = f"命令已执行: /{command_to_execute}\n状态: {status}\n输出:\n{output_text}"
-
-                except queue.Empty:
-                    reply = "[错误] 命令执行超时"
-                except Exception as e:
-                    reply = f"[错误] 命令执行失败: {str(e)}"
+                
+                # 命令在后台任务中执行，不阻塞消息处理
+                # 创建任务前同步占用名额：连续的 /cmd 可能在任何任务开始运行前全部通过检查
+                global _cmd_running
+                if _cmd_running >= _CMD_MAX_CONCURRENCY:
+                    reply = f"[错误] 当前已有 {_cmd_running} 条命令正在执行，请稍后重试"
+                else:
+                    _cmd_running += 1
+                    task = asyncio.create_task(_run_remote_command(ws, group_id, command_to_execute))
+                    _cmd_tasks.add(task)
+                    task.add_done_callback(_release_cmd_slot)
             
             elif cmd == "who" and len(args) >= 1:
                 # 查询玩家信息
@@ -824,7 +846,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                 if not target_player:
                     reply = f"[错误] 未找到玩家 {search_input} 的记录"
                 else:
-                    player_data = _plugin_instance.data_manager.binding_data.get(target_player, {})
+                    player_data = _plugin_instance.data_manager.get_record(target_player) or {}
                 
                 if target_player and player_data:
                     from ..utils.time_utils import TimeUtils
@@ -839,7 +861,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                         reply += f"XUID: {xuid}\n"
                     
                     # 检查在线状态
-                    is_online = any(player.name == target_player for player in _plugin_instance.server.online_players)
+                    is_online = _plugin_instance.is_player_online(target_player)
                     reply += f"当前状态: {'在线' if is_online else '离线'}\n"
                     
                     # 检查封禁状态
@@ -1023,18 +1045,17 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                     reply = f"已解绑玩家 {target_player} 的QQ绑定"
                     
                     # 如果玩家在线，重新应用权限
-                    for player in _plugin_instance.server.online_players:
-                        if player.name == target_player:
-                            def apply_permissions():
-                                _plugin_instance.permission_manager.check_and_apply_permissions(player)
-                            _plugin_instance.server.scheduler.run_task(_plugin_instance, apply_permissions, delay=1)
-                            break
+                    player = _plugin_instance.get_online_player(target_player)
+                    if player:
+                        _plugin_instance.main_thread.call_soon(
+                            _plugin_instance.permission_manager.check_and_apply_permissions, player
+                        )
                 else:
                     reply = f"[错误] 解绑失败，玩家 {target_player} 不存在或未绑定QQ"
             
             elif cmd == "tog_qq":
                 # 切换QQ消息转发
-                current_state = _plugin_instance.config_manager.get_config("enable_qq_to_game", True)
+                current_state = _plugin_instance.config_manager.snapshot.enable_qq_to_game
                 _plugin_instance.config_manager.set_config("enable_qq_to_game", not current_state)
                 _plugin_instance.config_manager.save_config()
                 
@@ -1044,7 +1065,7 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
             
             elif cmd == "tog_game":
                 # 切换游戏消息转发
-                current_state = _plugin_instance.config_manager.get_config("enable_game_to_qq", True)
+                current_state = _plugin_instance.config_manager.snapshot.enable_game_to_qq
                 _plugin_instance.config_manager.set_config("enable_game_to_qq", not current_state)
                 _plugin_instance.config_manager.save_config()
                 
@@ -1056,6 +1077,8 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
                 # 重新加载配置
                 try:
                     _plugin_instance.config_manager.reload_config()
+                    # 丢弃已不在目标群列表中的群成员快照
+                    _plugin_instance.group_members.retain_groups(_plugin_instance.config_manager.snapshot.target_groups)
                     reply = "配置文件已重新加载"
                 except Exception as e:
                     reply = f"[错误] 重新加载配置失败: {str(e)}"
@@ -1080,36 +1103,142 @@ async def _handle_group_command(ws, user_id: int, raw_message: str, display_name
             await send_group_msg(ws, group_id, f"[错误] 命令处理失败: {str(e)}")
 
 
+def _paginate_output(text: str, max_lines: int = _CMD_PAGE_LINES, max_chars: int = _CMD_PAGE_CHARS) -> list:
+    """将命令输出按行数和字符数切分为多页"""
+    pages = []
+    current = []
+    current_chars = 0
+    for line in text.split("\n"):
+        # 单行过长时先切分
+        while len(line) > max_chars:
+            if current:
+                pages.append("\n".join(current))
+                current, current_chars = [], 0
+            pages.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and (len(current) >= max_lines or current_chars + len(line) + 1 > max_chars):
+            pages.append("\n".join(current))
+            current, current_chars = [], 0
+        current.append(line)
+        current_chars += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+def _release_cmd_slot(task):
+    """远程命令任务结束（包括启动前被取消）时释放并发名额"""
+    global _cmd_running
+    _cmd_tasks.discard(task)
+    _cmd_running -= 1
+
+
+async def _run_remote_command(ws, group_id: int, command_to_execute: str):
+    """在主线程执行管理员远程命令，并将输出分页发送到群"""
+    try:
+        # 返回的信息和状态
+        msg_ret = []
+        error_ret = []
+        
+        language = _plugin_instance.server.language
+        
+        def on_message(msg):
+            if isinstance(msg, str):
+                msg_ret.append(msg)
+            else:
+                try:
+                    translated = language.translate(msg, language.locale)
+                    msg_ret.append(translated)
+                except Exception as e:
+                    msg_ret.append(f"[消息翻译失败: {e}]")
+        
+        def on_error(err):
+            if isinstance(err, str):
+                error_ret.append(err)
+            else:
+                try:
+                    translated = language.translate(err)
+                    error_ret.append(translated)
+                except Exception as e:
+                    error_ret.append(f"[错误翻译失败: {e}]")
+        
+        wrapper = CommandSenderWrapper(
+            sender=_plugin_instance.server.command_sender,
+            on_message=on_message,
+            on_error=on_error
+        )
+        
+        try:
+            # 在主线程中执行命令，异步等待结果
+            success = await asyncio.wait_for(
+                _plugin_instance.main_thread.run(
+                    _plugin_instance.server.dispatch_command, wrapper, command_to_execute
+                ),
+                timeout=_CMD_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            await send_group_msg(ws, group_id, f"[错误] 命令执行超时: /{command_to_execute}")
+            return
+        except Exception as e:
+            await send_group_msg(ws, group_id, f"[错误] 命令执行失败: {str(e)}")
+            return
+        
+        # 合并输出
+        lines = []
+        lines.extend(msg_ret)
+        lines.extend([f"[ERROR] {e}" for e in error_ret])
+        
+        output_text = "\n".join(lines) if lines else "无返回值"
+        status = "成功" if success else "失败, 请检查命令语法或权限"
+        header = f"命令已执行: /{command_to_execute}\n状态: {status}\n输出:"
+        
+        pages = _paginate_output(output_text)
+        if len(pages) == 1:
+            await _send_command_page(ws, group_id, f"{header}\n{pages[0]}")
+            return
+        
+        # 输出较长时逐页发送（经出站队列限速），超过页数上限的部分省略
+        total = len(pages)
+        shown = pages[:_CMD_MAX_PAGES]
+        for index, page in enumerate(shown, 1):
+            title = f"{header} ({index}/{total})" if index == 1 else f"输出 ({index}/{total}):"
+            await _send_command_page(ws, group_id, f"{title}\n{page}")
+        if total > len(shown):
+            await _send_command_page(ws, group_id, f"[提示] 输出过长，已省略剩余 {total - len(shown)} 页")
+    except Exception as e:
+        if _plugin_instance:
+            _plugin_instance.logger.error(f"执行远程命令失败: {e}")
+
+
+async def _send_command_page(ws, group_id: int, text: str):
+    """发送一页命令输出（不与其它聊天消息合并）"""
+    payload = {
+        "action": "send_group_msg",
+        "params": {
+            "group_id": group_id,
+            "message": text
+        },
+        "echo": make_echo("send_group_msg")
+    }
+    await send_payload(ws, payload, priority=PRIORITY_CHAT, group_id=group_id)
+
+
 async def _forward_message_to_game(message_data: dict, display_name: str):
     """转发消息到游戏"""
     try:
-        # 使用新的消息解析工具来处理消息
-        from ..utils.message_utils import parse_qq_message, clean_message_text, truncate_message
-        
         # 获取群组ID和名称
         group_id = message_data.get("group_id")
         group_name = ""
         if _plugin_instance and group_id:
-            group_names = _plugin_instance.config_manager.get_config("group_names", {})
-            group_name = group_names.get(str(group_id), "")
-        
-        # 解析QQ消息，处理emoji和CQ码
-        parsed_message = parse_qq_message(message_data)
+            group_name = _plugin_instance.config_manager.snapshot.get_group_name(group_id)
         
-        # 构建完整的格式化消息，如果配置了群组名称则添加前缀
-        if group_name:
-            formatted_message = f"[{group_name}] {display_name}: {parsed_message}"
-        else:
-            formatted_message = f"{display_name}: {parsed_message}"
-        
-        # 清理文本并限制长度
-        clean_message = clean_message_text(formatted_message)
-        clean_message = truncate_message(clean_message, max_length=150)
+        # 解析CQ码和emoji，添加群组前缀，清理文本并限制长度
+        parsed_message, clean_message = format_qq_message_for_game(message_data, display_name, group_name)
         
-        if not clean_message or parsed_message == "[空消息]":
+        if not clean_message:
             return
         
-        # 转发到游戏 - 使用调度器确保在主线程执行
+        # 转发到游戏 - 由主线程调度桥在下一tick合并广播
         game_message = f"{ColorFormat.GREEN}[QQ群] {ColorFormat.AQUA}{clean_message}{ColorFormat.RESET}"
         
         if _plugin_instance:
@@ -1122,20 +1251,7 @@ async def _forward_message_to_game(message_data: dict, display_name: str):
                     webui.on_message_sent(sender=display_name, content=parsed_message, msg_type="chat", direction="qq_to_game")
                 except Exception as e:
                     _plugin_instance.logger.warning(f"webui on_message_sent调用失败: {e}")
-        
-        def send_to_players():
-            """在主线程中发送消息给所有玩家"""
-            try:
-                for player in _plugin_instance.server.online_players:
-                    player.send_message(game_message)
-
-            except Exception as e:
-                if _plugin_instance:
-                    _plugin_instance.logger.error(f"发送游戏消息失败: {e}")
-        
-        # 使用调度器在主线程执行
-        if _plugin_instance:
-            _plugin_instance.server.scheduler.run_task(_plugin_instance, send_to_players, delay=1)
+            _plugin_instance.main_thread.broadcast(game_message)
             
     except Exception as e:
         if _plugin_instance:
@@ -1179,14 +1295,6 @@ async def handle_api_response(data: dict):
                 # 通知verification_manager保存消息ID
                 if _plugin_instance and hasattr(_plugin_instance, 'verification_manager'):
                     _plugin_instance.verification_manager.handle_message_response(echo, message_id)
-            elif message_id:
-                # 处理handlers中的_verification_messages（兼容性）
-                for qq_number, msg_info in _verification_messages.items():
-                    if not msg_info.get("message_id") and msg_info.get("echo") == echo:
-                        msg_info["message_id"] = message_id
-                        if _plugin_instance:
-                            _plugin_instance.logger.debug(f"通过echo匹配保存QQ {qq_number} 的验证码消息ID: {message_id}")
-                        break
             else:
                 if _plugin_instance:
                     if not message_id:
@@ -1206,22 +1314,11 @@ async def handle_api_response(data: dict):
                     _plugin_instance.logger.warning(f"API请求失败: retcode={retcode}, msg={error_msg}, echo={echo}")
         
         elif action == "get_group_member_list" and status == "ok" and retcode == 0 and response_data:
-            # 更新群成员列表
-            group_members = set()
-            for member in response_data:
-                user_id = str(member.get("user_id", ""))
-                if user_id:
-                    group_members.add(user_id)
-            
-            # 如果插件实例中有群成员集合，则更新它
-            added_count = 0
-            if hasattr(_plugin_instance, 'group_members'):
-                old_count = len(_plugin_instance.group_members)
-                _plugin_instance.group_members.update(group_members)
-                new_count = len(_plugin_instance.group_members)
-                added_count = new_count - old_count
-            
-            _plugin_instance.logger.info(f"已更新群成员列表，当前共 {len(_plugin_instance.group_members)} 人 (本次新增 {added_count} 人)")
+            # 未经 ws_client.call 发出（或已超时）的群成员列表响应，按成员信息中的群号更新快照
+            group_id = response_data[0].get("group_id")
+            if group_id in _plugin_instance.config_manager.snapshot.target_groups:
+                members = [str(member.get("user_id")) for member in response_data if member.get("user_id")]
+                _apply_group_member_snapshot(group_id, members)
         
         elif action == "get_stranger_info" and status == "ok" and retcode == 0 and response_data:
             # 用户信息查询成功，更新昵称
@@ -1270,33 +1367,29 @@ async def handle_group_member_change(data: dict):
         user_id = str(data.get("user_id", ""))
         group_id = data.get("group_id")
         
-        target_groups = _plugin_instance.config_manager.get_config("target_groups", [])
-        if group_id not in target_groups:
+        if group_id not in _plugin_instance.config_manager.snapshot.target_groups:
             return
         
         if notice_type == "group_increase":
             # 有人加群
-            if hasattr(_plugin_instance, 'group_members'):
-                _plugin_instance.group_members.add(user_id)
             _plugin_instance.logger.info(f"用户 {user_id} 加入群聊")
+            if _plugin_instance.group_members.add(group_id, user_id):
+                _recheck_member_permissions((user_id,))
             
         elif notice_type == "group_decrease":
             # 有人退群
-            if hasattr(_plugin_instance, 'group_members'):
-                _plugin_instance.group_members.discard(user_id)
+            left = _plugin_instance.group_members.remove(group_id, user_id)
             
             # 检查是否有玩家绑定了这个QQ
             player_name = _plugin_instance.data_manager.get_qq_player(user_id)
             if player_name:
                 _plugin_instance.logger.info(f"绑定玩家 {player_name} 的QQ {user_id} 退出群聊")
-                
-                # 如果玩家在线，重新应用权限
-                for player in _plugin_instance.server.online_players:
-                    if player.name == player_name:
-                        _plugin_instance.permission_manager.check_and_apply_permissions(player)
-                        break
             else:
                 _plugin_instance.logger.info(f"用户 {user_id} 退出群聊")
+            
+            # 已不在任何目标群中，重新应用权限
+            if left:
+                _recheck_member_permissions((user_id,))
                 
     except Exception as e:
         if _plugin_instance:
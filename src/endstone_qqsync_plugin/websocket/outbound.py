@@ -0,0 +1,393 @@
+"""
+OneBot出站消息队列
+按优先级调度发送请求，对每个群做令牌桶限速，并合并短时间内发往同一群的聊天消息；
+断线期间暂存消息（有数量和时间上限），重连后按限定速率补发
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from ..utils.imports import import_websockets
+from . import codec
+from .client import make_echo
+websockets = import_websockets()
+
+
+# 优先级（数值越小越优先）
+PRIORITY_VERIFICATION = 0  # 验证码、绑定播报、撤回、群昵称
+PRIORITY_CHAT = 1          # 聊天消息、命令回复
+PRIORITY_NOTICE = 2        # 加入/离开/死亡等通知
+
+_PRIORITY_NAMES = {
+    PRIORITY_VERIFICATION: "verification",
+    PRIORITY_CHAT: "chat",
+    PRIORITY_NOTICE: "notice",
+}
+
+
+class _TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距离下一个令牌可用的秒数，0 表示立即可用"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _OutboundItem:
+    """队列中的一条待发送请求"""
+
+    __slots__ = ("payload", "priority", "group_id", "lines", "created", "not_before", "future", "merged")
+
+    def __init__(self, payload: Optional[dict], priority: int, group_id: Optional[int],
+                 lines: Optional[list], not_before: float, future: asyncio.Future):
+        self.payload = payload
+        self.priority = priority
+        self.group_id = group_id
+        self.lines = lines
+        self.created = time.monotonic()
+        self.not_before = not_before
+        self.future = future
+        self.merged = 1
+
+    def encode(self) -> bytes:
+        """编码为待发送的JSON字节（合并的群消息只需序列化文本部分）"""
+        if self.lines is None:
+            return codec.encode(self.payload)
+        return codec.encode_group_msg(self.group_id, "\n".join(self.lines), make_echo("send_group_msg"))
+
+
+class OutboundQueue:
+    """
+    出站消息队列
+
+    所有方法都必须在插件事件循环线程内调用（get_metrics 除外）。
+    群消息（send_group_msg）受每群令牌桶限制，其它动作只按优先级排队。
+    积压超过 max_buffered 条时优先丢弃最早的低优先级请求；断线期间积压的请求在重连后
+    以不超过 flush_rate 条/秒的总速率补发，避免瞬间涌入触发 NapCat 限流。
+    """
+
+    def __init__(self, plugin, rate_per_group: float = 1.0, burst_per_group: int = 5,
+                 chat_merge_window: float = 0.3, max_age: float = 60.0, max_merge_lines: int = 10,
+                 max_buffered: int = 200, flush_rate: float = 3.0):
+        self.plugin = plugin
+        self.logger = plugin.logger
+        self.rate_per_group = max(0.1, float(rate_per_group))
+        self.burst_per_group = max(1, int(burst_per_group))
+        self.chat_merge_window = max(0.0, float(chat_merge_window))
+        self.max_age = float(max_age)
+        self.max_merge_lines = max(1, int(max_merge_lines))
+        self.max_buffered = max(1, int(max_buffered))
+        self.flush_rate = max(0.1, float(flush_rate))
+
+        self._queues: Dict[int, deque] = {p: deque() for p in _PRIORITY_NAMES}
+        self._buckets: Dict[int, _TokenBucket] = {}
+        # 每个群尚未发出、仍可合并的聊天消息
+        self._pending_chat: Dict[int, _OutboundItem] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        # 断线状态与重连后的补发限速
+        self._connected = False
+        self._flush_bucket: Optional[_TokenBucket] = None
+        self._overflow_warned = False
+
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "overflow": 0,
+            "failed": 0,
+            "requeued": 0,
+            "max_depth": 0,
+            "buffered_while_offline": 0,
+            "flushed": 0,
+        }
+
+    # ---- 入队 ----
+
+    def _new_future(self) -> asyncio.Future:
+        return asyncio.get_running_loop().create_future()
+
+    def _push(self, item: _OutboundItem):
+        self._queues[item.priority].append(item)
+        self.stats["enqueued"] += 1
+        if not self._connected:
+            self.stats["buffered_while_offline"] += 1
+        depth = self.depth
+        if depth > self.max_buffered:
+            self._evict_lowest()
+            depth -= 1
+        if depth > self.stats["max_depth"]:
+            self.stats["max_depth"] = depth
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _evict_lowest(self):
+        """积压超限时丢弃优先级最低的队列中最早的请求"""
+        for priority in sorted(self._queues, reverse=True):
+            queue = self._queues[priority]
+            if queue:
+                item = queue.popleft()
+                self.stats["dropped"] += item.merged
+                self.stats["overflow"] += item.merged
+                if not self._overflow_warned:
+                    self._overflow_warned = True
+                    self.logger.warning(f"出站消息积压超过 {self.max_buffered} 条，开始丢弃最早的低优先级消息")
+                self._finish(item, ConnectionError("出站消息积压过多，已丢弃"))
+                return
+
+    def enqueue(self, payload: dict, priority: int = PRIORITY_CHAT, group_id: Optional[int] = None) -> asyncio.Future:
+        """
+        加入一条完整的OneBot请求
+
+        Args:
+            payload (dict): OneBot动作请求
+            priority (int): 优先级
+            group_id (int): 群号；仅 send_group_msg 会按群限速
+
+        Returns:
+            asyncio.Future: 请求实际写入连接后完成
+        """
+        if payload.get("action") != "send_group_msg":
+            group_id = None
+        item = _OutboundItem(payload, priority, group_id, None, 0.0, self._new_future())
+        self._push(item)
+        return item.future
+
+    def enqueue_group_text(self, group_id: int, text: str, priority: int = PRIORITY_CHAT) -> asyncio.Future:
+        """
+        加入一条纯文本群消息，聊天优先级的消息会与同群未发出的聊天消息合并
+
+        Returns:
+            asyncio.Future: 消息（或合并后的消息）写入连接后完成
+        """
+        if priority == PRIORITY_CHAT:
+            pending = self._pending_chat.get(group_id)
+            if pending is not None and len(pending.lines) < self.max_merge_lines:
+                pending.lines.append(text)
+                pending.merged += 1
+                self.stats["coalesced"] += 1
+                return pending.future
+
+        not_before = time.monotonic() + self.chat_merge_window if priority == PRIORITY_CHAT else 0.0
+        item = _OutboundItem(None, priority, group_id, [text], not_before, self._new_future())
+        if priority == PRIORITY_CHAT:
+            self._pending_chat[group_id] = item
+        self._push(item)
+        return item.future
+
+    # ---- 连接状态 ----
+
+    def on_connected(self):
+        """连接建立后调用：有积压时进入补发模式并立即唤醒调度循环"""
+        self._connected = True
+        self._overflow_warned = False
+        depth = self.depth
+        if depth:
+            self._flush_bucket = _TokenBucket(self.flush_rate, 1)
+            self.logger.info(f"开始补发断线期间暂存的 {depth} 条消息（每秒最多 {self.flush_rate} 条）")
+        if self._wakeup:
+            self._wakeup.set()
+
+    def on_disconnected(self):
+        """连接断开后调用：之后的请求暂存到重连（受 max_buffered 与 max_age 限制）"""
+        self._connected = False
+        self._flush_bucket = None
+
+    # ---- 调度 ----
+
+    def _bucket(self, group_id: int) -> _TokenBucket:
+        bucket = self._buckets.get(group_id)
+        if bucket is None:
+            bucket = self._buckets[group_id] = _TokenBucket(self.rate_per_group, self.burst_per_group)
+        return bucket
+
+    def _next_ready(self, now: float):
+        """
+        选出下一条可发送的请求
+
+        Returns:
+            tuple: (请求, None) 或 (None, 需要等待的秒数)；队列为空时等待时间为 None
+        """
+        wait = None
+        # 已有更早或更高优先级请求在等待的群，后续请求不得越过它
+        blocked = set()
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            for item in queue:
+                if item.group_id in blocked:
+                    continue
+                delay = item.not_before - now
+                if item.group_id is not None and delay <= 0:
+                    delay = self._bucket(item.group_id).wait_time(now)
+                if delay <= 0:
+                    queue.remove(item)
+                    return item, None
+                blocked.add(item.group_id)
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _expire(self, now: float):
+        """丢弃等待过久的请求（通常是连接长时间不可用）"""
+        for queue in self._queues.values():
+            while queue and now - queue[0].created > self.max_age:
+                item = queue.popleft()
+                self._finish(item, ConnectionError("出站请求等待超时，已丢弃"))
+                self.stats["dropped"] += item.merged
+
+    def _finish(self, item: _OutboundItem, error: Optional[BaseException] = None):
+        if item.lines is not None and self._pending_chat.get(item.group_id) is item:
+            del self._pending_chat[item.group_id]
+        if not item.future.done():
+            if error is None:
+                item.future.set_result(True)
+            else:
+                item.future.set_exception(error)
+                # 调用方通常不等待结果，避免"exception was never retrieved"警告
+                item.future.exception()
+
+    async def run(self):
+        """出站调度循环，在插件事件循环中运行直到 stop"""
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self.logger.info(f"出站消息队列已启动 (每群 {self.rate_per_group}/秒, 突发 {self.burst_per_group})")
+        try:
+            while self._running:
+                now = time.monotonic()
+                self._expire(now)
+
+                if self._connection() is None:
+                    # 连接不可用，等待重连后继续发送（on_connected 会立即唤醒）
+                    item, wait = None, (1.0 if self.depth else None)
+                elif self._flush_bucket is not None and not self.depth:
+                    # 积压已补发完毕，恢复正常调度
+                    self._flush_bucket = None
+                    continue
+                elif self._flush_bucket is not None and self._flush_bucket.wait_time(now) > 0:
+                    item, wait = None, self._flush_bucket.wait_time(now)
+                else:
+                    item, wait = self._next_ready(now)
+
+                if item is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # 从这里开始该请求不再接受合并
+                if item.lines is not None and self._pending_chat.get(item.group_id) is item:
+                    del self._pending_chat[item.group_id]
+                if item.group_id is not None:
+                    self._bucket(item.group_id).consume(now)
+                flushing = self._flush_bucket is not None
+                if flushing:
+                    self._flush_bucket.consume(now)
+                # 纯文本群消息可由任意机器人发送（round_robin 模式下轮流），其余请求走主连接
+                ws = self._connection(shareable=item.lines is not None)
+                if ws is None:
+                    self._requeue(item)
+                    continue
+
+                try:
+                    await ws.send(item.encode(), text=True)
+                    self.stats["sent"] += 1
+                    if flushing:
+                        self.stats["flushed"] += item.merged
+                    self._finish(item)
+                except asyncio.CancelledError:
+                    self._finish(item, ConnectionError("出站队列已停止"))
+                    raise
+                except websockets.exceptions.ConnectionClosed:
+                    # 连接在发送时断开：放回队首，由其它可用连接发送或等待重连
+                    self.stats["requeued"] += 1
+                    self._requeue(item)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.logger.error(f"发送OneBot请求失败: {e}")
+                    self._finish(item, e)
+        finally:
+            self._running = False
+            self._drop_all()
+
+    def _connection(self, shareable: bool = False):
+        """获取发送用的连接，没有可用连接时返回 None"""
+        ws_client = getattr(self.plugin, "ws_client", None)
+        if ws_client is not None:
+            return ws_client.select_connection(shareable)
+        ws = getattr(self.plugin, "_current_ws", None)
+        if ws is None or getattr(ws, "state", 1) != 1:
+            return None
+        return ws
+
+    def _requeue(self, item: _OutboundItem):
+        """把已取出的请求放回所在优先级队列的队首（不再接受合并）"""
+        self._queues[item.priority].appendleft(item)
+
+    def _drop_all(self):
+        for queue in self._queues.values():
+            while queue:
+                item = queue.popleft()
+                self.stats["dropped"] += item.merged
+                self._finish(item, ConnectionError("出站队列已停止"))
+        self._pending_chat.clear()
+
+    def stop(self):
+        """停止调度循环，未发送的请求将被丢弃"""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def drain(self, timeout: float = 3.0) -> bool:
+        """等待队列清空，返回是否在超时前完成"""
+        deadline = time.monotonic() + timeout
+        while self.depth:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    # ---- 指标 ----
+
+    @property
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取队列深度和发送统计"""
+        by_priority = {_PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()}
+        by_group: Dict[str, int] = {}
+        for queue in list(self._queues.values()):
+            for item in list(queue):
+                if item.group_id is not None:
+                    key = str(item.group_id)
+                    by_group[key] = by_group.get(key, 0) + 1
+        return {
+            "depth": sum(by_priority.values()),
+            "depth_by_priority": by_priority,
+            "depth_by_group": by_group,
+            **self.stats,
+        }
@@ -0,0 +1,115 @@
+"""
+OneBot反向WS服务端模块
+由 OneBot 实现（如 NapCat）主动连接插件，支持多个机器人同时接入；
+每个连接作为 WebSocketClient 的一个端点，入站事件进入同一个调度器
+"""
+
+import hmac
+import ipaddress
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from ..utils.imports import import_websockets
+websockets = import_websockets()
+
+
+def extract_access_token(request) -> str:
+    """从握手请求中取出访问令牌：Authorization 头（Bearer / Token）或 access_token 查询参数"""
+    scheme, _, value = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() in ("bearer", "token") and value.strip():
+        return value.strip()
+    query = parse_qs(urlsplit(request.path).query)
+    return query.get("access_token", [""])[0]
+
+
+def parse_self_id(value: Optional[str]):
+    """解析 X-Self-ID 请求头，数字账号转换为整数以便与事件中的 self_id 比较"""
+    if not value:
+        return None
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ReverseWebSocketServer:
+    """
+    反向WS服务端（在插件事件循环中运行）
+
+    只接受 Universal 角色的连接；配置了访问令牌时，缺少令牌返回 401，令牌错误返回 403。
+    """
+
+    def __init__(self, client, config, transport):
+        """
+        Args:
+            client (WebSocketClient): 接收连接的客户端（管理端点、调度入站事件）
+            config (ReverseWsConfig): 反向WS配置
+            transport (WsTransportConfig): 传输参数
+        """
+        self.client = client
+        self.logger = client.logger
+        self.config = config
+        self.transport = transport
+        self.stats = {
+            "accepted": 0,
+            "rejected": 0,
+        }
+
+    def _reject(self, connection, status: int, reason: str, log_message: str):
+        self.stats["rejected"] += 1
+        self.logger.warning(f"拒绝反向WS连接 ({connection.remote_address[0]}): {log_message}")
+        return connection.respond(status, reason)
+
+    def _process_request(self, connection, request):
+        """握手前校验路径、连接角色和访问令牌，返回 None 表示接受"""
+        path = urlsplit(request.path).path.rstrip("/") or "/"
+        if path != self.config.path:
+            return self._reject(connection, 404, "Not Found\n", f"路径不匹配 {path}")
+
+        role = request.headers.get("X-Client-Role", "Universal")
+        if role.lower() != "universal":
+            return self._reject(connection, 400, "Only Universal role is supported\n",
+                                f"不支持的连接角色 {role}，请在 OneBot 实现中使用 Universal 反向WS")
+
+        if self.config.access_token:
+            token = extract_access_token(request)
+            if not token:
+                return self._reject(connection, 401, "Unauthorized\n", "缺少访问令牌")
+            if not hmac.compare_digest(token.encode("utf-8"), self.config.access_token.encode("utf-8")):
+                return self._reject(connection, 403, "Forbidden\n", "访问令牌错误")
+        return None
+
+    async def _handler(self, websocket):
+        self.stats["accepted"] += 1
+        self_id = parse_self_id(websocket.request.headers.get("X-Self-ID"))
+        await self.client.handle_reverse_connection(websocket, self_id)
+
+    async def serve_forever(self):
+        """监听并处理连接，直到任务被取消"""
+        from .client import transport_options
+
+        if not self.config.access_token and not _is_loopback(self.config.host):
+            self.logger.warning(f"反向WS监听在非本机地址 {self.config.host} 且未设置 access_token，任何人都可以接入，请尽快配置令牌")
+
+        async with websockets.serve(
+            self._handler,
+            self.config.host,
+            self.config.port,
+            process_request=self._process_request,
+            ping_interval=self.transport.ping_interval,
+            ping_timeout=self.transport.ping_timeout,
+            close_timeout=10,
+            **transport_options(self.transport, server=True)
+        ) as server:
+            self.logger.info(f"反向WS服务端已启动: {self.config.url}（等待 OneBot 实现连接）")
+            await server.serve_forever()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return dict(self.stats)